@@ -0,0 +1,281 @@
+#----------------------------------------------------------------------------#
+# API.
+#----------------------------------------------------------------------------#
+
+import hashlib
+from datetime import datetime
+import dateutil.parser
+from flask import Blueprint, Response, abort, current_app, jsonify, request, stream_with_context
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, load_only
+import batch
+import booking
+import bulk
+import search
+from extensions import db
+from models import Venue, Artist, Show, has_genre, overlaps
+from views import show_page
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+VENUE_FIELDS = ('id', 'name', 'genres', 'city', 'state', 'address', 'phone', 'image_link',
+                'facebook_link', 'description', 'seeking_talent', 'website', 'capacity')
+ARTIST_FIELDS = ('id', 'name', 'genres', 'city', 'state', 'phone', 'image_link',
+                 'facebook_link', 'website', 'seeking_venue', 'seeking_description')
+SHOW_FIELDS = ('id', 'venue_id', 'venue_name', 'venue_image_link',
+               'artist_id', 'artist_name', 'artist_image_link', 'start_time', 'end_time')
+SHOW_LIST_FIELDS = ('past_shows', 'upcoming_shows')
+
+def requested_fields(allowed):
+  # ?fields=id,name narrows the response; unknown names are a bad request
+  fields = request.args.get('fields')
+  if not fields:
+    return allowed
+  fields = tuple(field.strip() for field in fields.split(',') if field.strip())
+  if not fields or any(field not in allowed for field in fields):
+    abort(400)
+  return fields
+
+def column_options(model, fields):
+  # only load the columns the client asked for (plus what the ETag needs)
+  columns = [field for field in fields if field in model.__table__.c]
+  return load_only(*set(columns) | {'id', 'updated_at'})
+
+def serialize(obj, fields):
+  data = {}
+  for field in fields:
+    value = getattr(obj, field)
+    data[field] = value.isoformat() if isinstance(value, datetime) else value
+  return data
+
+def serialize_show(show, fields):
+  data = {
+    'id': show.id,
+    'venue_id': show.venue_id,
+    'artist_id': show.artist_id,
+    'start_time': show.start_time.isoformat(),
+    'end_time': show.end_time.isoformat(),
+  }
+  if 'venue_name' in fields or 'venue_image_link' in fields:
+    data['venue_name'] = show.venue.name
+    data['venue_image_link'] = show.venue.image_link
+  if 'artist_name' in fields or 'artist_image_link' in fields:
+    data['artist_name'] = show.artist.name
+    data['artist_image_link'] = show.artist.image_link
+  return {field: data[field] for field in fields}
+
+def row_etag(*versions):
+  # strong validator over the (id, updated_at, ...) versions of every row
+  # that contributes to the response, plus the selected fields
+  digest = hashlib.sha1(repr((request.args.get('fields'),) + versions).encode('utf-8'))
+  return digest.hexdigest()
+
+def conditional_json(etag, build):
+  # build() only runs when the client's copy is stale
+  if request.if_none_match.contains(etag):
+    response = Response(status=304)
+  else:
+    response = jsonify(build())
+  response.set_etag(etag)
+  return response
+
+def page_limit():
+  # ?limit=, between 1 and API_MAX_PAGE_SIZE; anything else is a bad request
+  try:
+    limit = int(request.args.get('limit', current_app.config['API_PAGE_SIZE']))
+  except ValueError:
+    abort(400)
+  if not 1 <= limit <= current_app.config['API_MAX_PAGE_SIZE']:
+    abort(400)
+  return limit
+
+def entity_page(model, fields):
+  try:
+    after = int(request.args.get('after', 0))
+  except ValueError:
+    abort(400)
+  limit = page_limit()
+  # one row past the page tells whether there is a next one
+  rows = model.query.options(column_options(model, fields)) \
+    .filter(model.id > after).order_by(model.id).limit(limit + 1).all()
+  next_cursor = rows[limit - 1].id if len(rows) > limit else None
+  rows = rows[:limit]
+  etag = row_etag(next_cursor, *[(row.id, row.updated_at) for row in rows])
+  return conditional_json(etag, lambda: {
+    'data': [serialize(row, fields) for row in rows],
+    'next': next_cursor,
+  })
+
+def entity_detail(model, id, show_key, counterpart, fields):
+  target = model.query.options(column_options(model, fields)).filter_by(id=id).first()
+  if target is None:
+    abort(404)
+  show_lists = [field for field in fields if field in SHOW_LIST_FIELDS]
+  now = datetime.utcnow()
+  version = ()
+  if show_lists:
+    # the show lists change when a show is added, removed, edited or starts,
+    # or a counterpart is edited: one aggregate covers all of that, so a
+    # fresh client's copy is validated without loading the shows
+    version = tuple(db.session.query(
+        func.count(Show.id), func.count(Show.id).filter(Show.start_time > now),
+        func.max(Show.updated_at), func.max(counterpart.property.mapper.class_.updated_at)
+      ).select_from(Show).join(counterpart).filter(show_key == id).one())
+  etag = row_etag((target.id, target.updated_at), version)
+
+  def build():
+    data = serialize(target, [field for field in fields if field not in SHOW_LIST_FIELDS])
+    show_fields = [field for field in SHOW_FIELDS if not field.startswith(model.__tablename__.lower())]
+    shows = []
+    if show_lists:
+      shows = Show.query.join(counterpart).options(contains_eager(counterpart)) \
+        .filter(show_key == id).order_by(Show.start_time).all()
+    if 'past_shows' in show_lists:
+      data['past_shows'] = [serialize_show(show, show_fields) for show in shows if show.start_time <= now]
+    if 'upcoming_shows' in show_lists:
+      data['upcoming_shows'] = [serialize_show(show, show_fields) for show in shows if show.start_time > now]
+    return data
+  return conditional_json(etag, build)
+
+@api.route('/venues')
+def api_venues():
+  return entity_page(Venue, requested_fields(VENUE_FIELDS))
+
+@api.route('/venues/<int:venue_id>')
+def api_venue(venue_id):
+  fields = requested_fields(VENUE_FIELDS + SHOW_LIST_FIELDS)
+  return entity_detail(Venue, venue_id, Show.venue_id, Show.artist, fields)
+
+@api.route('/artists')
+def api_artists():
+  return entity_page(Artist, requested_fields(ARTIST_FIELDS))
+
+@api.route('/artists/<int:artist_id>')
+def api_artist(artist_id):
+  fields = requested_fields(ARTIST_FIELDS + SHOW_LIST_FIELDS)
+  return entity_detail(Artist, artist_id, Show.artist_id, Show.venue, fields)
+
+@api.route('/availability')
+def api_availability():
+  # venues with no show overlapping [start, end), in one anti-join against
+  # Show that the venue/time-range exclusion index answers per venue
+  try:
+    start = dateutil.parser.parse(request.args['start'])
+    end = dateutil.parser.parse(request.args['end'])
+    min_capacity = request.args.get('min_capacity', type=int)
+    after = int(request.args.get('after', 0))
+  except (KeyError, ValueError, OverflowError):
+    abort(400)
+  if end <= start:
+    abort(400)
+  limit = page_limit()
+  # the start_time bounds add nothing to the overlap test, but they are on
+  # the partition key, so only the partitions the window can touch are
+  # read: no show lasts longer than booking.MAX_DURATION
+  busy = db.session.query(Show.id).filter(
+    Show.venue_id == Venue.id, overlaps(Show.start_time, Show.end_time, start, end),
+    Show.start_time < end, Show.start_time > start - booking.MAX_DURATION)
+  query = Venue.query.options(load_only('id', 'name', 'city', 'state', 'genres', 'capacity')) \
+    .filter(~busy.exists(), Venue.id > after)
+  if request.args.get('state'):
+    query = query.filter(Venue.state == request.args['state'])
+  if request.args.get('city'):
+    query = query.filter(Venue.city == request.args['city'])
+  if request.args.get('genre'):
+    query = query.filter(has_genre(Venue.genres, request.args['genre']))
+  if min_capacity is not None:
+    query = query.filter(Venue.capacity >= min_capacity)
+  # one row past the page tells whether there is a next one
+  venues = query.order_by(Venue.id).limit(limit + 1).all()
+  next_cursor = venues[limit - 1].id if len(venues) > limit else None
+  return jsonify(
+    data=[serialize(venue, ('id', 'name', 'city', 'state', 'genres', 'capacity')) for venue in venues[:limit]],
+    next=next_cursor)
+
+TYPEAHEAD_MODELS = {'venues': Venue, 'artists': Artist}
+
+@api.route('/typeahead/<entity>')
+def typeahead(entity):
+  # id/name suggestions for the show form's artist and venue pickers
+  model = TYPEAHEAD_MODELS.get(entity)
+  if model is None:
+    abort(404)
+  matches = search.suggest(db.session, model, request.args.get('q'), current_app.config['TYPEAHEAD_LIMIT'])
+  response = jsonify(data=[{'id': id, 'name': name} for id, name in matches])
+  response.cache_control.max_age = 60
+  return response
+
+@api.route('/shows')
+def api_shows():
+  fields = requested_fields(SHOW_FIELDS)
+  shows, prev_cursor, next_cursor = show_page(
+    request.args.get('after'), request.args.get('before'), current_app.config['API_PAGE_SIZE'])
+  etag = row_etag(prev_cursor, next_cursor,
+                  *[(show.id, show.updated_at, show.venue.updated_at, show.artist.updated_at)
+                    for show in shows])
+  return conditional_json(etag, lambda: {
+    'data': [serialize_show(show, fields) for show in shows],
+    'prev': prev_cursor,
+    'next': next_cursor,
+  })
+
+@api.route('/batch/<entity>', methods=['POST'])
+def api_batch(entity):
+  # create (rows without "id") or update (rows with one) many venues,
+  # artists or shows in one transaction; nothing is written unless every
+  # row is valid, and each invalid row is reported by its index
+  if entity not in batch.ENTITIES:
+    abort(404)
+  payload = request.get_json(silent=True)
+  records = payload.get('rows') if isinstance(payload, dict) else payload
+  if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+    abort(400)
+  if len(records) > current_app.config['BATCH_MAX_ROWS']:
+    abort(413)
+  try:
+    ids, errors = batch.apply(db.session, entity, records)
+    if errors:
+      db.session.rollback()
+      return jsonify(errors=[{'index': index, 'errors': errors[index]} for index in sorted(errors)]), 422
+    db.session.commit()
+  except IntegrityError as e:
+    # e.g. an overlapping show committed concurrently (exclusion constraint)
+    db.session.rollback()
+    return jsonify(errors=[{'index': None, 'errors': [str(e.orig)]}]), 409
+  updated = sum(1 for record in records if record.get('id') is not None)
+  return jsonify(ids=ids, created=len(ids) - updated, updated=updated)
+
+EXPORT_MODELS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+
+def export_columns(model):
+  return [column.name for column in model.__table__.c if column.name not in ('search_document', 'deleted_at')]
+
+def export_stream(engine, model, format, batch_size):
+  # yields encoded chunks from a server-side cursor on its own connection
+  encode, _ = bulk.EXPORT_FORMATS[format]
+  table = model.__table__
+  columns = export_columns(model)
+  connection = engine.connect()
+  try:
+    batches = bulk.stream_table(connection, table, columns, batch_size, model.live_criteria())
+    for chunk in encode(batches, columns, table):
+      yield chunk
+  finally:
+    connection.close()
+
+@api.route('/export/<entity>')
+def api_export(entity):
+  model = EXPORT_MODELS.get(entity)
+  format = request.args.get('format', 'ndjson')
+  if model is None:
+    abort(404)
+  if format not in bulk.EXPORT_FORMATS:
+    abort(400)
+  chunks = export_stream(db.engine, model, format, current_app.config['EXPORT_BATCH_SIZE'])
+  headers = {'Content-Disposition': 'attachment; filename={}.{}'.format(entity, format)}
+  if 'gzip' in request.accept_encodings:
+    chunks = bulk.gzip_chunks(chunks)
+    headers['Content-Encoding'] = 'gzip'
+    headers['Vary'] = 'Accept-Encoding'
+  return Response(stream_with_context(chunks), mimetype=bulk.EXPORT_FORMATS[format][1], headers=headers)
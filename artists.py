@@ -0,0 +1,125 @@
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+import sys
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for
+import batch
+import search
+from extensions import db
+from models import Venue, Artist, Show, has_genre
+from views import render_cached, past_show_page, history
+
+bp = Blueprint('artists', __name__)
+
+@bp.route('/artists')
+def artists():
+  # ?genre= narrows the list through the GIN index on Artist.genres
+  genre = request.args.get('genre')
+  query = Artist.query
+  if genre:
+    query = query.filter(has_genre(Artist.genres, genre))
+  artists = query.all()
+  show_counts = Artist.show_counts([artist.id for artist in artists])
+  return render_template('pages/artists.html', artists=artists, show_counts=show_counts, genre=genre)
+
+@bp.route('/artists/search', methods=['POST'])
+def search_artists():
+  # ranked, case-insensitive partial match on name, city, state and genres.
+  # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+  # search for "band" should return "The Wild Sax Band".
+  search_term=request.form.get('search_term', '')
+  artists = search.search(db.session, Artist, search_term, current_app.config['SEARCH_RESULTS_LIMIT'])
+  response={
+      "count": len(artists),
+      "data":[]
+    }
+  for artist in artists:
+    response['data'].append(artist)
+  show_counts = Artist.show_counts([artist.id for artist in artists])
+  return render_template('pages/search_artists.html', results=response, show_counts=show_counts, search_term=request.form.get('search_term'))
+
+@bp.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+  # shows the artist page with the given artist_id
+  return render_cached('artist:{}'.format(artist_id), lambda: render_artist(artist_id))
+
+def render_artist(artist_id):
+  # past shows: the first page and the precomputed summary only, the rest
+  # loads from /artists/<id>/past-shows
+  target_artist = Artist.query.filter_by(id=artist_id).first_or_404()
+  upcoming_shows = target_artist.upcoming_shows()
+  upcoming_shows_count = len(upcoming_shows)
+  past_shows, next_cursor = past_show_page(Show.artist_id, artist_id, Show.venue, None, current_app.config['PAST_SHOWS_PER_PAGE'])
+  summary = history('artist', artist_id, Venue)
+  past_shows_count = summary['count'] if summary else target_artist.num_past_shows()
+  html = render_template('pages/show_artist.html', artist=target_artist, past_shows=past_shows, upcoming_shows=upcoming_shows, past_shows_count=past_shows_count, upcoming_shows_count=upcoming_shows_count,
+                         history=summary, next_url=next_cursor and url_for('.artist_past_shows', artist_id=artist_id, before=next_cursor))
+  # stale once the next upcoming show starts
+  return html, upcoming_shows[0].start_time if upcoming_shows else None
+
+@bp.route('/artists/<int:artist_id>/past-shows')
+def artist_past_shows(artist_id):
+  # fragment appended by the "More past shows" button
+  past_shows, next_cursor = past_show_page(Show.artist_id, artist_id, Show.venue, request.args.get('before'), current_app.config['PAST_SHOWS_PER_PAGE'])
+  return render_template('fragments/past_shows.html', past_shows=past_shows, counterpart='venue',
+                         next_url=next_cursor and url_for('.artist_past_shows', artist_id=artist_id, before=next_cursor))
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+  from forms import ArtistForm
+  form = ArtistForm()
+  target_artist = Artist.query.filter_by(id=artist_id).all()
+  # TODO: populate form with fields from artist with ID <artist_id>
+  return render_template('forms/edit_artist.html', form=form, artist=target_artist)
+
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+  # TODO: take values from the form submitted, and update existing
+  # artist record with ID <artist_id> using the new attributes
+  artist= Artist.query.get(artist_id)
+  from forms import ArtistForm
+  form = ArtistForm(request.form)
+  if form.validate():
+    try:   
+      for key, value in batch.artist_values(form.data).items():
+        setattr(artist, key, value)
+      db.session.commit()
+      # on successful db insert, flash success
+      flash('Artist ' + request.form['name'] + ' was successfully edited!')
+    except:
+      # TODO: on unsuccessful db insert, flash an error instead.
+      flash('An error occurred. Artist ' + request.form['name']  + ' could not be edited.')
+      print(sys.exc_info())
+      db.session.rollback()  
+    finally:
+      db.session.close()
+  return redirect(url_for('.show_artist', artist_id=artist_id))
+
+@bp.route('/artists/create', methods=['GET'])
+def create_artist_form():
+  from forms import ArtistForm
+  form = ArtistForm()
+  return render_template('forms/new_artist.html', form=form)
+
+@bp.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+  # called upon submitting the new artist listing form
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  from forms import ArtistForm
+  form = ArtistForm(request.form)
+  try: 
+    the_new_artist = Artist(**batch.artist_values(form.data))
+    db.session.add(the_new_artist)
+    db.session.commit()
+    # on successful db insert, flash success
+    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+  except:
+    # TODO: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Artist ' + request.form['name']  + ' could not be listed.')
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+  return render_template('pages/home.html')
@@ -0,0 +1,82 @@
+#----------------------------------------------------------------------------#
+# ASGI entry point.
+#
+# Optional deployment mode: `uvicorn asgi:application`. The event loop owns
+# the client sockets, so hundreds of slow or idle keep-alive connections
+# cost no threads, while the Flask views -- the same models, templates and
+# page cache as the WSGI app -- run on worker threads, no more at once than
+# the database connection pool holds, so requests queue here instead of
+# timing out on a pool checkout. asgiref's WsgiToAsgi does the protocol
+# translation (request bodies, streamed responses); each request gets its
+# own thread for the whole view, as Flask's thread-local contexts need.
+# Flask 1.0 and SQLAlchemy 1.3 have neither async views nor an async
+# engine, so each view still does its Postgres I/O synchronously on its
+# thread.
+#----------------------------------------------------------------------------#
+
+import asyncio
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.wsgi import WsgiToAsgi
+from app import create_app
+
+
+def worker_threads(config):
+  if config.get('ASGI_WORKER_THREADS'):
+    return config['ASGI_WORKER_THREADS']
+  if config.get('DB_PGBOUNCER_TRANSACTION_MODE'):
+    # no local pool to size against; PgBouncer queues beyond its own limit
+    return 32
+  return config['DB_POOL_SIZE'] + config['DB_MAX_OVERFLOW']
+
+
+async def read_request(receive):
+  # the request's http.request messages, or None if the client went away
+  # before sending all of them
+  messages = []
+  while True:
+    message = await receive()
+    if message['type'] == 'http.disconnect':
+      return None
+    messages.append(message)
+    if not message.get('more_body'):
+      return messages
+
+
+class WSGIApplication(object):
+
+  def __init__(self, wsgi_app, max_workers):
+    self.wsgi_app = wsgi_app
+    self.asgi_app = WsgiToAsgi(self.buffered_input)
+    self.max_workers = max_workers
+    self.slots = None
+
+  async def __call__(self, scope, receive, send):
+    if scope['type'] != 'http':
+      # no lifespan or websockets; servers carry on without lifespan events
+      raise ValueError('Unsupported ASGI scope type: {}'.format(scope['type']))
+    # the body first, so a slow upload holds no worker slot
+    messages = await read_request(receive)
+    if messages is None:
+      return
+    if self.slots is None:
+      # made on first use, so on the server's event loop
+      self.slots = asyncio.Semaphore(self.max_workers)
+
+    async def replay():
+      return messages.pop(0) if messages else await receive()
+
+    async with self.slots:
+      # without a context of its own, WsgiToAsgi would run every request
+      # on one shared thread
+      async with ThreadSensitiveContext():
+        await self.asgi_app(scope, replay, send)
+
+  def buffered_input(self, environ, start_response):
+    # WsgiToAsgi reads the whole body before the view runs, so Werkzeug may
+    # read it to the end even without a Content-Length (chunked uploads)
+    environ['wsgi.input_terminated'] = True
+    return self.wsgi_app(environ, start_response)
+
+
+app = create_app()
+application = WSGIApplication(app, worker_threads(app.config))
@@ -0,0 +1,234 @@
+#----------------------------------------------------------------------------#
+# Static assets.
+#
+# `flask assets` concatenates and minifies the stylesheet and script bundles
+# below, copies every other file under static/ with a content hash in its
+# name, and writes static/dist/manifest.json mapping source names to hashed
+# ones, plus a .gz (and, when the brotli package is installed, a .br) copy of
+# everything compressible. Templates ask for asset_urls('main.css') or
+# asset_url('img/front-splash.jpg'); /assets/<path> serves the hashed files
+# with a year-long immutable Cache-Control (the manifest, whose name has no
+# hash, with no-cache), choosing the precompressed copy the client accepts.
+# Until a manifest is built (or with ASSETS_DEBUG) the helpers return the
+# unbundled /static files instead.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+from flask import Blueprint, current_app, request, send_file, url_for, abort, safe_join
+
+# bundle name -> source files under static/, in load order
+BUNDLES = {
+  'main.css': ['css/bootstrap.min.css', 'css/layout.main.css', 'css/main.css',
+               'css/main.responsive.css', 'css/main.quickfix.css'],
+  'head.js': ['js/libs/modernizr-2.8.2.min.js'],
+  'main.js': ['js/libs/bootstrap-3.1.1.min.js', 'js/plugins.js', 'js/script.js'],
+}
+
+OUTPUT = 'dist'
+MANIFEST = 'manifest.json'
+HASH_LENGTH = 12
+COMPRESSIBLE = {'.css', '.js', '.map', '.json', '.svg', '.eot', '.ttf', '.otf', '.ico', '.txt'}
+# preferred first
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# for files under dist/ without a content hash (manifest.json): revalidated
+# on every use, so a deploy is seen at once
+UNHASHED_CACHE_CONTROL = 'no-cache'
+
+_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+_HASHED = re.compile(r'\.[0-9a-f]{%d}(\.[^./]+)?$' % HASH_LENGTH)
+
+#----------------------------------------------------------------------------#
+# Build.
+#----------------------------------------------------------------------------#
+
+def hashed_name(path, content):
+  root, ext = posixpath.splitext(path)
+  return '{}.{}{}'.format(root, hashlib.sha256(content).hexdigest()[:HASH_LENGTH], ext)
+
+
+def minify_css(css):
+  # comments (but not /*! license */ ones) and insignificant whitespace;
+  # spaces before ':' are kept, as "a :hover" and "a:hover" differ
+  css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+  css = re.sub(r'\s+', ' ', css)
+  css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+  css = re.sub(r':\s+', ':', css)
+  return css.replace(';}', '}').strip()
+
+
+def minify_js(js):
+  try:
+    # optional dependency: scripts are only concatenated without it
+    import rjsmin
+  except ImportError:
+    return js
+  return rjsmin.jsmin(js)
+
+
+def rewrite_urls(css, source, target, files, static_url_path):
+  # url()s are relative to the source file; point them at the hashed copies
+  # next to the bundle, or back at /static for files that were not copied
+  def replace(match):
+    url = match.group(2).strip()
+    if re.match(r'^([a-z]+:|//|/|#)', url, re.I):
+      return match.group(0)
+    path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+    resolved = posixpath.normpath(posixpath.join(posixpath.dirname(source), path))
+    if resolved in files:
+      url = posixpath.relpath(files[resolved], posixpath.dirname(target))
+    else:
+      url = '{}/{}'.format(static_url_path, resolved)
+    return 'url("{}{}")'.format(url, suffix)
+  return _URL.sub(replace, css)
+
+
+def sources(static_folder):
+  # every file under static/ except the build output, as posix paths
+  for directory, dirnames, filenames in os.walk(static_folder):
+    relative = os.path.relpath(directory, static_folder)
+    if relative == '.':
+      dirnames[:] = [name for name in dirnames if name != OUTPUT]
+    for filename in filenames:
+      yield posixpath.normpath(posixpath.join(relative.replace(os.sep, '/'), filename))
+
+
+def write(output, path, content):
+  # returns the paths written: the file plus its precompressed copies
+  full = os.path.join(output, *path.split('/'))
+  os.makedirs(os.path.dirname(full), exist_ok=True)
+  with open(full, 'wb') as f:
+    f.write(content)
+  written = [path]
+  if posixpath.splitext(path)[1] not in COMPRESSIBLE:
+    return written
+  variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+  try:
+    # optional dependency: gzip only without it
+    import brotli
+    variants.append(('.br', brotli.compress(content, quality=11)))
+  except ImportError:
+    pass
+  for suffix, compressed in variants:
+    if len(compressed) < len(content):
+      with open(full + suffix, 'wb') as f:
+        f.write(compressed)
+      written.append(path + suffix)
+  return written
+
+
+def build(static_folder, static_url_path='/static', clean=False):
+  # Writes the hashed files, then the manifest (last, and atomically, so a
+  # running app never reads one that points at missing files). Old hashed
+  # files stay unless `clean`, for pages still cached with their URLs.
+  # Returns the manifest.
+  output = os.path.join(static_folder, OUTPUT)
+  written = set()
+  files = {}
+  for path in sorted(sources(static_folder)):
+    with open(os.path.join(static_folder, *path.split('/')), 'rb') as f:
+      content = f.read()
+    files[path] = hashed_name(path, content)
+    written.update(write(output, files[path], content))
+
+  bundles = {}
+  for name, paths in sorted(BUNDLES.items()):
+    ext = posixpath.splitext(name)[1]
+    target = 'bundles/' + name
+    parts = []
+    for path in paths:
+      with open(os.path.join(static_folder, *path.split('/')), encoding='utf-8') as f:
+        text = f.read()
+      if ext == '.css':
+        text = rewrite_urls(text, path, target, files, static_url_path)
+        parts.append(text if path.endswith('.min.css') else minify_css(text))
+      else:
+        parts.append(text if path.endswith('.min.js') else minify_js(text))
+    # a script missing its final semicolon must not run into the next one
+    content = ('\n' if ext == '.css' else '\n;\n').join(parts).encode('utf-8')
+    bundles[name] = hashed_name(target, content)
+    written.update(write(output, bundles[name], content))
+
+  manifest = {'bundles': bundles, 'files': files}
+  partial = os.path.join(output, MANIFEST + '.tmp')
+  with open(partial, 'w') as f:
+    json.dump(manifest, f, indent=2, sort_keys=True)
+  os.replace(partial, os.path.join(output, MANIFEST))
+  if clean:
+    for path in sources(output):
+      if path != MANIFEST and path not in written:
+        os.remove(os.path.join(output, *path.split('/')))
+  return manifest
+
+#----------------------------------------------------------------------------#
+# Template helpers.
+#----------------------------------------------------------------------------#
+
+def load_manifest(app):
+  # read once per app; None when nothing has been built
+  state = app.extensions.setdefault('assets', {})
+  if 'manifest' not in state:
+    manifest = None
+    if not app.config['ASSETS_DEBUG']:
+      try:
+        with open(os.path.join(app.static_folder, OUTPUT, MANIFEST)) as f:
+          manifest = json.load(f)
+      except FileNotFoundError:
+        pass
+    state['manifest'] = manifest
+  return state['manifest']
+
+
+def asset_urls(name):
+  # one URL for a built bundle, otherwise one per source file
+  manifest = load_manifest(current_app)
+  if manifest and name in manifest['bundles']:
+    return [url_for('assets.asset', filename=manifest['bundles'][name])]
+  return [url_for('static', filename=path) for path in BUNDLES[name]]
+
+
+def asset_url(path):
+  manifest = load_manifest(current_app)
+  if manifest and path in manifest['files']:
+    return url_for('assets.asset', filename=manifest['files'][path])
+  return url_for('static', filename=path)
+
+
+def init_app(app):
+  app.register_blueprint(bp)
+  app.add_template_global(asset_url)
+  app.add_template_global(asset_urls)
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+bp = Blueprint('assets', __name__)
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+  path = safe_join(os.path.join(current_app.static_folder, OUTPUT), filename)
+  if not os.path.isfile(path):
+    abort(404)
+  mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+  encoding = None
+  if posixpath.splitext(filename)[1] in COMPRESSIBLE:
+    for name, suffix in ENCODINGS:
+      if request.accept_encodings[name] and os.path.isfile(path + suffix):
+        encoding, path = name, path + suffix
+        break
+  # a hashed name changes with the content, so it never needs revalidating;
+  # anything else can change in place
+  hashed = bool(_HASHED.search(filename))
+  response = send_file(path, mimetype=mimetype, conditional=True, cache_timeout=31536000 if hashed else 0)
+  if encoding:
+    response.headers['Content-Encoding'] = encoding
+  response.headers['Cache-Control'] = CACHE_CONTROL if hashed else UNHASHED_CACHE_CONTROL
+  response.vary.add('Accept-Encoding')
+  return response
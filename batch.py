@@ -0,0 +1,153 @@
+#----------------------------------------------------------------------------#
+# Batch writes.
+#
+# Validates many venue, artist or show records at once through the same
+# forms as the create/edit pages, resolving references and double bookings
+# with a constant number of queries per batch. Used by `flask import` (which
+# then COPYs the rows) and by POST /api/v1/batch/<entity> (which writes them
+# through the session in one transaction).
+#----------------------------------------------------------------------------#
+
+import booking
+import bulk
+from models import Venue, Artist, Show, default_end_time, booking_book
+
+# form data -> column values, shared with the create/edit handlers
+def venue_values(data):
+  return {
+    'name': data['name'],
+    'address': data['address'],
+    'city': data['city'],
+    'state': data['state'],
+    'phone': data['phone'],
+    'image_link': data['image_link'],
+    'facebook_link': data['facebook_link'],
+    'description': data['seeking_description'],
+    'seeking_talent': data['seeking_talent'],
+    'website': data['website'],
+    'capacity': data['capacity'],
+    'genres': data['genres'],
+  }
+
+def artist_values(data):
+  return {
+    'name': data['name'],
+    'city': data['city'],
+    'state': data['state'],
+    'phone': data['phone'],
+    'genres': data['genres'],
+    'image_link': data['image_link'],
+    'seeking_venue': data['seeking_venue'],
+    'seeking_description': data['seeking_description'],
+    'facebook_link': data['facebook_link'],
+    'website': data['website'],
+  }
+
+def show_values(data):
+  return {
+    'venue_id': int(data['venue_id']),
+    'artist_id': int(data['artist_id']),
+    'start_time': data['start_time'],
+    'end_time': data['end_time'] or default_end_time(data['start_time']),
+  }
+
+def check_show_rows(session, rows, replacing=()):
+  # resolve every venue/artist id referenced by the rows with two IN queries,
+  # then check them all for double bookings in one pass. `replacing` holds
+  # the ids of shows being rewritten, whose old times must not count.
+  venue_ids = {row['venue_id'] for row in rows}
+  artist_ids = {row['artist_id'] for row in rows}
+  venue_ids -= {id for id, in session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+  artist_ids -= {id for id, in session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+  errors = {}
+  for index, row in enumerate(rows):
+    if row['venue_id'] in venue_ids:
+      errors.setdefault(index, []).append('unknown venue_id {}'.format(row['venue_id']))
+    if row['artist_id'] in artist_ids:
+      errors.setdefault(index, []).append('unknown artist_id {}'.format(row['artist_id']))
+  candidates = [booking.Booking(row['venue_id'], row['artist_id'], row['start_time'], row['end_time'])
+                for row in rows]
+  book = booking_book(candidates, exclude=replacing)
+  for index, candidate in enumerate(candidates):
+    if index not in errors:
+      conflicts = book.book(candidate, 'row {} of this batch'.format(index + 1))
+      if conflicts:
+        errors[index] = conflicts
+  return errors
+
+ENTITIES = {
+  'venues': (Venue, 'VenueForm', venue_values, None),
+  'artists': (Artist, 'ArtistForm', artist_values, None),
+  'shows': (Show, 'ShowForm', show_values, check_show_rows),
+}
+
+def make_form(entity):
+  # one unbound form, re-processed for every record
+  import forms
+  return getattr(forms, ENTITIES[entity][1])(formdata=None, meta={'csrf': False})
+
+def validate(session, entity, records, form=None, replacing=()):
+  # Returns (rows, errors): column values by record index for the records
+  # that passed, and a list of messages (or form.errors) for the rest.
+  _, _, values, check_references = ENTITIES[entity]
+  form = form or make_form(entity)
+  rows, errors = {}, {}
+  for index, record in enumerate(records):
+    form.process(bulk.form_data(record))
+    if not form.validate():
+      errors[index] = form.errors
+      continue
+    try:
+      rows[index] = values(form.data)
+    except (ValueError, TypeError) as e:
+      errors[index] = [str(e)]
+  if check_references and rows:
+    indexes = sorted(rows)
+    for position, messages in check_references(session, [rows[index] for index in indexes], replacing).items():
+      errors[indexes[position]] = messages
+      del rows[indexes[position]]
+  return rows, errors
+
+def apply(session, entity, records):
+  # Creates records without an "id" and overwrites the ones with one (all
+  # form fields are required, as on the edit pages). Everything is checked
+  # before anything is written: returns (ids, {}) after one flush, or
+  # (None, errors by index) leaving the session untouched.
+  model = ENTITIES[entity][0]
+  ids, errors, seen = {}, {}, set()
+  for index, record in enumerate(records):
+    if record.get('id') is not None:
+      try:
+        id = int(record['id'])
+      except (ValueError, TypeError):
+        errors[index] = ['invalid id {!r}'.format(record['id'])]
+        continue
+      if id in seen:
+        errors[index] = ['id {} appears more than once'.format(id)]
+      seen.add(id)
+      ids[index] = id
+  existing = {obj.id: obj for obj in session.query(model).filter(model.id.in_(seen))} if seen else {}
+  for index, id in ids.items():
+    if id not in existing:
+      errors[index] = ['unknown id {}'.format(id)]
+  rows, invalid = validate(session, entity, records, replacing=set(existing))
+  for index, messages in invalid.items():
+    errors.setdefault(index, messages)
+  if errors:
+    return None, errors
+  created = []
+  for index in sorted(rows):
+    if index in ids:
+      target = existing[ids[index]]
+      for key, value in rows[index].items():
+        setattr(target, key, value)
+    else:
+      target = model(**rows[index])
+      created.append(target)
+    rows[index] = target
+  # ids up front, so the flush inserts the new rows in one executemany
+  for target, id in zip(created, bulk.reserve_ids(session.connection(), model.__table__, len(created))):
+    target.id = id
+  session.add_all(created)
+  session.flush()
+  return [rows[index].id for index in sorted(rows)], {}
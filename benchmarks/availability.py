@@ -0,0 +1,159 @@
+#----------------------------------------------------------------------------#
+# Venue availability benchmark.
+#
+# Times /api/v1/availability through the test client for windows drawn from
+# the loaded shows with a fixed seed (an evening, a day and a week, each
+# starting at a booked show's start so the anti-join has work to do), with
+# no filter and with the state, city, genre and capacity filters: the first
+# page, and walking every page of the answer. --check also compares each
+# walked answer with the free venues worked out the long way (every venue
+# matching the filter, minus those with a show in the window), so a wrong
+# cursor or overlap test fails the run. The target scale is 100k venues and
+# 1M shows:
+#
+#   python -m benchmarks.dataset --shows 1m --venues 100k --seed 1 --reset
+#   python -m benchmarks.availability --windows 20 --check --output availability.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LENGTHS = {'evening': timedelta(hours=3), 'day': timedelta(days=1), 'week': timedelta(days=7)}
+
+
+def sample_windows(session, count, seed):
+  # (label, start, end, filters); filters come from a venue booked at the start
+  from models import Venue, Show
+  rng = random.Random(seed)
+  rows = session.query(Show.start_time, Venue.state, Venue.city, Venue.genres, Venue.capacity) \
+    .join(Venue).order_by(Show.id).limit(100000).all()
+  windows = []
+  for i in range(count):
+    start, state, city, genres, capacity = rng.choice(rows)
+    length = list(LENGTHS)[i % len(LENGTHS)]
+    choices = [
+      ('none', {}),
+      ('state', {'state': state}),
+      ('city', {'state': state, 'city': city}),
+      ('city+genre', {'state': state, 'city': city, 'genre': genres[0]} if genres else {'city': city}),
+      ('capacity', {'min_capacity': capacity or 100}),
+    ]
+    filter, params = choices[i % len(choices)]
+    windows.append(('{}/{}'.format(length, filter), start, start + LENGTHS[length], params))
+  return windows
+
+
+def page_path(start, end, params, after=0, limit=None):
+  query = dict(params, start=start.isoformat(), end=end.isoformat(), after=after)
+  if limit:
+    query['limit'] = limit
+  return '/api/v1/availability?' + urlencode(sorted(query.items()))
+
+
+def walk(client, start, end, params, limit):
+  # every venue id of the answer, following `next`; and the page count
+  ids, after, pages = [], 0, 0
+  while after is not None:
+    response = client.get(page_path(start, end, params, after, limit))
+    if response.status_code != 200:
+      sys.exit('{} answered {}'.format(page_path(start, end, params, after, limit), response.status_code))
+    body = response.get_json()
+    ids.extend(venue['id'] for venue in body['data'])
+    after, pages = body['next'], pages + 1
+  return ids, pages
+
+
+def expected(session, start, end, params):
+  # the free venues without the anti-join or the cursor
+  from models import Venue, Show, has_genre
+  query = session.query(Venue.id)
+  if params.get('state'):
+    query = query.filter(Venue.state == params['state'])
+  if params.get('city'):
+    query = query.filter(Venue.city == params['city'])
+  if params.get('genre'):
+    query = query.filter(has_genre(Venue.genres, params['genre']))
+  if params.get('min_capacity') is not None:
+    query = query.filter(Venue.capacity >= params['min_capacity'])
+  busy = {venue_id for venue_id, in session.query(Show.venue_id)
+          .filter(Show.start_time < end, Show.end_time > start)}
+  return sorted(id for id, in query if id not in busy)
+
+
+def summary(times):
+  times = sorted(times)
+  return {
+    'p50_ms': round(statistics.median(times), 2),
+    'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 2),
+    'mean_ms': round(statistics.mean(times), 2),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Time the venue availability search.')
+  parser.add_argument('--windows', type=int, default=20, help='windows sampled')
+  parser.add_argument('--iterations', type=int, default=5, help='first-page requests per window')
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--check', action='store_true', help='compare every answer with the long way round')
+  parser.add_argument('--output', help='also write the JSON result here')
+  args = parser.parse_args()
+
+  from app import create_app
+  from extensions import db
+  from models import Venue, Show
+
+  app = create_app(SQL_INSTRUMENTATION=False)
+  client = app.test_client()
+  limit = app.config['API_MAX_PAGE_SIZE']
+  with app.app_context():
+    session = db.session
+    result = {
+      'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+      'venues': session.query(Venue).count(),
+      'shows': session.query(Show).count(),
+      'windows': {},
+    }
+    windows = sample_windows(session, args.windows, args.seed)
+    session.remove()
+    first_page, full = [], []
+    for label, start, end, params in windows:
+      client.get(page_path(start, end, params))
+      times = []
+      for _ in range(args.iterations):
+        started = time.perf_counter()
+        client.get(page_path(start, end, params)).get_data()
+        times.append((time.perf_counter() - started) * 1000)
+      started = time.perf_counter()
+      ids, pages = walk(client, start, end, params, limit)
+      walk_ms = (time.perf_counter() - started) * 1000
+      first_page.extend(times)
+      full.append(walk_ms)
+      entry = result['windows'].setdefault(label, [])
+      entry.append({'start': start.isoformat(), 'free': len(ids), 'pages': pages,
+                    'first_page_ms': round(statistics.median(times), 2), 'all_pages_ms': round(walk_ms, 1)})
+      if args.check:
+        want = expected(session, start, end, params)
+        session.remove()
+        if ids != want:
+          sys.exit('{} from {}: {} free venues returned, {} expected'.format(label, start, len(ids), len(want)))
+    result['first_page'] = summary(first_page)
+    result['all_pages'] = summary(full)
+
+  print(json.dumps(result, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,141 @@
+#----------------------------------------------------------------------------#
+# Batch write benchmark.
+#
+# Creates the same number of shows through the single-row form handler
+# (POST /shows/create) and through one POST /api/v1/batch/shows, and
+# reports commits, statements and wall-clock per 1k rows for each, failing
+# if a batch's statement count changes with its size. It runs against the
+# configured database (DATABASE_URL), on a throwaway venue and artists it
+# creates and deletes again.
+#
+#   python -m benchmarks.batch --rows 1000 --output batch.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class Counters(object):
+
+  def __init__(self):
+    self.commits = 0
+    self.statements = 0
+
+  def reset(self):
+    self.commits = self.statements = 0
+
+
+def slots(rows, start, venue_id, artist_ids):
+  # back-to-back hour-long shows at one venue, artists taking turns
+  for i in range(rows):
+    start_time = start + timedelta(hours=i)
+    yield {
+      'venue_id': venue_id,
+      'artist_id': artist_ids[i % len(artist_ids)],
+      'start_time': start_time.strftime('%Y-%m-%d %H:%M:%S'),
+      'end_time': (start_time + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def measure(counters, run):
+  counters.reset()
+  started = time.perf_counter()
+  run()
+  return time.perf_counter() - started, counters.commits, counters.statements
+
+
+def result(rows, elapsed, commits, statements):
+  return {
+    'rows': rows,
+    'seconds': round(elapsed, 3),
+    'ms_per_1k_rows': round(elapsed * 1000 * 1000 / rows, 1),
+    'commits': commits,
+    'statements': statements,
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare single-row and batch show creation.')
+  parser.add_argument('--rows', type=int, default=1000)
+  parser.add_argument('--output', help='also write the JSON result here')
+  args = parser.parse_args()
+
+  from sqlalchemy import event
+  from sqlalchemy.engine import Engine
+  from sqlalchemy.orm import Session
+  from app import create_app
+  from extensions import db
+  from models import Venue, Artist, Show
+
+  app = create_app(WTF_CSRF_ENABLED=False, SQL_INSTRUMENTATION=False, BATCH_MAX_ROWS=args.rows)
+  counters = Counters()
+  event.listen(Session, 'after_commit', lambda session: setattr(counters, 'commits', counters.commits + 1))
+  event.listen(Engine, 'after_cursor_execute',
+               lambda *a: setattr(counters, 'statements', counters.statements + 1))
+  client = app.test_client()
+
+  with app.app_context():
+    venues = [Venue(name='benchmark venue {}'.format(i), city='Benchmark', state='NY', genres=['Other'])
+              for i in range(2)]
+    artists = [Artist(name='benchmark artist {}'.format(i), city='Benchmark', state='NY', genres=['Other'])
+               for i in range(20)]
+    db.session.add_all(venues + artists)
+    db.session.commit()
+    venue_ids = [venue.id for venue in venues]
+    artist_ids = [artist.id for artist in artists]
+    db.session.close()
+  # far enough ahead that no real show can collide
+  start = datetime(datetime.utcnow().year + 50, 1, 1)
+
+  try:
+    single_rows = list(slots(args.rows, start, venue_ids[0], artist_ids[:10]))
+    elapsed, commits, statements = measure(counters, lambda: [
+      client.post('/shows/create', data=row) for row in single_rows])
+    single = result(args.rows, elapsed, commits, statements)
+
+    batch_rows = list(slots(args.rows, start, venue_ids[1], artist_ids[10:]))
+    response = []
+    elapsed, commits, statements = measure(counters, lambda: response.append(
+      client.post('/api/v1/batch/shows', json={'rows': batch_rows})))
+    if response[0].status_code != 200:
+      sys.exit('batch request failed: {} {}'.format(response[0].status_code, response[0].get_data(as_text=True)))
+    batched = result(args.rows, elapsed, commits, statements)
+
+    # a tenth of the rows, later on the same venue: a batch costs the same
+    # statements whatever its size
+    probe_rows = list(slots(max(1, args.rows // 10), start + timedelta(hours=args.rows), venue_ids[1],
+                            artist_ids[10:]))
+    response = []
+    _, _, probe_statements = measure(counters, lambda: response.append(
+      client.post('/api/v1/batch/shows', json={'rows': probe_rows})))
+    if response[0].status_code != 200:
+      sys.exit('batch request failed: {} {}'.format(response[0].status_code, response[0].get_data(as_text=True)))
+    batched['statements_for_{}_rows'.format(len(probe_rows))] = probe_statements
+  finally:
+    with app.app_context():
+      for show in Show.query.filter(Show.venue_id.in_(venue_ids)):
+        db.session.delete(show)
+      for obj in Venue.query.filter(Venue.id.in_(venue_ids)).all() + \
+                 Artist.query.filter(Artist.id.in_(artist_ids)).all():
+        db.session.delete(obj)
+      db.session.commit()
+
+  summary = {'single_row': single, 'batch': batched}
+  print(json.dumps(summary, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(summary, f, indent=2)
+  if probe_statements != batched['statements']:
+    sys.exit('batch statements grow with its size: {} for {} rows, {} for {}'.format(
+      probe_statements, len(probe_rows), batched['statements'], args.rows))
+
+
+if __name__ == '__main__':
+  main()
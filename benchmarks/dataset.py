@@ -0,0 +1,260 @@
+#----------------------------------------------------------------------------#
+# Synthetic dataset.
+#
+# Fills Venue/Artist/Show with a reproducible catalogue of any size, from a
+# thousand shows to ten million: the same --seed and --anchor always give
+# the same rows. Cities and genres follow skewed popularity weights, a few
+# venues and artists get most of the bookings, and shows fall on evenings,
+# mostly at weekends, two years back and six months ahead of the anchor date.
+# No venue or artist is ever double booked (one show per venue and artist a
+# day, all between 18:00 and 02:00), so the exclusion constraints hold.
+#
+# Rows go in through bulk.write_rows (COPY on PostgreSQL), a chunk per
+# transaction; the summary tables are rebuilt at the end.
+#
+#   python -m benchmarks.dataset --shows 1m --seed 1 --reset
+#----------------------------------------------------------------------------#
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (city, state, weight): bigger scenes get more venues and artists
+CITIES = (
+  ('New York', 'NY', 100), ('Los Angeles', 'CA', 85), ('Chicago', 'IL', 55),
+  ('Nashville', 'TN', 45), ('Austin', 'TX', 40), ('San Francisco', 'CA', 35),
+  ('Seattle', 'WA', 30), ('Atlanta', 'GA', 28), ('New Orleans', 'LA', 26),
+  ('Boston', 'MA', 24), ('Philadelphia', 'PA', 22), ('Denver', 'CO', 20),
+  ('Portland', 'OR', 18), ('Detroit', 'MI', 16), ('Miami', 'FL', 16),
+  ('Minneapolis', 'MN', 14), ('Houston', 'TX', 14), ('Washington', 'DC', 14),
+  ('Memphis', 'TN', 12), ('Phoenix', 'AZ', 10), ('Kansas City', 'MO', 8),
+  ('Cleveland', 'OH', 7), ('Salt Lake City', 'UT', 6), ('Albuquerque', 'NM', 4),
+  ('Boise', 'ID', 3), ('Burlington', 'VT', 2),
+)
+
+GENRE_WEIGHTS = {
+  'Rock n Roll': 16, 'Pop': 14, 'Hip-Hop': 13, 'Alternative': 11, 'Electronic': 10,
+  'Jazz': 8, 'R&B': 8, 'Country': 7, 'Punk': 6, 'Heavy Metal': 6, 'Folk': 5,
+  'Blues': 5, 'Soul': 4, 'Funk': 4, 'Reggae': 3, 'Classical': 3,
+  'Instrumental': 2, 'Musical Theatre': 2, 'Other': 2,
+}
+
+# Monday .. Sunday
+WEEKDAY_WEIGHTS = (0.5, 0.6, 0.8, 1.2, 2.0, 2.2, 1.0)
+# (hour, weight) for start times; minutes are :00 or :30
+START_HOURS = ((18, 1), (19, 3), (20, 5), (21, 4), (22, 2), (23, 1))
+DURATIONS = ((90, 3), (120, 5), (150, 1), (180, 1))
+
+PAST_DAYS = 730
+FUTURE_DAYS = 180
+
+ADJECTIVES = ('Blue', 'Velvet', 'Electric', 'Golden', 'Rusty', 'Midnight', 'Silver', 'Wild',
+              'Crimson', 'Hollow', 'Lucky', 'Neon', 'Painted', 'Quiet', 'Broken', 'Northern')
+VENUE_NOUNS = ('Room', 'Hall', 'Lounge', 'Tavern', 'Ballroom', 'Theatre', 'Club', 'Cellar',
+               'Garden', 'Warehouse', 'Stage', 'Saloon')
+ARTIST_NOUNS = ('Foxes', 'Echoes', 'Machines', 'Sisters', 'Kings', 'Satellites', 'Ghosts',
+                'Riders', 'Tides', 'Wolves', 'Lanterns', 'Collective')
+STREETS = ('Main St', 'Broadway', 'Market St', 'Oak Ave', 'Mission St', '2nd Ave', 'Elm St')
+
+
+def parse_count(value):
+  # 1000, 10k, 2.5m
+  multiplier = {'k': 10 ** 3, 'm': 10 ** 6}.get(value[-1:].lower(), 1)
+  return int(float(value[:-1] if multiplier > 1 else value) * multiplier)
+
+
+def cumulative(weights):
+  return list(itertools.accumulate(weights))
+
+
+def weighted_sample(rng, population, cum_weights, k):
+  # k distinct items, drawn by weight
+  k = min(k, len(population))
+  chosen = set()
+  while len(chosen) < k:
+    chosen.update(rng.choices(population, cum_weights=cum_weights, k=k - len(chosen)))
+  chosen = sorted(chosen)
+  rng.shuffle(chosen)
+  return chosen
+
+
+def pick_genres(rng, genres, cum_weights):
+  return weighted_sample(rng, genres, cum_weights, rng.choices((1, 2, 3), (6, 3, 1))[0])
+
+
+def popularity(rng, count):
+  # Zipf-like: a few venues/artists are booked far more often than the rest
+  weights = [1.0 / (rank + 1) ** 0.8 for rank in range(count)]
+  rng.shuffle(weights)
+  return cumulative(weights)
+
+
+def venue_rows(rng, count, genres, genre_weights):
+  city_weights = cumulative(weight for _, _, weight in CITIES)
+  for id in range(1, count + 1):
+    city, state, _ = CITIES[bisect.bisect_left(city_weights, rng.random() * city_weights[-1])]
+    name = 'The {} {}'.format(rng.choice(ADJECTIVES), rng.choice(VENUE_NOUNS))
+    yield {
+      'id': id,
+      'name': '{} {}'.format(name, id),
+      'genres': pick_genres(rng, genres, genre_weights),
+      'city': city,
+      'state': state,
+      'address': '{} {}'.format(rng.randint(1, 2000), rng.choice(STREETS)),
+      'phone': '{:03d}-{:03d}-{:04d}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+      'image_link': 'https://images.example.com/venues/{}.jpg'.format(id),
+      'facebook_link': 'https://www.facebook.com/venue{}'.format(id),
+      'website': 'https://venue{}.example.com'.format(id),
+      'description': '',
+      'seeking_talent': rng.random() < 0.3,
+      'capacity': min(20000, max(20, int(rng.lognormvariate(5.7, 0.9)))),
+    }
+
+
+def artist_rows(rng, count, genres, genre_weights):
+  city_weights = cumulative(weight for _, _, weight in CITIES)
+  for id in range(1, count + 1):
+    city, state, _ = CITIES[bisect.bisect_left(city_weights, rng.random() * city_weights[-1])]
+    yield {
+      'id': id,
+      'name': '{} {} {}'.format(rng.choice(ADJECTIVES), rng.choice(ARTIST_NOUNS), id),
+      'genres': pick_genres(rng, genres, genre_weights),
+      'city': city,
+      'state': state,
+      'phone': '{:03d}-{:03d}-{:04d}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+      'image_link': 'https://images.example.com/artists/{}.jpg'.format(id),
+      'facebook_link': 'https://www.facebook.com/artist{}'.format(id),
+      'website': 'https://artist{}.example.com'.format(id),
+      'seeking_venue': rng.random() < 0.4,
+      'seeking_description': '',
+    }
+
+
+def shows_per_day(total, days):
+  # split `total` over the days by weekday weight, with a slow upward trend
+  weights = [WEEKDAY_WEIGHTS[day.weekday()] * (0.7 + 0.6 * i / len(days)) for i, day in enumerate(days)]
+  scale = total / sum(weights)
+  counts = [int(weight * scale) for weight in weights]
+  # hand the remainder to the days that lost the most to rounding
+  by_remainder = sorted(range(len(days)), key=lambda i: weights[i] * scale - counts[i], reverse=True)
+  for i in by_remainder[:total - sum(counts)]:
+    counts[i] += 1
+  return counts
+
+
+def show_rows(rng, total, venues, artists, anchor):
+  days = [anchor + timedelta(days=offset) for offset in range(-PAST_DAYS, FUTURE_DAYS)]
+  venue_ids, artist_ids = range(1, venues + 1), range(1, artists + 1)
+  venue_weights, artist_weights = popularity(rng, venues), popularity(rng, artists)
+  hours, hour_weights = zip(*START_HOURS)
+  durations, duration_weights = zip(*DURATIONS)
+  now = datetime.utcnow()
+  for day, count in zip(days, shows_per_day(total, days)):
+    # one show per venue and per artist a day
+    count = min(count, venues, artists)
+    booked_venues = weighted_sample(rng, venue_ids, venue_weights, count)
+    booked_artists = weighted_sample(rng, artist_ids, artist_weights, count)
+    for venue_id, artist_id in zip(booked_venues, booked_artists):
+      start_time = day + timedelta(hours=rng.choices(hours, hour_weights)[0], minutes=rng.choice((0, 30)))
+      yield {
+        'venue_id': venue_id,
+        'artist_id': artist_id,
+        'start_time': start_time,
+        'end_time': start_time + timedelta(minutes=rng.choices(durations, duration_weights)[0]),
+        'updated_at': now,
+      }
+
+
+def reset(db):
+  tables = ('Show', 'Venue', 'Artist', 'AreaSummary', 'GenreSummary')
+  if db.engine.dialect.name == 'postgresql':
+    db.session.execute('TRUNCATE {} RESTART IDENTITY'.format(', '.join('"{}"'.format(t) for t in tables)))
+  else:
+    for table in tables:
+      db.session.execute(db.metadata.tables[table].delete())
+  db.session.commit()
+
+
+def load(db, table, rows, chunk_size, label):
+  import bulk
+  written = 0
+  started = time.time()
+  for chunk in bulk.chunked(rows, chunk_size):
+    columns = list(chunk[0])
+    bulk.write_rows(db.session.connection(), table, columns, chunk)
+    db.session.commit()
+    written += len(chunk)
+    elapsed = time.time() - started
+    print('{}: {} written ({:.0f} rows/s)'.format(label, written, written / elapsed if elapsed else 0),
+          file=sys.stderr)
+  return written
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Fill the database with a reproducible synthetic catalogue.')
+  parser.add_argument('--shows', type=parse_count, default=parse_count('10k'), help='e.g. 1k, 100k, 10m')
+  parser.add_argument('--venues', type=parse_count, help='default: one per 200 shows')
+  parser.add_argument('--artists', type=parse_count, help='default: one per 50 shows')
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--anchor', type=lambda value: datetime.strptime(value, '%Y-%m-%d'),
+                      help='date shows are spread around (default: today)')
+  parser.add_argument('--chunk-size', type=int, default=20000, help='rows per transaction')
+  parser.add_argument('--reset', action='store_true', help='empty the catalogue tables first')
+  args = parser.parse_args()
+
+  import partitions
+  from app import create_app
+  from extensions import db
+  from forms import GENRE_CHOICES
+  from models import Venue, Artist, Show, rebuild_summaries
+
+  venues = args.venues or max(10, args.shows // 200)
+  artists = args.artists or max(20, args.shows // 50)
+  anchor = args.anchor or datetime.combine(datetime.utcnow().date(), datetime.min.time())
+  genres = [genre for genre, _ in GENRE_CHOICES]
+  genre_weights = cumulative(GENRE_WEIGHTS.get(genre, 1) for genre in genres)
+  # one stream per table, so --shows does not change the venues and artists
+  rngs = [random.Random('{}:{}'.format(args.seed, table)) for table in ('Venue', 'Artist', 'Show')]
+
+  app = create_app(SQL_INSTRUMENTATION=False)
+  with app.app_context():
+    if args.reset:
+      reset(db)
+    elif db.session.query(Venue.id).with_deleted().first() or db.session.query(Artist.id).with_deleted().first():
+      sys.exit('The catalogue is not empty; pass --reset to replace it.')
+    if partitions.is_partitioned(db.session.connection()):
+      # monthly partitions for the whole spread, rather than the default one
+      partitions.ensure_partitions(db.session.connection(), anchor - timedelta(days=PAST_DAYS),
+                                   anchor + timedelta(days=FUTURE_DAYS))
+      db.session.commit()
+    started = time.time()
+    counts = {
+      'venues': load(db, Venue.__table__, venue_rows(rngs[0], venues, genres, genre_weights), args.chunk_size, 'Venue'),
+      'artists': load(db, Artist.__table__, artist_rows(rngs[1], artists, genres, genre_weights), args.chunk_size, 'Artist'),
+      'shows': load(db, Show.__table__, show_rows(rngs[2], args.shows, venues, artists, anchor), args.chunk_size, 'Show'),
+    }
+    if db.engine.dialect.name == 'postgresql':
+      # ids were written explicitly, so move the sequences past them
+      for table in ('Venue', 'Artist'):
+        db.session.execute("SELECT setval(pg_get_serial_sequence('\"{0}\"', 'id'), "
+                           "(SELECT coalesce(max(id), 1) FROM \"{0}\"))".format(table))
+      db.session.commit()
+    # COPY bypasses the flush hooks
+    rebuild_summaries()
+    if db.engine.dialect.name == 'postgresql':
+      db.session.execute('ANALYZE "Venue", "Artist", "Show"')
+      db.session.commit()
+  print('{venues} venues, {artists} artists, {shows} shows'.format(**counts),
+        'in {:.1f}s (seed {}, anchor {:%Y-%m-%d})'.format(time.time() - started, args.seed, anchor))
+
+
+if __name__ == '__main__':
+  main()
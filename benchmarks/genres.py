@@ -0,0 +1,88 @@
+#----------------------------------------------------------------------------#
+# Genre filter benchmark.
+#
+# Times the ?genre= filter of /venues and /artists (every live row with the
+# genre, in id order) for each genre of the form, in two ways: has_genre,
+# which is `genres @> ARRAY[genre]` on PostgreSQL and answered by the GIN
+# index, and `genre = ANY(genres)`, the array scan it replaced, which no
+# index serves. Both must return the same rows. Other databases have no
+# GIN index, so only has_genre (a json_each scan) is timed there. The
+# target scale is the user-facing one, 100k venues:
+#
+#   python -m benchmarks.dataset --shows 1m --venues 100k --seed 1 --reset
+#   python -m benchmarks.genres --iterations 5 --output genres.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def matching_ids(session, model, expression):
+  return [id for id, in session.query(model.id).filter(expression).order_by(model.id)]
+
+
+def timings(run, genres, iterations):
+  # (summary, {genre: matching row count})
+  times, counts = [], {}
+  for _ in range(iterations):
+    for genre in genres:
+      started = time.perf_counter()
+      counts[genre] = len(run(genre))
+      times.append((time.perf_counter() - started) * 1000)
+  times.sort()
+  return {
+    'p50_ms': round(statistics.median(times), 3),
+    'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+    'mean_ms': round(statistics.mean(times), 3),
+  }, counts
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare the GIN genre filter with the array scan.')
+  parser.add_argument('--iterations', type=int, default=5, help='passes over the genres')
+  parser.add_argument('--output', help='also write the JSON result here')
+  args = parser.parse_args()
+
+  from app import create_app
+  from extensions import db
+  from forms import GENRE_CHOICES
+  from models import Venue, Artist, has_genre
+
+  app = create_app(SQL_INSTRUMENTATION=False)
+  genres = [genre for genre, _ in GENRE_CHOICES]
+  result = {'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0], 'entities': {}}
+  with app.app_context():
+    session = db.session
+    postgresql = session.get_bind().dialect.name == 'postgresql'
+    for model in (Venue, Artist):
+      for genre in genres:  # warm the caches
+        matching_ids(session, model, has_genre(model.genres, genre))
+      gin, counts = timings(lambda genre: matching_ids(session, model, has_genre(model.genres, genre)),
+                            genres, args.iterations)
+      entity = {'rows': session.query(model).count(), 'matches': counts, 'has_genre': gin}
+      if postgresql:
+        entity['array_scan'], _ = timings(
+          lambda genre: matching_ids(session, model, model.genres.any(genre)), genres, args.iterations)
+        for genre in genres:
+          if matching_ids(session, model, has_genre(model.genres, genre)) != \
+              matching_ids(session, model, model.genres.any(genre)):
+            sys.exit('{} {}: has_genre and the array scan disagree'.format(model.__tablename__, genre))
+        entity['speedup_p50'] = round(entity['array_scan']['p50_ms'] / max(gin['p50_ms'], 0.001), 1)
+      session.remove()
+      result['entities'][model.__tablename__] = entity
+
+  print(json.dumps(result, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,173 @@
+#----------------------------------------------------------------------------#
+# Query plan check.
+#
+# Requests the hot pages through the Flask test client against the
+# configured database (load one with benchmarks.dataset first), records
+# every SELECT they issue and asks the database for its plan: EXPLAIN on
+# PostgreSQL, EXPLAIN QUERY PLAN on SQLite. The hot pages are the venue and
+# artist pages (the upcoming/past splits and the next past-shows page), the
+# /venues area listing and the keyset show pages, HTML and JSON, forwards
+# and backwards. Any sequential scan of "Show" (or one of its partitions)
+# or "Venue" fails the run; on PostgreSQL, tables with fewer than
+# --min-rows rows are left alone, since the planner rightly scans an empty
+# partition instead of opening an index on it.
+#
+#   python -m benchmarks.dataset --shows 1m --seed 1 --reset
+#   python -m benchmarks.plans --output plans.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# "Show", its partitions ("Show_y2026m10", "Show_default") and "Venue"
+WATCHED = re.compile(r'^(Show(_\w+)?|Venue)$')
+
+
+def hot_paths(session):
+  # the pages to check, for the venue and artist of the latest past show:
+  # they have past shows to page through, and usually upcoming ones
+  from models import Show
+  from views import encode_cursor
+  show = Show.query.filter(Show.start_time <= datetime.utcnow()) \
+    .order_by(Show.start_time.desc(), Show.id.desc()).first()
+  if show is None:
+    sys.exit('No past shows; load a dataset with benchmarks.dataset first.')
+  cursor = encode_cursor(show)
+  return [
+    '/venues',
+    '/venues/{}'.format(show.venue_id),
+    '/venues/{}/past-shows?before={}'.format(show.venue_id, cursor),
+    '/artists/{}'.format(show.artist_id),
+    '/artists/{}/past-shows?before={}'.format(show.artist_id, cursor),
+    '/shows',
+    '/shows?after={}'.format(cursor),
+    '/shows?before={}'.format(cursor),
+    '/api/v1/shows?after={}'.format(cursor),
+    '/api/v1/shows?before={}'.format(cursor),
+  ]
+
+
+class StatementRecorder(object):
+  # (statement, parameters) of every SELECT run while recording
+
+  def __init__(self):
+    self.statements = None
+
+  def __enter__(self):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    self.statements = []
+    event.listen(Engine, 'before_cursor_execute', self.record)
+    return self.statements
+
+  def __exit__(self, *exc):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    event.remove(Engine, 'before_cursor_execute', self.record)
+
+  def record(self, conn, cursor, statement, parameters, context, executemany):
+    if not executemany and statement.lstrip().upper().startswith('SELECT'):
+      self.statements.append((statement, parameters))
+
+
+def postgresql_scans(cursor, plan, min_rows):
+  # (relation, rows) of the sequential scans in an EXPLAIN (FORMAT JSON) plan
+  scans, nodes = [], [plan]
+  while nodes:
+    node = nodes.pop()
+    nodes.extend(node.get('Plans', ()))
+    relation = node.get('Relation Name')
+    if node['Node Type'] == 'Seq Scan' and WATCHED.match(relation):
+      cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', ('"{}"'.format(relation),))
+      rows = cursor.fetchone()[0]
+      if rows >= min_rows:
+        scans.append((relation, int(rows)))
+  return scans
+
+
+def explain(connection, dialect, statement, parameters, min_rows):
+  # (plan lines, sequential scans of watched tables) for one statement
+  cursor = connection.cursor()
+  try:
+    if dialect == 'postgresql':
+      cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+      plan = cursor.fetchone()[0]
+      plan = json.loads(plan) if isinstance(plan, str) else plan
+      return plan, postgresql_scans(cursor, plan[0]['Plan'], min_rows)
+    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+    lines = [row[-1] for row in cursor.fetchall()]
+    # "SCAN Show" reads the table; "SCAN Show USING INDEX ..." walks an index
+    scans = [(match.group(1), None) for match in
+             (re.match(r'SCAN (?:TABLE )?"?(\w+)"?(?: AS \w+)?$', line) for line in lines)
+             if match and WATCHED.match(match.group(1))]
+    return lines, scans
+  finally:
+    cursor.close()
+
+
+def check(app, min_rows=10000):
+  # {path: [{'sql', 'plan', 'seq_scans'}]} for the hot pages
+  from extensions import db
+  client = app.test_client()
+  with app.app_context():
+    paths = hot_paths(db.session)
+    db.session.remove()
+  result = {}
+  for path in paths:
+    with StatementRecorder() as statements:
+      response = client.get(path)
+    if response.status_code != 200:
+      sys.exit('{} answered {}'.format(path, response.status_code))
+    with app.app_context():
+      connection = db.engine.raw_connection()
+      try:
+        result[path] = []
+        for statement, parameters in statements:
+          plan, scans = explain(connection.connection, db.engine.dialect.name, statement, parameters, min_rows)
+          result[path].append({'sql': statement, 'plan': plan,
+                               'seq_scans': [relation for relation, _ in scans]})
+      finally:
+        connection.close()
+  return result
+
+
+def seq_scans(result):
+  # "<path>: Seq Scan on <table>" for every offending statement
+  return ['{}: Seq Scan on "{}"'.format(path, relation)
+          for path, statements in result.items()
+          for statement in statements
+          for relation in statement['seq_scans']]
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Fail on sequential scans in the hot queries.')
+  parser.add_argument('--min-rows', type=int, default=10000,
+                      help='PostgreSQL tables smaller than this may be scanned')
+  parser.add_argument('--output', help='also write the plans here, as JSON')
+  args = parser.parse_args()
+
+  from app import create_app
+  app = create_app(SQL_INSTRUMENTATION=False, CACHE_BACKEND='lru')
+  result = check(app, args.min_rows)
+  failures = seq_scans(result)
+  print(json.dumps({
+    'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+    'statements': {path: len(statements) for path, statements in result.items()},
+    'seq_scans': failures,
+  }, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(result, f, indent=2)
+  if failures:
+    sys.exit('{} sequential scans of "Show" or "Venue"'.format(len(failures)))
+
+
+if __name__ == '__main__':
+  main()
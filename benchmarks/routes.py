@@ -0,0 +1,385 @@
+#----------------------------------------------------------------------------#
+# Route benchmark.
+#
+# Drives every route of the app through the Flask test client against the
+# configured database (load one with benchmarks.dataset first) and records,
+# per route, latency percentiles, the number of SQL statements and the
+# peak Python memory of one request. Results are JSON; --compare checks
+# them against an earlier run (say, the parent commit's) and fails on
+# regressions. A route added without a scenario here also fails the run,
+# so the suite keeps covering the whole app.
+#
+# Write routes run against a venue and artist the suite creates, and
+# everything they create is soft-deleted and purged at the end.
+#
+#   python -m benchmarks.routes --iterations 20 --output routes.json
+#   python -m benchmarks.routes --compare routes.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import functools
+import http.server
+import itertools
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# names of the rows the suite writes, so they can be found and removed
+MARK = 'zz benchmark'
+
+# request(context) -> (path, keyword arguments for client.open)
+Scenario = namedtuple('Scenario', ['name', 'endpoint', 'method', 'request'])
+
+
+def form(**values):
+  return {'data': values}
+
+
+def venue_form(context, name):
+  return form(name=name, city='Benchmark', state='NY', address='1 Benchmark St', phone='555-0100',
+              genres=context['genre'], image_link='https://example.com/v.jpg',
+              facebook_link='https://facebook.com/benchmark', website='https://example.com',
+              seeking_description='', capacity='100')
+
+
+def artist_form(context, name):
+  return form(name=name, city='Benchmark', state='NY', phone='555-0100', genres=context['genre'],
+              image_link='https://example.com/a.jpg', facebook_link='https://facebook.com/benchmark',
+              website='https://example.com', seeking_description='')
+
+
+def show_slot(context):
+  # a fresh far-future hour at the suite's own venue, so bookings never clash
+  start = context['slot_start'] + timedelta(hours=next(context['slots']))
+  return start, start + timedelta(hours=1)
+
+
+def show_form(context):
+  start, end = show_slot(context)
+  return form(venue_id=str(context['fixture_venue']), artist_id=str(context['fixture_artist']),
+              start_time=start.strftime('%Y-%m-%d %H:%M:%S'), end_time=end.strftime('%Y-%m-%d %H:%M:%S'))
+
+
+def batch_shows(context, rows=100):
+  records = []
+  for _ in range(rows):
+    start, end = show_slot(context)
+    records.append({'venue_id': context['fixture_venue'], 'artist_id': context['fixture_artist'],
+                    'start_time': start.strftime('%Y-%m-%d %H:%M:%S'),
+                    'end_time': end.strftime('%Y-%m-%d %H:%M:%S')})
+  return {'json': {'rows': records}}
+
+
+def throwaway_venue(context):
+  # created outside the timed request, deleted by it
+  from extensions import db
+  from models import Venue
+  with context['app'].app_context():
+    venue = Venue(name='{} deleted venue'.format(MARK), city='Benchmark', state='NY', genres=[context['genre']])
+    db.session.add(venue)
+    db.session.commit()
+    return venue.id
+
+
+SCENARIOS = [
+  Scenario('home', 'main.index', 'GET', lambda c: ('/', {})),
+  Scenario('genres', 'main.genres', 'GET', lambda c: ('/genres', {})),
+  Scenario('metrics', 'main.metrics', 'GET', lambda c: ('/metrics', {})),
+
+  Scenario('venues', 'venues.venues', 'GET', lambda c: ('/venues', {})),
+  Scenario('venues by genre', 'venues.venues', 'GET', lambda c: ('/venues?genre=' + c['genre'], {})),
+  Scenario('venue search', 'venues.search_venues', 'POST', lambda c: ('/venues/search', form(search_term=c['term']))),
+  Scenario('venue page (busiest)', 'venues.show_venue', 'GET', lambda c: ('/venues/{}'.format(c['venue']), {})),
+  Scenario('venue past shows (page 2)', 'venues.venue_past_shows', 'GET', lambda c: ('/venues/{}/past-shows?before={}'.format(
+    c['venue'], c['venue_cursor']), {})),
+  Scenario('venue page (quietest)', 'venues.show_venue', 'GET', lambda c: ('/venues/{}'.format(c['quiet_venue']), {})),
+  # before 'venue edit', which points the fixture venue's image elsewhere
+  Scenario('venue thumbnail', 'images.thumbnail', 'GET', lambda c: ('/images/venues/{}/300.jpg'.format(c['fixture_venue']), {})),
+  Scenario('venue create form', 'venues.create_venue_form', 'GET', lambda c: ('/venues/create', {})),
+  Scenario('venue create', 'venues.create_venue_submission', 'POST',
+           lambda c: ('/venues/create', venue_form(c, '{} venue'.format(MARK)))),
+  Scenario('venue edit form', 'venues.edit_venue', 'GET', lambda c: ('/venues/{}/edit'.format(c['venue']), {})),
+  Scenario('venue edit', 'venues.edit_venue_submission', 'POST',
+           lambda c: ('/venues/{}/edit'.format(c['fixture_venue']), venue_form(c, '{} fixture venue'.format(MARK)))),
+  Scenario('venue delete', 'venues.delete_venue', 'POST', lambda c: ('/venues/{}'.format(throwaway_venue(c)), {})),
+
+  Scenario('artists', 'artists.artists', 'GET', lambda c: ('/artists', {})),
+  Scenario('artist search', 'artists.search_artists', 'POST', lambda c: ('/artists/search', form(search_term=c['term']))),
+  Scenario('artist page (busiest)', 'artists.show_artist', 'GET', lambda c: ('/artists/{}'.format(c['artist']), {})),
+  Scenario('artist past shows (page 2)', 'artists.artist_past_shows', 'GET', lambda c: ('/artists/{}/past-shows?before={}'.format(
+    c['artist'], c['artist_cursor']), {})),
+  Scenario('artist create form', 'artists.create_artist_form', 'GET', lambda c: ('/artists/create', {})),
+  Scenario('artist create', 'artists.create_artist_submission', 'POST',
+           lambda c: ('/artists/create', artist_form(c, '{} artist'.format(MARK)))),
+  Scenario('artist edit form', 'artists.edit_artist', 'GET', lambda c: ('/artists/{}/edit'.format(c['artist']), {})),
+  Scenario('artist edit', 'artists.edit_artist_submission', 'POST',
+           lambda c: ('/artists/{}/edit'.format(c['fixture_artist']), artist_form(c, '{} fixture artist'.format(MARK)))),
+
+  Scenario('shows', 'shows.shows', 'GET', lambda c: ('/shows', {})),
+  Scenario('show create form', 'shows.create_shows', 'GET', lambda c: ('/shows/create', {})),
+  Scenario('show create', 'shows.create_show_submission', 'POST', lambda c: ('/shows/create', show_form(c))),
+
+  Scenario('api venues', 'api_v1.api_venues', 'GET', lambda c: ('/api/v1/venues', {})),
+  Scenario('api venue', 'api_v1.api_venue', 'GET', lambda c: ('/api/v1/venues/{}'.format(c['venue']), {})),
+  Scenario('api artists', 'api_v1.api_artists', 'GET', lambda c: ('/api/v1/artists', {})),
+  Scenario('api artist', 'api_v1.api_artist', 'GET', lambda c: ('/api/v1/artists/{}'.format(c['artist']), {})),
+  Scenario('api shows', 'api_v1.api_shows', 'GET', lambda c: ('/api/v1/shows', {})),
+  Scenario('api availability', 'api_v1.api_availability', 'GET', lambda c: (
+    '/api/v1/availability?start={:%Y-%m-%dT%H:%M}&end={:%Y-%m-%dT%H:%M}'.format(
+      c['window_start'], c['window_start'] + timedelta(hours=3)), {})),
+  Scenario('api typeahead', 'api_v1.typeahead', 'GET', lambda c: ('/api/v1/typeahead/venues?q=' + c['term'], {})),
+  Scenario('api export venues', 'api_v1.api_export', 'GET', lambda c: ('/api/v1/export/venues', {})),
+  Scenario('api batch shows (100 rows)', 'api_v1.api_batch', 'POST', lambda c: ('/api/v1/batch/shows', batch_shows(c))),
+]
+
+# only ever served as files
+UNBENCHMARKED = {'static', 'assets.asset'}
+
+
+def uncovered(app):
+  endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+  return sorted(endpoints - UNBENCHMARKED - {scenario.endpoint for scenario in SCENARIOS})
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+
+  def log_message(self, *args):
+    pass
+
+
+def image_server():
+  # local stand-in for the external image hosts, serving static/
+  server = http.server.ThreadingHTTPServer(
+    ('127.0.0.1', 0), functools.partial(_QuietHandler, directory=os.path.join(ROOT, 'static')))
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+
+def prepare(app):
+  # ids and terms to request, chosen from the data, plus the suite's own
+  # venue and artist for the write routes
+  from sqlalchemy import func
+  from extensions import db
+  from models import Venue, Artist, Show
+  from views import past_show_page
+  with app.app_context():
+    busiest = lambda key: db.session.query(key).group_by(key).order_by(func.count(Show.id).desc(), key).limit(1).scalar()
+    venue = busiest(Show.venue_id) or db.session.query(func.min(Venue.id)).scalar()
+    artist = busiest(Show.artist_id) or db.session.query(func.min(Artist.id)).scalar()
+    if venue is None or artist is None:
+      sys.exit('No venues or artists to benchmark; load some with `python -m benchmarks.dataset`.')
+    quiet_venue = db.session.query(Venue.id).outerjoin(Show, Show.venue_id == Venue.id) \
+      .group_by(Venue.id).order_by(func.count(Show.id), Venue.id).limit(1).scalar()
+    target = Venue.query.get(venue)
+    fixture_venue = Venue(name='{} fixture venue'.format(MARK), city='Benchmark', state='NY', genres=target.genres,
+                          image_link=image_server() + '/img/front-splash.jpg')
+    fixture_artist = Artist(name='{} fixture artist'.format(MARK), city='Benchmark', state='NY', genres=target.genres)
+    db.session.add_all([fixture_venue, fixture_artist])
+    db.session.commit()
+    latest = db.session.query(func.max(Show.end_time)).with_deleted().scalar() or datetime.utcnow()
+    page_size = app.config['PAST_SHOWS_PER_PAGE']
+    _, venue_cursor = past_show_page(Show.venue_id, venue, Show.artist, None, page_size)
+    _, artist_cursor = past_show_page(Show.artist_id, artist, Show.venue, None, page_size)
+    context = {
+      'app': app,
+      'venue': venue,
+      'quiet_venue': quiet_venue,
+      # second page of past shows, or the first if there is only one
+      'venue_cursor': venue_cursor or '',
+      'artist_cursor': artist_cursor or '',
+      'artist': artist,
+      'genre': (target.genres or ['Other'])[0],
+      'term': (target.name or 'a')[:3],
+      'window_start': datetime.utcnow().replace(hour=20, minute=0, second=0, microsecond=0) + timedelta(days=7),
+      'fixture_venue': fixture_venue.id,
+      'fixture_artist': fixture_artist.id,
+      # past every existing show, so the suite's bookings never clash
+      'slot_start': datetime(latest.year + 1, 1, 1),
+      'slots': itertools.count(),
+    }
+    db.session.remove()
+    return context
+
+
+def clean_up(app):
+  from extensions import db
+  from models import Venue, Artist, soft_delete, purge_deleted
+  with app.app_context():
+    marked = lambda model: model.query.filter(model.name.like(MARK + '%')).all()
+    for obj in marked(Venue) + marked(Artist):
+      soft_delete(obj)
+    db.session.commit()
+    purged = purge_deleted(db.session, batch_size=10000)
+    db.session.remove()
+    return purged
+
+
+class StatementCounter(object):
+
+  def __init__(self):
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    self.count = 0
+    event.listen(Engine, 'after_cursor_execute', self.record)
+
+  def record(self, *args):
+    self.count += 1
+
+
+def percentile(values, fraction):
+  values = sorted(values)
+  return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run_scenario(client, context, counter, scenario, iterations, warmup):
+  def once():
+    path, options = scenario.request(context)
+    counter.count = 0
+    started = time.perf_counter()
+    response = client.open(path, method=scenario.method, **options)
+    response.get_data()
+    elapsed = time.perf_counter() - started
+    return path, response.status_code, elapsed, counter.count
+
+  for _ in range(warmup):
+    once()
+  samples = [once() for _ in range(iterations)]
+  # memory in a separate pass: tracing would skew the timings
+  tracemalloc.start()
+  once()
+  _, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  latencies = [elapsed * 1000 for _, _, elapsed, _ in samples]
+  statuses = sorted({status for _, status, _, _ in samples})
+  return {
+    'endpoint': scenario.endpoint,
+    'method': scenario.method,
+    'path': samples[-1][0],
+    'status': statuses[0] if len(statuses) == 1 else statuses,
+    'p50_ms': round(statistics.median(latencies), 2),
+    'p95_ms': round(percentile(latencies, 0.95), 2),
+    'mean_ms': round(statistics.mean(latencies), 2),
+    'min_ms': round(min(latencies), 2),
+    'queries': max(queries for _, _, _, queries in samples),
+    'peak_memory_kb': round(peak / 1024.0, 1),
+  }
+
+
+def git_commit():
+  try:
+    return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                   stderr=subprocess.DEVNULL).decode('utf-8').strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def dataset_counts(app):
+  from extensions import db
+  from models import Venue, Artist, Show
+  with app.app_context():
+    counts = {model.__tablename__: db.session.query(model).count() for model in (Venue, Artist, Show)}
+    db.session.remove()
+    return counts
+
+
+def compare(baseline, current, threshold):
+  # routes whose median latency grew by more than `threshold` (a ratio) or
+  # that now issue more statements
+  regressions = []
+  for name, result in current['routes'].items():
+    before = baseline['routes'].get(name)
+    if not before or 'error' in before or 'error' in result:
+      continue
+    if result['p50_ms'] > before['p50_ms'] * threshold:
+      regressions.append('{}: p50 {} ms -> {} ms'.format(name, before['p50_ms'], result['p50_ms']))
+    if result['queries'] > before['queries']:
+      regressions.append('{}: {} -> {} queries'.format(name, before['queries'], result['queries']))
+  return regressions
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark every route through the test client.')
+  parser.add_argument('--iterations', type=int, default=20, help='timed requests per route')
+  parser.add_argument('--warmup', type=int, default=2, help='untimed requests per route first')
+  parser.add_argument('--only', help='regex: only routes whose name matches')
+  parser.add_argument('--page-cache', action='store_true', help='leave the detail page cache on (warm numbers)')
+  parser.add_argument('--output', help='also write the JSON result here')
+  parser.add_argument('--compare', help='earlier JSON result to check for regressions')
+  parser.add_argument('--threshold', type=float, default=1.25, help='allowed p50 growth ratio for --compare')
+  args = parser.parse_args()
+
+  from app import create_app
+  settings = {'WTF_CSRF_ENABLED': False, 'SQL_INSTRUMENTATION': False,
+              # thumbnails from the local image server, into an empty cache
+              'IMAGE_PROXY_ALLOW_PRIVATE': True, 'IMAGE_CACHE_DIR': tempfile.mkdtemp()}
+  if not args.page_cache:
+    settings.update(CACHE_BACKEND='lru', CACHE_MAX_ENTRIES=0)
+  app = create_app(**settings)
+
+  missing = uncovered(app)
+  if missing:
+    sys.exit('No benchmark scenario for: {}'.format(', '.join(missing)))
+  scenarios = [scenario for scenario in SCENARIOS if not args.only or re.search(args.only, scenario.name)]
+
+  context = prepare(app)
+  counter = StatementCounter()
+  client = app.test_client()
+  routes = {}
+  try:
+    for scenario in scenarios:
+      try:
+        route = run_scenario(client, context, counter, scenario, args.iterations, args.warmup)
+      except Exception as e:
+        # e.g. PostgreSQL-only SQL on another database: report it, go on
+        routes[scenario.name] = {'endpoint': scenario.endpoint, 'method': scenario.method, 'error': repr(e)}
+        print('{:32} failed: {!r}'.format(scenario.name, e), file=sys.stderr)
+        continue
+      routes[scenario.name] = route
+      print('{:32} {:>9.2f} ms p50 {:>9.2f} ms p95 {:>5} queries {:>9.1f} KiB  {}'.format(
+        scenario.name, route['p50_ms'], route['p95_ms'], route['queries'], route['peak_memory_kb'],
+        route['status']), file=sys.stderr)
+  finally:
+    clean_up(app)
+
+  result = {
+    'meta': {
+      'commit': git_commit(),
+      'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+      'python': platform.python_version(),
+      'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+      'dataset': dataset_counts(app),
+      'iterations': args.iterations,
+      'page_cache': args.page_cache,
+    },
+    'routes': routes,
+  }
+  print(json.dumps(result, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(result, f, indent=2)
+
+  failures = ['{}: {}'.format(name, route['error']) for name, route in routes.items() if 'error' in route]
+  failures += ['{}: status {}'.format(name, route['status']) for name, route in routes.items()
+               if 'error' not in route and (not isinstance(route['status'], int) or route['status'] >= 400)]
+  if args.compare:
+    with open(args.compare) as f:
+      failures += compare(json.load(f), result, args.threshold)
+  if failures:
+    sys.exit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,116 @@
+#----------------------------------------------------------------------------#
+# Search benchmark.
+#
+# Times ranked search and typeahead for venues and artists through both
+# implementations in search.py, on the configured database: the pg_trgm
+# queries (PostgreSQL only) and the in-process trigram index (any database;
+# building it is timed, and its memory measured, separately). Terms are
+# drawn from the data with a fixed seed: whole words, three-letter prefixes
+# and words with two letters swapped. Load a dataset of the size to compare
+# with benchmarks.dataset first.
+#
+#   python -m benchmarks.search --terms 50 --iterations 5 --output search.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def sample_terms(session, model, count, seed):
+  rng = random.Random(seed)
+  names = [name for name, in session.query(model.name).order_by(model.id).limit(10000) if name]
+  words = [word for name in rng.sample(names, min(len(names), count)) for word in name.split() if len(word) > 3]
+  rng.shuffle(words)
+  terms = []
+  for word in words[:count]:
+    kind = len(terms) % 3
+    if kind == 0:
+      terms.append(word)
+    elif kind == 1:
+      terms.append(word[:3])
+    else:
+      i = rng.randrange(len(word) - 1)
+      terms.append(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+  return terms
+
+
+def timings(run, terms, iterations):
+  times = []
+  for _ in range(iterations):
+    for term in terms:
+      started = time.perf_counter()
+      run(term)
+      times.append((time.perf_counter() - started) * 1000)
+  times.sort()
+  return {
+    'p50_ms': round(statistics.median(times), 3),
+    'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))], 3),
+    'mean_ms': round(statistics.mean(times), 3),
+  }
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Compare pg_trgm and in-process search latency.')
+  parser.add_argument('--terms', type=int, default=50, help='terms sampled per entity')
+  parser.add_argument('--iterations', type=int, default=5, help='passes over the terms')
+  parser.add_argument('--seed', type=int, default=1)
+  parser.add_argument('--output', help='also write the JSON result here')
+  args = parser.parse_args()
+
+  import search
+  from app import create_app
+  from extensions import db
+  from models import Venue, Artist
+
+  app = create_app(SQL_INSTRUMENTATION=False)
+  result = {'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0], 'entities': {}}
+  with app.app_context():
+    session = db.session
+    limit = app.config['SEARCH_RESULTS_LIMIT']
+    typeahead_limit = app.config['TYPEAHEAD_LIMIT']
+    postgresql = search._is_postgresql(session, Venue)
+    for model in (Venue, Artist):
+      terms = [search.normalize(term) for term in sample_terms(session, model, args.terms, args.seed)]
+      index = search.InProcessIndex(model)
+      tracemalloc.start()
+      started = time.perf_counter()
+      index.build(session)
+      build_ms = (time.perf_counter() - started) * 1000
+      _, peak = tracemalloc.get_traced_memory()
+      tracemalloc.stop()
+      entity = {
+        'rows': len(index.documents),
+        'terms': len(terms),
+        'in_process': {
+          'build_ms': round(build_ms, 1),
+          'build_peak_memory_kb': round(peak / 1024, 1),
+          'search': timings(lambda term: index.search(session, term, limit), terms, args.iterations),
+          'suggest': timings(lambda term: index.suggest(term, typeahead_limit), terms, args.iterations),
+        },
+      }
+      if postgresql:
+        entity['pg_trgm'] = {
+          'search': timings(lambda term: search._trigram_search(session, model, term, limit), terms, args.iterations),
+          'suggest': timings(lambda term: search._trigram_suggest(session, model, term, typeahead_limit),
+                             terms, args.iterations),
+        }
+      session.remove()
+      result['entities'][model.__tablename__] = entity
+
+  print(json.dumps(result, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+  main()
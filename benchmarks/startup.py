@@ -0,0 +1,129 @@
+#----------------------------------------------------------------------------#
+# Startup benchmark.
+#
+# Measures, in fresh interpreters, what a worker pays before it can serve:
+# importing `app`, running create_app(), and the first request. It also
+# forks a worker from the built app, the way gunicorn --preload does, and
+# reports the memory that worker does not share with the master after one
+# request. Results are printed (and optionally written) as JSON, and
+# --max-* budgets make the run fail, so a regression shows up in CI.
+#
+#   python -m benchmarks.startup --runs 5 --output startup.json
+#----------------------------------------------------------------------------#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kb(field, path='/proc/self/status'):
+  # Linux only; None elsewhere
+  try:
+    with open(path) as f:
+      for line in f:
+        if line.startswith(field + ':'):
+          return int(line.split()[1])
+  except IOError:
+    pass
+  return None
+
+
+def private_kb():
+  clean = memory_kb('Private_Clean', '/proc/self/smaps_rollup')
+  dirty = memory_kb('Private_Dirty', '/proc/self/smaps_rollup')
+  return None if clean is None or dirty is None else clean + dirty
+
+
+def child():
+  # one measurement in this (fresh) interpreter, printed as JSON
+  sys.path.insert(0, ROOT)
+  os.chdir(ROOT)
+  modules = len(sys.modules)
+  started = time.perf_counter()
+  import app
+  imported = time.perf_counter()
+  instance = app.create_app(SQL_INSTRUMENTATION=False)
+  created = time.perf_counter()
+  result = {
+    'import_ms': round((imported - started) * 1000, 1),
+    'create_app_ms': round((created - imported) * 1000, 1),
+    'modules_loaded': len(sys.modules) - modules,
+    'forms_imported': 'forms' in sys.modules,
+    'rss_kb': memory_kb('VmRSS'),
+  }
+  read, write = os.pipe()
+  pid = os.fork()
+  if pid == 0:
+    os.close(read)
+    started = time.perf_counter()
+    status = instance.test_client().get('/').status_code
+    worker = {
+      'first_request_ms': round((time.perf_counter() - started) * 1000, 1),
+      'first_request_status': status,
+      'worker_rss_kb': memory_kb('VmRSS'),
+      'worker_private_kb': private_kb(),
+    }
+    os.write(write, json.dumps(worker).encode('utf-8'))
+    os._exit(0)
+  os.close(write)
+  with os.fdopen(read) as f:
+    result.update(json.loads(f.read()))
+  os.waitpid(pid, 0)
+  print(json.dumps(result))
+
+
+def run(runs):
+  samples = []
+  for _ in range(runs):
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.startup', '--child'], cwd=ROOT)
+    samples.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+  summary = {'runs': runs, 'python': sys.version.split()[0]}
+  for key, value in samples[0].items():
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+      summary[key] = statistics.median(sample[key] for sample in samples)
+    else:
+      summary[key] = value
+  return summary
+
+
+BUDGETS = (
+  ('max_import_ms', 'import_ms'),
+  ('max_create_app_ms', 'create_app_ms'),
+  ('max_worker_private_kb', 'worker_private_kb'),
+)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Measure app import time and per-worker memory.')
+  parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to sample (median reported)')
+  parser.add_argument('--output', help='also write the JSON result here')
+  parser.add_argument('--max-import-ms', type=float)
+  parser.add_argument('--max-create-app-ms', type=float)
+  parser.add_argument('--max-worker-private-kb', type=float)
+  parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+  args = parser.parse_args()
+  if args.child:
+    return child()
+  summary = run(args.runs)
+  print(json.dumps(summary, indent=2))
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(summary, f, indent=2)
+  failures = ['{} = {} exceeds {}'.format(key, summary[key], getattr(args, budget))
+              for budget, key in BUDGETS
+              if getattr(args, budget) is not None and summary.get(key) is not None
+              and summary[key] > getattr(args, budget)]
+  if summary['forms_imported']:
+    failures.append('forms was imported while building the app')
+  if failures:
+    sys.exit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+  main()
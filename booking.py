@@ -0,0 +1,88 @@
+#----------------------------------------------------------------------------#
+# Booking.
+#
+# In-memory double-booking check for a batch of proposed shows. Existing
+# shows for the venues/artists involved are loaded once into per-venue and
+# per-artist interval indexes; every candidate is then checked, and booked
+# if free, in O(log n). On PostgreSQL the exclusion constraints on "Show"
+# remain the authority; this lets a batch be validated without one query
+# per candidate and reports every conflict at once.
+#----------------------------------------------------------------------------#
+
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import timedelta
+
+Booking = namedtuple('Booking', ['venue_id', 'artist_id', 'start_time', 'end_time'])
+
+# the longest show accepted (also a CHECK constraint on "Show"). Overlap
+# searches bound start_time from below with it, which lets PostgreSQL skip
+# the "Show" partitions a window cannot reach.
+MAX_DURATION = timedelta(hours=24)
+
+
+class IntervalIndex(object):
+  # Half-open [start, end) intervals. The intervals given up front may
+  # overlap each other (legacy rows), so they are kept sorted by start with
+  # a running maximum of their ends: the ones starting before `end` overlap
+  # [start, end) iff the largest of their ends is past `start`. Intervals
+  # added later are always conflict-free, hence disjoint, and live in a
+  # plain sorted list where only the predecessor can overlap.
+
+  def __init__(self, intervals=()):
+    self._fixed = sorted(intervals, key=lambda interval: interval[:2])
+    self._fixed_starts = [interval[0] for interval in self._fixed]
+    self._max_ends = []
+    for interval in self._fixed:
+      self._max_ends.append(max(self._max_ends[-1], interval[1]) if self._max_ends else interval[1])
+    self._added = []
+
+  def overlapping(self, start, end):
+    # label of one interval overlapping [start, end), or None
+    i = bisect_left(self._fixed_starts, end)
+    if i and self._max_ends[i - 1] > start:
+      while self._fixed[i - 1][1] <= start:
+        i -= 1
+      return self._fixed[i - 1][2]
+    i = bisect_left(self._added, (end,))
+    if i and self._added[i - 1][1] > start:
+      return self._added[i - 1][2]
+    return None
+
+  def add(self, start, end, label):
+    insort(self._added, (start, end, label))
+
+
+class BookingBook(object):
+
+  def __init__(self, existing):
+    # existing: iterable of (venue_id, artist_id, start_time, end_time, label)
+    by_key = {}
+    for venue_id, artist_id, start_time, end_time, label in existing:
+      by_key.setdefault(('venue', venue_id), []).append((start_time, end_time, label))
+      by_key.setdefault(('artist', artist_id), []).append((start_time, end_time, label))
+    self._indexes = {key: IntervalIndex(intervals) for key, intervals in by_key.items()}
+
+  def _index(self, key):
+    if key not in self._indexes:
+      self._indexes[key] = IntervalIndex()
+    return self._indexes[key]
+
+  def conflicts(self, booking):
+    errors = []
+    if booking.end_time <= booking.start_time:
+      return ['end_time must be after start_time']
+    if booking.end_time - booking.start_time > MAX_DURATION:
+      return ['a show can last at most {} hours'.format(int(MAX_DURATION.total_seconds() // 3600))]
+    for kind, id in (('venue', booking.venue_id), ('artist', booking.artist_id)):
+      label = self._index((kind, id)).overlapping(booking.start_time, booking.end_time)
+      if label is not None:
+        errors.append('{} {} is already booked ({})'.format(kind, id, label))
+    return errors
+
+  def book(self, booking, label):
+    errors = self.conflicts(booking)
+    if not errors:
+      self._index(('venue', booking.venue_id)).add(booking.start_time, booking.end_time, label)
+      self._index(('artist', booking.artist_id)).add(booking.start_time, booking.end_time, label)
+    return errors
@@ -0,0 +1,223 @@
+#----------------------------------------------------------------------------#
+# Bulk IO.
+#
+# Streaming readers and batched writers used by the `flask import` and
+# `flask export` commands. Nothing here holds more than one chunk of rows
+# in memory.
+#----------------------------------------------------------------------------#
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import select, and_, func, text
+from werkzeug.datastructures import MultiDict
+
+
+def detect_format(path):
+  return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def read_rows(path, format=None):
+  # yields (line number, row dict) one record at a time
+  format = format or detect_format(path)
+  with io.open(path, encoding='utf-8', newline='') as f:
+    if format == 'csv':
+      reader = csv.DictReader(f)
+      for row in reader:
+        yield reader.line_num, row
+    else:
+      for line_num, line in enumerate(f, 1):
+        if line.strip():
+          yield line_num, json.loads(line)
+
+
+def chunked(iterable, size):
+  iterator = iter(iterable)
+  while True:
+    chunk = list(islice(iterator, size))
+    if not chunk:
+      return
+    yield chunk
+
+
+def form_data(row, list_fields=('genres',)):
+  # turn a CSV/NDJSON record into the MultiDict a submitted form would carry
+  data = MultiDict()
+  for key, value in row.items():
+    if value is None or value is False:
+      continue
+    if value is True:
+      data.add(key, 'y')
+    elif isinstance(value, list):
+      data.setlist(key, value)
+    elif key in list_fields:
+      data.setlist(key, [item.strip() for item in value.split(',') if item.strip()])
+    else:
+      data.add(key, value)
+  return data
+
+
+def pg_copy_value(value):
+  if value is None:
+    return None
+  if isinstance(value, (list, tuple)):
+    # array literal, every element quoted
+    return '{' + ','.join('"' + item.replace('\\', '\\\\').replace('"', '\\"') + '"'
+                          for item in value) + '}'
+  if isinstance(value, bool):
+    return 't' if value else 'f'
+  return value
+
+
+def copy_rows(connection, table, columns, rows):
+  # PostgreSQL COPY ... FROM STDIN over the session's DBAPI connection
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  for row in rows:
+    writer.writerow(['\\N' if value is None else value
+                     for value in (pg_copy_value(row[column]) for column in columns)])
+  buffer.seek(0)
+  cursor = connection.connection.cursor()
+  try:
+    cursor.copy_expert('COPY "{}" ({}) FROM STDIN WITH (FORMAT csv, NULL \'\\N\')'.format(
+      table.name, ', '.join('"{}"'.format(column) for column in columns)), buffer)
+  finally:
+    cursor.close()
+
+
+def write_rows(connection, table, columns, rows):
+  if not rows:
+    return
+  if connection.dialect.name == 'postgresql':
+    copy_rows(connection, table, columns, rows)
+  else:
+    connection.execute(table.insert(), [{column: row[column] for column in columns} for row in rows])
+
+
+def reserve_ids(connection, table, count):
+  # `count` new ids for `table` in one statement, so the session can insert
+  # rows that already carry them in one executemany instead of one
+  # INSERT ... RETURNING per row
+  if connection.dialect.name == 'postgresql':
+    return [id for id, in connection.execute(
+      text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+      table='"{}"'.format(table.name), count=count)]
+  # SQLite (tests, development) has no sequences, and one writer at a time
+  start = connection.execute(select([func.coalesce(func.max(table.c.id), 0)])).scalar() + 1
+  return list(range(start, start + count))
+
+
+def stream_table(connection, table, columns, batch_size, criteria=()):
+  # server-side cursor: rows arrive batch_size at a time, ordered by id
+  result = connection.execution_options(stream_results=True).execute(
+    select([table.c[column] for column in columns]).where(and_(*criteria)).order_by(table.c.id))
+  try:
+    while True:
+      rows = result.fetchmany(batch_size)
+      if not rows:
+        return
+      yield rows
+  finally:
+    result.close()
+
+
+def export_value(value):
+  if isinstance(value, datetime):
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+  return value
+
+
+def encode_csv(batches, columns, table):
+  buffer = io.StringIO()
+  writer = csv.writer(buffer)
+  writer.writerow(columns)
+  for rows in batches:
+    for row in rows:
+      writer.writerow([','.join(value) if isinstance(value, list) else export_value(value)
+                       for value in row])
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+  if buffer.tell():
+    yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(batches, columns, table):
+  for rows in batches:
+    yield ''.join(json.dumps(dict(zip(columns, map(export_value, row)))) + '\n'
+                  for row in rows).encode('utf-8')
+
+
+class _ParquetSink(io.RawIOBase):
+  # write-only file that hands back what was written since the last drain,
+  # while reporting the absolute position the Parquet footer offsets need
+
+  def __init__(self):
+    super(_ParquetSink, self).__init__()
+    self.chunks = []
+    self.position = 0
+
+  def writable(self):
+    return True
+
+  def write(self, data):
+    self.chunks.append(bytes(data))
+    self.position += len(data)
+    return len(data)
+
+  def tell(self):
+    return self.position
+
+  def drain(self):
+    data = b''.join(self.chunks)
+    self.chunks = []
+    return data
+
+
+def arrow_type(pa, column):
+  python_type = column.type.python_type
+  if python_type is list:
+    return pa.list_(pa.string())
+  return {
+    int: pa.int64(),
+    bool: pa.bool_(),
+    datetime: pa.timestamp('us'),
+    str: pa.string(),
+  }[python_type]
+
+
+def encode_parquet(batches, columns, table):
+  # optional dependency: only needed when parquet output is requested
+  import pyarrow as pa
+  import pyarrow.parquet as pq
+  schema = pa.schema([(column, arrow_type(pa, table.c[column])) for column in columns])
+  sink = _ParquetSink()
+  writer = pq.ParquetWriter(sink, schema)
+  try:
+    for rows in batches:
+      # one row group per batch
+      writer.write_table(pa.Table.from_pydict(
+        {column: [row[i] for row in rows] for i, column in enumerate(columns)}, schema=schema))
+      yield sink.drain()
+  finally:
+    writer.close()
+  yield sink.drain()
+
+
+EXPORT_FORMATS = {
+  'csv': (encode_csv, 'text/csv'),
+  'ndjson': (encode_ndjson, 'application/x-ndjson'),
+  'parquet': (encode_parquet, 'application/vnd.apache.parquet'),
+}
+
+
+def gzip_chunks(chunks):
+  compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+  for chunk in chunks:
+    data = compressor.compress(chunk)
+    if data:
+      yield data
+  yield compressor.flush()
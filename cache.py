@@ -0,0 +1,122 @@
+#----------------------------------------------------------------------------#
+# Cache.
+#
+# Small pluggable key/value cache for rendered pages. The in-process LRU is
+# the default; RedisCache wraps any client exposing get/set/delete, so a
+# real redis.StrictRedis or a local stand-in can be plugged in. Entries
+# expire after `timeout` seconds (CACHE_TIMEOUT, and CACHE_LRU_TIMEOUT for
+# the LRU, which only the committing process can invalidate), or sooner
+# when set() is given a shorter one.
+#----------------------------------------------------------------------------#
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class BaseCache(object):
+  backend = None
+
+  def __init__(self, timeout=None):
+    self.timeout = timeout
+    self.hits = 0
+    self.misses = 0
+    self._stats_lock = threading.Lock()
+
+  def get(self, key):
+    value = self._get(key)
+    with self._stats_lock:
+      if value is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+    return value
+
+  def set(self, key, value, timeout=None):
+    # timeout: seconds this entry stays valid, capped by the cache's own
+    timeouts = [t for t in (timeout, self.timeout) if t is not None]
+    self._set(key, value, min(timeouts) if timeouts else None)
+
+  def delete_many(self, keys):
+    if keys:
+      self._delete_many(list(keys))
+
+  def stats(self):
+    return {'backend': self.backend, 'hits': self.hits, 'misses': self.misses}
+
+
+class LRUCache(BaseCache):
+  backend = 'lru'
+
+  def __init__(self, max_entries=1024, timeout=None):
+    super(LRUCache, self).__init__(timeout)
+    self.max_entries = max_entries
+    # key -> (monotonic deadline or None, value)
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      deadline, value = entry
+      if deadline is not None and deadline <= time.monotonic():
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      return value
+
+  def _set(self, key, value, timeout):
+    with self._lock:
+      self._entries[key] = (None if timeout is None else time.monotonic() + timeout, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def _delete_many(self, keys):
+    with self._lock:
+      for key in keys:
+        self._entries.pop(key, None)
+
+  def stats(self):
+    stats = super(LRUCache, self).stats()
+    stats['entries'] = len(self._entries)
+    return stats
+
+
+class RedisCache(BaseCache):
+  backend = 'redis'
+
+  def __init__(self, client, prefix='fyyur:', timeout=None):
+    super(RedisCache, self).__init__(timeout)
+    self.client = client
+    self.prefix = prefix
+
+  def _get(self, key):
+    value = self.client.get(self.prefix + key)
+    if isinstance(value, bytes):
+      value = value.decode('utf-8')
+    return value
+
+  def _set(self, key, value, timeout):
+    # whole seconds, rounded down so the entry does not outlive its deadline
+    self.client.set(self.prefix + key, value, ex=None if timeout is None else max(1, math.floor(timeout)))
+
+  def _delete_many(self, keys):
+    self.client.delete(*[self.prefix + key for key in keys])
+
+
+def from_config(config):
+  backend = config.get('CACHE_BACKEND', 'lru')
+  if backend == 'lru':
+    # per process, so also bounded by CACHE_LRU_TIMEOUT: writes committed by
+    # other processes cannot clear it
+    timeouts = [t for t in (config.get('CACHE_TIMEOUT'), config.get('CACHE_LRU_TIMEOUT')) if t is not None]
+    return LRUCache(config.get('CACHE_MAX_ENTRIES', 1024), min(timeouts) if timeouts else None)
+  if backend == 'redis':
+    import redis
+    client = redis.StrictRedis.from_url(config['CACHE_REDIS_URL'])
+    return RedisCache(client, timeout=config.get('CACHE_TIMEOUT'))
+  raise ValueError('Unknown CACHE_BACKEND: {}'.format(backend))
@@ -0,0 +1,140 @@
+#----------------------------------------------------------------------------#
+# Commands.
+#
+# Registered on the app by create_app(); forms are imported when a command
+# runs, not when the CLI starts.
+#----------------------------------------------------------------------------#
+
+import json
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+import assets
+import batch
+import bulk
+import partitions
+from api import EXPORT_MODELS, export_stream
+from extensions import db
+from models import AreaSummary, GenreSummary, rebuild_summaries, purge_deleted, invalidate_row_pages
+
+@click.command('import')
+@click.argument('entity', type=click.Choice(sorted(batch.ENTITIES)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows validated and written per transaction.')
+@click.option('--rejects', type=click.File('w'), help='Write rejected rows and their errors here as NDJSON.')
+@with_appcontext
+def import_command(entity, path, format, chunk_size, rejects):
+  """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+  table = batch.ENTITIES[entity][0].__table__
+  form = batch.make_form(entity)
+  imported = rejected = 0
+  started = time.time()
+
+  def reject(line_num, record, errors):
+    if rejects:
+      rejects.write(json.dumps({'line': line_num, 'row': record, 'errors': errors}) + '\n')
+
+  for chunk in bulk.chunked(bulk.read_rows(path, format), chunk_size):
+    rows, errors = batch.validate(db.session, entity, [record for _, record in chunk], form)
+    for index in sorted(errors):
+      rejected += 1
+      reject(chunk[index][0], chunk[index][1], errors[index])
+    rows = [rows[index] for index in sorted(rows)]
+    now = datetime.utcnow()
+    for row in rows:
+      row['updated_at'] = now
+    columns = list(rows[0]) if rows else []
+    try:
+      bulk.write_rows(db.session.connection(), table, columns, rows)
+      db.session.commit()
+    except Exception:
+      db.session.rollback()
+      raise
+    invalidate_row_pages(rows)
+    imported += len(rows)
+    elapsed = time.time() - started
+    click.echo('{}: {} imported, {} rejected ({:.0f} rows/s)'.format(
+      entity, imported, rejected, (imported + rejected) / elapsed if elapsed else 0))
+  if imported:
+    # COPY/executemany bypass the flush hooks, so recount from scratch
+    rebuild_summaries()
+  elapsed = time.time() - started
+  click.echo('Done: {} {} imported, {} rejected in {:.1f}s'.format(entity, imported, rejected, elapsed))
+
+@click.command('refresh-summaries')
+@with_appcontext
+def refresh_summaries_command():
+  """Rebuild the area and genre summary tables (run periodically)."""
+  rebuild_summaries()
+  click.echo('Summaries rebuilt: {} areas, {} genres'.format(
+    AreaSummary.query.count(), GenreSummary.query.count()))
+
+@click.command('export')
+@click.argument('entity', type=click.Choice(sorted(EXPORT_MODELS)))
+@click.argument('output', type=click.File('wb'), default='-')
+@click.option('--format', type=click.Choice(sorted(bulk.EXPORT_FORMATS)), default='ndjson', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output (implied by a .gz OUTPUT).')
+@click.option('--batch-size', default=None, type=int, help='Rows fetched per server-side cursor round trip.')
+@with_appcontext
+def export_command(entity, output, format, compress, batch_size):
+  """Stream venues, artists or shows to OUTPUT as CSV, NDJSON or Parquet."""
+  chunks = export_stream(db.engine, EXPORT_MODELS[entity], format,
+                         batch_size or current_app.config['EXPORT_BATCH_SIZE'])
+  if compress or output.name.endswith('.gz'):
+    chunks = bulk.gzip_chunks(chunks)
+  for chunk in chunks:
+    output.write(chunk)
+
+@click.command('purge-deleted')
+@click.option('--batch-size', default=None, type=int, help='Shows deleted per transaction.')
+@click.option('--pause', default=None, type=float, help='Seconds to sleep between batches.')
+@click.option('--older-than', default=0, show_default=True, help='Only purge rows soft-deleted this many minutes ago.')
+@click.option('--every', default=None, type=float, help='Keep running, purging every this many seconds.')
+@with_appcontext
+def purge_deleted_command(batch_size, pause, older_than, every):
+  """Remove soft-deleted venues and artists, and their shows, in batches."""
+  batch_size = batch_size or current_app.config['PURGE_BATCH_SIZE']
+  pause = current_app.config['PURGE_PAUSE_SECONDS'] if pause is None else pause
+  while True:
+    purged = purge_deleted(db.session, batch_size, timedelta(minutes=older_than), pause, click.echo)
+    click.echo('Purged {} venues, {} artists, {} shows'.format(
+      purged['Venue'], purged['Artist'], purged['Show']))
+    if every is None:
+      return
+    time.sleep(every)
+
+@click.command('partitions')
+@click.option('--ahead', default=None, type=int, help='Months past the current one to create partitions for.')
+@click.option('--archive-after', default=None, type=int,
+              help='Detach partitions that ended more than this many months ago.')
+@click.option('--drop', is_flag=True, help='Drop detached partitions instead of moving them to the archive schema.')
+@with_appcontext
+def partitions_command(ahead, archive_after, drop):
+  """Create upcoming monthly Show partitions and archive old ones (run periodically)."""
+  connection = db.session.connection()
+  if not partitions.is_partitioned(connection):
+    click.echo('"Show" is not partitioned; nothing to do.')
+    return
+  ahead = current_app.config['SHOW_PARTITION_MONTHS_AHEAD'] if ahead is None else ahead
+  archive_after = current_app.config['SHOW_PARTITION_RETENTION_MONTHS'] if archive_after is None else archive_after
+  this_month = partitions.month_start(datetime.utcnow())
+  created = partitions.ensure_partitions(connection, this_month, partitions.add_months(this_month, ahead))
+  archived = []
+  if archive_after is not None:
+    archived = partitions.archive_partitions(connection, partitions.add_months(this_month, -archive_after), drop)
+  db.session.commit()
+  click.echo('Created: {}'.format(', '.join(created) or 'none'))
+  click.echo('{}: {}'.format('Dropped' if drop else 'Archived', ', '.join(archived) or 'none'))
+
+@click.command('assets')
+@click.option('--clean', is_flag=True, help='Delete hashed files the new manifest no longer refers to.')
+@with_appcontext
+def assets_command(clean):
+  """Bundle, minify, fingerprint and precompress static files into static/dist (run on deploy)."""
+  manifest = assets.build(current_app.static_folder, current_app.static_url_path, clean)
+  for name, path in sorted(manifest['bundles'].items()):
+    click.echo('{} -> {}'.format(name, path))
+  click.echo('{} files fingerprinted'.format(len(manifest['files'])))
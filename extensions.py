@@ -0,0 +1,46 @@
+#----------------------------------------------------------------------------#
+# Extensions.
+#
+# Created unbound so that models, blueprints and commands can import them
+# without building an application; create_app() binds them to one.
+#----------------------------------------------------------------------------#
+
+from flask_sqlalchemy import SQLAlchemy, BaseQuery
+from sqlalchemy import event
+
+
+class SoftDeleteQuery(BaseQuery):
+  # Model.query and db.session.query() leave out soft-deleted rows of every
+  # model that defines live_criteria(); with_deleted() opts a query out.
+  _with_deleted = False
+  _deleted_excluded = False
+
+  def with_deleted(self):
+    query = self._clone()
+    query._with_deleted = True
+    return query
+
+
+@event.listens_for(SoftDeleteQuery, 'before_compile', retval=True, bake_ok=True)
+def exclude_deleted(query):
+  if query._with_deleted or query._deleted_excluded:
+    return query
+  seen = set()
+  for description in query.column_descriptions:
+    entity = description['entity']
+    if isinstance(entity, type) and hasattr(entity, 'live_criteria') and entity not in seen:
+      seen.add(entity)
+      # added at compile time, so also after limit()/offset()
+      query = query.enable_assertions(False).filter(*entity.live_criteria())
+  query._deleted_excluded = True
+  return query
+
+
+db = SQLAlchemy(query_class=SoftDeleteQuery)
+
+
+def init_migrate(app):
+  # Flask-Migrate pulls in all of alembic, which only `flask db` needs, so
+  # it is imported here rather than in every worker
+  from flask_migrate import Migrate
+  Migrate(app, db)
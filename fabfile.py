@@ -6,9 +6,17 @@ from fabric.contrib.console import confirm
 
 def test():
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        # the unit tests, on in-memory SQLite
+        result = local("python -m pytest -q tests", capture=True)
+        if not result.failed:
+            # every route against the local database: fails on errors, and on
+            # routes without a benchmark scenario
+            result = local(
+                "python -m benchmarks.routes --iterations 3 --warmup 1", capture=True
+            )
+        if not result.failed:
+            # the hot queries' plans: fails on a sequential scan of Show or Venue
+            result = local("python -m benchmarks.plans", capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -39,8 +47,9 @@ def heroku():
 
 
 def heroku_test():
+    # startup only: the route benchmark writes (and purges) rows
     local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
+        "heroku run python -m benchmarks.startup --runs 3"
     )
 
 
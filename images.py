@@ -0,0 +1,378 @@
+#----------------------------------------------------------------------------#
+# Image proxy.
+#
+# Venue and artist pictures are links to arbitrary external images. Pages
+# link /images/<kind>/<id>/<width>.<webp|jpg> instead, which fetches the
+# source once, scales it to fit a width x width box (never up) and keeps
+# both in a disk cache: sources named by the SHA-256 of their content,
+# thumbnails by that digest plus width and format, so venues sharing a
+# picture share its files. The least recently used files are evicted once
+# the cache outgrows IMAGE_CACHE_MAX_BYTES.
+#
+# Thumbnail URLs carry ?v=<hash of the link>, so editing a link changes
+# them and the responses can be cached as immutable. Rendering needs
+# Pillow; without it (or with IMAGE_PROXY off) pages link the originals.
+#----------------------------------------------------------------------------#
+
+import functools
+import hashlib
+import http.client
+import importlib.util
+import io
+import ipaddress
+import os
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+from flask import Blueprint, current_app, request, redirect, url_for, abort
+from extensions import db
+from models import Venue, Artist
+
+MODELS = {'venues': Venue, 'artists': Artist}
+# URL extension -> mimetype
+FORMATS = {'webp': 'image/webp', 'jpg': 'image/jpeg'}
+QUALITY = 80
+# bytes asked of the socket per read while fetching a source
+READ_SIZE = 64 * 1024
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# for thumbnail URLs without the current ?v=, and for redirects to originals
+SHORT_CACHE_CONTROL = 'public, max-age=3600'
+
+#----------------------------------------------------------------------------#
+# Disk cache.
+#----------------------------------------------------------------------------#
+
+def digest(data):
+  return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache(object):
+  # Files under `root`, each read refreshing its mtime; writes evict the
+  # oldest files down to 90% of `max_bytes` when the total goes over it.
+  # Several processes may share the directory: every write is an atomic
+  # rename, and each process recounts the total whenever it evicts.
+
+  def __init__(self, root, max_bytes):
+    self.root = root
+    self.max_bytes = max_bytes
+    self.size = None
+    self.lock = threading.Lock()
+    # one fetch per source at a time, striped by key
+    self.key_locks = [threading.Lock() for _ in range(64)]
+
+  def path(self, section, key):
+    return os.path.join(self.root, section, key[:2], key)
+
+  def key_lock(self, key):
+    return self.key_locks[int(key[:8], 16) % len(self.key_locks)]
+
+  def read(self, section, key):
+    path = self.path(section, key)
+    try:
+      with open(path, 'rb') as f:
+        data = f.read()
+      os.utime(path)
+    except FileNotFoundError:
+      # never written, or evicted since
+      return None
+    return data
+
+  def write(self, section, key, data):
+    path = self.path(section, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = '{}.{}.tmp'.format(path, threading.get_ident())
+    with open(partial, 'wb') as f:
+      f.write(data)
+    os.replace(partial, path)
+    with self.lock:
+      if self.size is None:
+        self.size = sum(size for _, size, _ in self.entries())
+      else:
+        self.size += len(data)
+      if self.size > self.max_bytes:
+        self.evict(self.max_bytes * 9 // 10)
+
+  def entries(self):
+    # (mtime, size, path) of every cached file
+    for directory, _, filenames in os.walk(self.root):
+      for filename in filenames:
+        path = os.path.join(directory, filename)
+        try:
+          stat = os.stat(path)
+        except FileNotFoundError:
+          continue
+        yield stat.st_mtime, stat.st_size, path
+
+  def evict(self, target):
+    entries = sorted(self.entries())
+    self.size = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+      if self.size <= target:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      self.size -= size
+
+#----------------------------------------------------------------------------#
+# Fetching and rendering.
+#----------------------------------------------------------------------------#
+
+def resolve(hostname, config):
+  # the address to connect to for `hostname`: the first it resolves to,
+  # provided every address it resolves to is on the public internet (or
+  # IMAGE_PROXY_ALLOW_PRIVATE is set); None otherwise
+  try:
+    addresses = [info[4][0] for info in socket.getaddrinfo(hostname, None, type=socket.SOCK_STREAM)]
+  except (socket.gaierror, UnicodeError):
+    return None
+  if not addresses:
+    return None
+  if not config['IMAGE_PROXY_ALLOW_PRIVATE'] and \
+      not all(ipaddress.ip_address(address.split('%')[0]).is_global for address in addresses):
+    return None
+  return addresses[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+  # Connects to the address that was checked, not to whatever the name
+  # resolves to by then, so a DNS answer that changes between the check and
+  # the connection (rebinding) cannot point the fetch at the private
+  # network. The Host header still carries the name.
+
+  def __init__(self, host, address, **kwargs):
+    super().__init__(host, **kwargs)
+    self.address = address
+
+  def connect(self):
+    self.sock = socket.create_connection((self.address, self.port), self.timeout, self.source_address)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+  # as above; the certificate is checked against the name, which is also
+  # sent as SNI
+
+  def __init__(self, host, address, **kwargs):
+    self.ssl_context = ssl.create_default_context()
+    super().__init__(host, context=self.ssl_context, **kwargs)
+    self.address = address
+
+  def connect(self):
+    sock = socket.create_connection((self.address, self.port), self.timeout, self.source_address)
+    self.sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+
+
+def _pinned_open(handler, connection_class, req):
+  address = resolve(urlsplit(req.full_url).hostname, handler.config)
+  if address is None:
+    raise urllib.error.URLError('not a public address')
+  return handler.do_open(functools.partial(connection_class, address=address), req)
+
+
+class _PinnedHTTPHandler(urllib.request.HTTPHandler):
+
+  def __init__(self, config):
+    super().__init__()
+    self.config = config
+
+  def http_open(self, req):
+    return _pinned_open(self, _PinnedHTTPConnection, req)
+
+
+class _PinnedHTTPSHandler(urllib.request.HTTPSHandler):
+
+  def __init__(self, config):
+    super().__init__()
+    self.config = config
+
+  def https_open(self, req):
+    return _pinned_open(self, _PinnedHTTPSConnection, req)
+
+
+class _RedirectHandler(urllib.request.HTTPRedirectHandler):
+  # redirects stay on http(s); each hop's address is checked and pinned by
+  # the handlers above
+
+  def redirect_request(self, req, fp, code, msg, headers, newurl):
+    if urlsplit(newurl).scheme not in ('http', 'https'):
+      return None
+    return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def fetch(url, config):
+  # the source image's bytes, or None if it cannot (or may not) be fetched
+  parts = urlsplit(url)
+  if parts.scheme not in ('http', 'https') or not parts.hostname:
+    return None
+  # no proxy handler: the connection goes straight to the checked address
+  opener = urllib.request.OpenerDirector()
+  for handler in (_PinnedHTTPHandler(config), _PinnedHTTPSHandler(config), _RedirectHandler(),
+                  urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor(),
+                  urllib.request.UnknownHandler()):
+    opener.add_handler(handler)
+  limit = config['IMAGE_MAX_SOURCE_BYTES']
+  # the timeout applies to each socket operation, so a server dripping a
+  # byte at a time would hold the worker indefinitely: the body is read a
+  # buffer at a time (read1 returns after one receive) against a deadline
+  # for the whole fetch, redirects included
+  deadline = time.monotonic() + config['IMAGE_FETCH_DEADLINE']
+  chunks, size = [], 0
+  try:
+    with opener.open(urllib.request.Request(url, headers={'User-Agent': 'Fyyur image proxy'}),
+                     timeout=config['IMAGE_FETCH_TIMEOUT']) as response:
+      while size <= limit:
+        if time.monotonic() > deadline:
+          return None
+        chunk = response.read1(min(READ_SIZE, limit + 1 - size))
+        if not chunk:
+          break
+        chunks.append(chunk)
+        size += len(chunk)
+  except (OSError, ValueError, http.client.HTTPException):
+    return None
+  return b''.join(chunks) if 0 < size <= limit else None
+
+
+def render(source, width, format, max_pixels):
+  # optional dependency: only imported when a thumbnail is rendered
+  from PIL import Image, ImageOps
+  try:
+    # open() only reads the header: refuse oversized images before any
+    # pixel data is decoded, well below Pillow's own bomb check
+    image = Image.open(io.BytesIO(source))
+    if image.size[0] * image.size[1] > max_pixels:
+      return None
+    # lets JPEG decoding skip straight to a reduced scale
+    image.draft('RGB', (width, width))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((width, width), Image.LANCZOS)
+    if image.mode not in ('RGB', 'RGBA'):
+      image = image.convert('RGBA' if image.mode in ('LA', 'PA') or 'transparency' in image.info else 'RGB')
+    if image.mode == 'RGBA' and format == 'jpg':
+      background = Image.new('RGB', image.size, 'white')
+      background.paste(image, mask=image.getchannel('A'))
+      image = background
+    output = io.BytesIO()
+    if format == 'jpg':
+      image.save(output, 'JPEG', quality=QUALITY, optimize=True, progressive=True)
+    else:
+      image.save(output, 'WEBP', quality=QUALITY, method=4)
+  except (OSError, ValueError, Image.DecompressionBombError):
+    # not an image Pillow can read
+    return None
+  return output.getvalue()
+
+
+class Thumbnails(object):
+
+  def __init__(self, config):
+    self.config = config
+    self.cache = DiskCache(config['IMAGE_CACHE_DIR'], config['IMAGE_CACHE_MAX_BYTES'])
+    # link hash -> time of the last failed fetch, so a broken link is not
+    # refetched on every page view
+    self.failures = {}
+
+  def failed(self, link_key):
+    if len(self.failures) >= 10000:
+      self.failures.clear()
+    self.failures[link_key] = time.time()
+
+  def get(self, link, width, format):
+    # (etag, thumbnail bytes), or None when the link gives no usable image
+    link_key = digest(link.encode('utf-8'))
+    failed = self.failures.get(link_key)
+    if failed and time.time() - failed < self.config['IMAGE_FAILURE_TTL']:
+      return None
+    with self.cache.key_lock(link_key):
+      source_key = self.cache.read('links', link_key)
+      source = None
+      if source_key:
+        source_key = source_key.decode('ascii')
+        name = '{}-{}.{}'.format(source_key, width, format)
+        data = self.cache.read('thumbnails', name)
+        if data is not None:
+          return name, data
+        source = self.cache.read('sources', source_key)
+      if source is None:
+        source = fetch(link, self.config)
+        if source is None:
+          return self.failed(link_key)
+        source_key = digest(source)
+        self.cache.write('sources', source_key, source)
+        self.cache.write('links', link_key, source_key.encode('ascii'))
+      name = '{}-{}.{}'.format(source_key, width, format)
+      data = render(source, width, format, self.config['IMAGE_MAX_PIXELS'])
+      if data is None:
+        return self.failed(link_key)
+      self.cache.write('thumbnails', name, data)
+      return name, data
+
+#----------------------------------------------------------------------------#
+# Template helpers.
+#----------------------------------------------------------------------------#
+
+def link_version(link):
+  return digest(link.encode('utf-8'))[:12]
+
+
+def enabled(app):
+  state = app.extensions['images']
+  if 'enabled' not in state:
+    state['enabled'] = app.config['IMAGE_PROXY'] and importlib.util.find_spec('PIL') is not None
+  return state['enabled']
+
+
+def image_url(obj, width, format='jpg'):
+  # the thumbnail URL for a venue's or artist's picture; None when pages
+  # should link the original
+  if not obj.image_link or not enabled(current_app):
+    return None
+  return url_for('images.thumbnail', kind=obj.__tablename__.lower() + 's', id=obj.id,
+                 width=width, format=format, v=link_version(obj.image_link))
+
+
+def image_srcset(obj, width, format='jpg'):
+  # 1x plus, when that size exists, 2x for high-density screens
+  srcset = ['{} 1x'.format(image_url(obj, width, format))]
+  if width * 2 in current_app.config['IMAGE_WIDTHS']:
+    srcset.append('{} 2x'.format(image_url(obj, width * 2, format)))
+  return ', '.join(srcset)
+
+
+def init_app(app):
+  app.extensions['images'] = {'thumbnails': Thumbnails(app.config)}
+  app.register_blueprint(bp)
+  app.add_template_global(image_url)
+  app.add_template_global(image_srcset)
+
+#----------------------------------------------------------------------------#
+# Serving.
+#----------------------------------------------------------------------------#
+
+bp = Blueprint('images', __name__)
+
+@bp.route('/images/<kind>/<int:id>/<int:width>.<format>')
+def thumbnail(kind, id, width, format):
+  if kind not in MODELS or format not in FORMATS or width not in current_app.config['IMAGE_WIDTHS']:
+    abort(404)
+  model = MODELS[kind]
+  link, = db.session.query(model.image_link).filter(model.id == id).first_or_404()
+  if not link:
+    abort(404)
+  result = enabled(current_app) and current_app.extensions['images']['thumbnails'].get(link, width, format)
+  if not result:
+    # let the browser try the original itself
+    response = redirect(link)
+    response.headers['Cache-Control'] = SHORT_CACHE_CONTROL
+    return response
+  etag, data = result
+  response = current_app.response_class(data, mimetype=FORMATS[format])
+  response.set_etag(etag)
+  response.headers['Cache-Control'] = \
+    CACHE_CONTROL if request.args.get('v') == link_version(link) else SHORT_CACHE_CONTROL
+  return response.make_conditional(request)
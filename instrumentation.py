@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# SQL instrumentation.
+#
+# Engine-wide cursor hooks that attribute every statement to the stats
+# object started for the current thread (one per request), so N+1 patterns
+# show up as a high query count or a repeated statement fingerprint.
+#----------------------------------------------------------------------------#
+
+import re
+import threading
+import time
+from collections import Counter
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%\(\w+\)s|:\w+|\?")
+_IN_LISTS = re.compile(r'\bIN \((?:\?, )*\?\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+  # statement shape with literals, bind parameters and IN-list lengths erased
+  statement = _LITERALS.sub('?', _WHITESPACE.sub(' ', statement).strip())
+  return _IN_LISTS.sub('IN (?)', statement)
+
+
+class QueryBudgetExceeded(Exception):
+  pass
+
+
+class QueryStats(object):
+
+  def __init__(self):
+    self.count = 0
+    self.duration = 0.0
+    self.fingerprints = Counter()
+
+  def record(self, statement, duration):
+    self.count += 1
+    self.duration += duration
+    self.fingerprints[fingerprint(statement)] += 1
+
+  def repeated(self, threshold):
+    return [(shape, count) for shape, count in self.fingerprints.most_common() if count > threshold]
+
+  def server_timing(self):
+    return 'db;dur={:.1f};desc="{} queries"'.format(self.duration * 1000, self.count)
+
+  def as_dict(self):
+    return {
+      'queries': self.count,
+      'db_ms': round(self.duration * 1000, 3),
+      'max_repeats': max(self.fingerprints.values()) if self.fingerprints else 0,
+    }
+
+  def check_budget(self, max_queries=None, max_repeats=None):
+    if max_queries is not None and self.count > max_queries:
+      raise QueryBudgetExceeded('{} queries issued, budget is {}'.format(self.count, max_queries))
+    if max_repeats is not None:
+      repeated = self.repeated(max_repeats)
+      if repeated:
+        shape, count = repeated[0]
+        raise QueryBudgetExceeded('statement repeated {} times (budget {}): {}'.format(count, max_repeats, shape))
+
+
+def start():
+  _local.stats = QueryStats()
+  return _local.stats
+
+
+def stop():
+  stats = getattr(_local, 'stats', None)
+  _local.stats = None
+  return stats
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  conn.info.setdefault('query_started', []).append(time.time())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+  started = conn.info['query_started'].pop()
+  stats = getattr(_local, 'stats', None)
+  if stats is not None:
+    stats.record(statement, time.time() - started)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+  if context.connection is not None and context.connection.info.get('query_started'):
+    context.connection.info['query_started'].pop()
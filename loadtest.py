@@ -0,0 +1,235 @@
+#----------------------------------------------------------------------------#
+# Load test.
+#
+# Drives the read endpoints of one or more running servers with a fixed
+# number of concurrent keep-alive connections and prints requests/sec and
+# latency percentiles per server, e.g. the WSGI and ASGI deployments side
+# by side:
+#
+#   gunicorn -w 4 --threads 8 --preload -b :5000 'app:create_app()'
+#   uvicorn --workers 4 --port 8000 --lifespan off asgi:application
+#   python loadtest.py http://127.0.0.1:5000 http://127.0.0.1:8000 -c 500 -d 30
+#
+# With --pool-sizes it sweeps the connection pool instead: for each
+# size:overflow pair it starts the --server command with DB_POOL_SIZE and
+# DB_MAX_OVERFLOW set, waits for it to answer, runs the load against the one
+# URL, records the pool counters from /metrics and stops the server, then
+# prints the p99 for each size:
+#
+#   python loadtest.py http://127.0.0.1:5000 -c 200 -d 30 --pool-sizes 2:0,5:10,10:20,20:20 \
+#     --server "gunicorn -w 4 --threads 8 -b :5000 'app:create_app()'"
+#
+# Standard library only, so it runs from any checkout.
+#----------------------------------------------------------------------------#
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shlex
+import subprocess
+import time
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+DEFAULT_PATHS = ('/venues', '/artists', '/shows', '/venues/1', '/artists/1',
+                 '/api/v1/venues', '/api/v1/shows')
+
+
+class Result(object):
+
+  def __init__(self):
+    self.latencies = []
+    self.errors = 0
+    self.statuses = {}
+
+  def record(self, status, latency):
+    self.statuses[status] = self.statuses.get(status, 0) + 1
+    if status >= 500:
+      self.errors += 1
+    self.latencies.append(latency)
+
+  def summary(self, elapsed):
+    latencies = sorted(self.latencies)
+
+    def percentile(p):
+      if not latencies:
+        return None
+      return round(latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000, 2)
+
+    return {
+      'requests': len(latencies),
+      'errors': self.errors,
+      'statuses': self.statuses,
+      'rps': round(len(latencies) / elapsed, 1),
+      'p50_ms': percentile(50),
+      'p90_ms': percentile(90),
+      'p99_ms': percentile(99),
+      'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+    }
+
+
+async def read_response(reader):
+  status_line = await reader.readline()
+  if not status_line:
+    raise ConnectionError('connection closed')
+  version, status = status_line.split()[:2]
+  headers = {}
+  while True:
+    line = await reader.readline()
+    if line in (b'\r\n', b'\n', b''):
+      break
+    name, _, value = line.decode('latin-1').partition(':')
+    headers[name.strip().lower()] = value.strip()
+  if 'content-length' in headers:
+    await reader.readexactly(int(headers['content-length']))
+  elif headers.get('transfer-encoding', '').lower() == 'chunked':
+    while True:
+      size = int((await reader.readline()).split(b';')[0], 16)
+      await reader.readexactly(size + 2)
+      if not size:
+        break
+  else:
+    await reader.read()
+    return int(status), False
+  connection = headers.get('connection', '').lower()
+  if version == b'HTTP/1.0':
+    return int(status), connection == 'keep-alive'
+  return int(status), connection != 'close'
+
+
+async def connection(url, paths, deadline, result):
+  reader = writer = None
+  while time.time() < deadline:
+    path = next(paths)
+    try:
+      if writer is None:
+        reader, writer = await asyncio.open_connection(url.hostname, url.port or 80)
+      started = time.time()
+      writer.write('GET {} HTTP/1.1\r\nHost: {}\r\nConnection: keep-alive\r\n\r\n'.format(
+        path, url.netloc).encode('latin-1'))
+      status, keep_alive = await read_response(reader)
+      result.record(status, time.time() - started)
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+      result.errors += 1
+      keep_alive = False
+      await asyncio.sleep(0.01)
+    if not keep_alive and writer is not None:
+      writer.close()
+      reader = writer = None
+  if writer is not None:
+    writer.close()
+
+
+async def run(base_url, paths, concurrency, duration):
+  url = urlsplit(base_url)
+  prefix = url.path.rstrip('/')
+  cycle = itertools.cycle([prefix + path for path in paths])
+  result = Result()
+  started = time.time()
+  await asyncio.gather(*[connection(url, cycle, started + duration, result)
+                         for _ in range(concurrency)])
+  return result.summary(time.time() - started)
+
+
+def parse_pool_sizes(value):
+  # "5:10,10:20" -> [(5, 10), (10, 20)]; a size alone has no overflow
+  sizes = []
+  for item in value.split(','):
+    size, _, overflow = item.partition(':')
+    sizes.append((int(size), int(overflow or 0)))
+  return sizes
+
+
+def start_server(command, base_url, pool_size, max_overflow, timeout=60):
+  env = dict(os.environ, DB_POOL_SIZE=str(pool_size), DB_MAX_OVERFLOW=str(max_overflow))
+  server = subprocess.Popen(shlex.split(command), env=env)
+  deadline = time.time() + timeout
+  while time.time() < deadline:
+    if server.poll() is not None:
+      raise SystemExit('server exited with status {}'.format(server.returncode))
+    try:
+      urlopen(base_url.rstrip('/') + '/metrics', timeout=1).close()
+      return server
+    except HTTPError:
+      return server
+    except OSError:
+      time.sleep(0.5)
+  stop_server(server)
+  raise SystemExit('server did not answer within {} s'.format(timeout))
+
+
+def stop_server(server):
+  server.terminate()
+  try:
+    server.wait(10)
+  except subprocess.TimeoutExpired:
+    server.kill()
+    server.wait()
+
+
+def pool_metrics(base_url):
+  # the pool counters of whichever worker answers, if /metrics is there
+  try:
+    with urlopen(base_url.rstrip('/') + '/metrics', timeout=5) as response:
+      return json.load(response).get('db_pool')
+  except (OSError, ValueError):
+    return None
+
+
+def report(summary, as_json):
+  if as_json:
+    print(json.dumps(summary))
+  elif 'pool_size' in summary:
+    print('{url} pool {pool_size}+{max_overflow}: {requests} requests, {errors} errors, {rps} req/s, '
+          'p50 {p50_ms} ms, p90 {p90_ms} ms, p99 {p99_ms} ms, max {max_ms} ms'.format(**summary))
+  else:
+    print('{url}: {requests} requests, {errors} errors, {rps} req/s, '
+          'p50 {p50_ms} ms, p90 {p90_ms} ms, p99 {p99_ms} ms, max {max_ms} ms'.format(**summary))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Load test the Fyyur read endpoints.')
+  parser.add_argument('urls', nargs='+', help='base URL of each server to compare')
+  parser.add_argument('-c', '--concurrency', type=int, default=500)
+  parser.add_argument('-d', '--duration', type=float, default=30, help='seconds per server')
+  parser.add_argument('-p', '--path', action='append', dest='paths',
+                      help='path to request (repeatable); defaults to the read pages and API')
+  parser.add_argument('--json', action='store_true', help='print one JSON object per server')
+  parser.add_argument('--pool-sizes', type=parse_pool_sizes,
+                      help='comma-separated size:overflow pairs to sweep, e.g. 5:10,10:20')
+  parser.add_argument('--server', help='command that starts the server at the URL (with --pool-sizes)')
+  args = parser.parse_args()
+  paths = args.paths or DEFAULT_PATHS
+  if args.pool_sizes and (not args.server or len(args.urls) != 1):
+    parser.error('--pool-sizes takes one URL and the --server command that serves it')
+  loop = asyncio.get_event_loop()
+  if not args.pool_sizes:
+    for base_url in args.urls:
+      summary = loop.run_until_complete(run(base_url, paths, args.concurrency, args.duration))
+      summary['url'] = base_url
+      summary['concurrency'] = args.concurrency
+      report(summary, args.json)
+    return
+  base_url = args.urls[0]
+  p99 = []
+  for pool_size, max_overflow in args.pool_sizes:
+    server = start_server(args.server, base_url, pool_size, max_overflow)
+    try:
+      summary = loop.run_until_complete(run(base_url, paths, args.concurrency, args.duration))
+      summary['db_pool'] = pool_metrics(base_url)
+    finally:
+      stop_server(server)
+    summary.update(url=base_url, concurrency=args.concurrency, pool_size=pool_size, max_overflow=max_overflow)
+    report(summary, args.json)
+    p99.append((pool_size, max_overflow, summary['p99_ms']))
+  if not args.json:
+    print('p99 by pool size (size+overflow per worker):')
+    for pool_size, max_overflow, p99_ms in p99:
+      print('  {}+{}: {} ms'.format(pool_size, max_overflow, p99_ms))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,41 @@
+"""add Show.end_time and no-overlap exclusion constraints
+
+Revision ID: 161ca0380b41
+Revises: f7519e75eeca
+Create Date: 2026-10-18 15:02:33.640218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '161ca0380b41'
+down_revision = 'f7519e75eeca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # existing shows get the default length (config.SHOW_DEFAULT_DURATION_MINUTES)
+    op.execute('''UPDATE "Show" SET end_time = start_time + interval '120 minutes' ''')
+    op.alter_column('Show', 'end_time', nullable=False)
+    # btree_gist lets the integer ids take part in a GiST exclusion constraint.
+    # Adding the constraints fails if double bookings already exist; those
+    # rows have to be fixed before upgrading.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "Show_venue_no_overlap"
+        EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "Show_artist_no_overlap"
+        EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
+
+
+def downgrade():
+    op.drop_constraint('Show_artist_no_overlap', 'Show')
+    op.drop_constraint('Show_venue_no_overlap', 'Show')
+    op.drop_column('Show', 'end_time')
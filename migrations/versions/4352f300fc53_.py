@@ -0,0 +1,54 @@
+"""add trigram-indexed search documents to Venue and Artist
+
+Revision ID: 4352f300fc53
+Revises: 3c4acc6eb83b
+Create Date: 2026-10-18 10:03:17.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4352f300fc53'
+down_revision = '3c4acc6eb83b'
+branch_labels = None
+depends_on = None
+
+# keep in sync with search.search_document()
+SEARCH_DOCUMENT = """
+    trim(regexp_replace(lower(concat_ws(' ', {0}name, {0}city, {0}state,
+                                         array_to_string({0}genres, ' '))),
+                        '\\W+', ' ', 'g'))
+"""
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute("""
+        CREATE OR REPLACE FUNCTION fyyur_search_document() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_document := {};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """.format(SEARCH_DOCUMENT.format('NEW.')))
+    for table in ('Venue', 'Artist'):
+        op.add_column(table, sa.Column('search_document', sa.Text(), nullable=True))
+        op.execute('UPDATE "{}" SET search_document = {}'.format(table, SEARCH_DOCUMENT.format('')))
+        op.execute("""
+            CREATE TRIGGER "{0}_search_document"
+            BEFORE INSERT OR UPDATE OF name, city, state, genres ON "{0}"
+            FOR EACH ROW EXECUTE PROCEDURE fyyur_search_document()
+        """.format(table))
+        op.create_index('ix_{}_search_document'.format(table), table, ['search_document'],
+                        unique=False, postgresql_using='gin',
+                        postgresql_ops={'search_document': 'gin_trgm_ops'})
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index('ix_{}_search_document'.format(table), table_name=table)
+        op.execute('DROP TRIGGER "{0}_search_document" ON "{0}"'.format(table))
+        op.drop_column(table, 'search_document')
+    op.execute('DROP FUNCTION fyyur_search_document()')
@@ -0,0 +1,115 @@
+"""partition Show by month of start_time
+
+Revision ID: 5e8d1f2a7c39
+Revises: 9b2e4c7d1a05
+Create Date: 2026-10-18 17:05:41.226310
+
+"""
+from datetime import datetime
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8d1f2a7c39'
+down_revision = '9b2e4c7d1a05'
+branch_labels = None
+depends_on = None
+
+# months created past the current one; `flask partitions` keeps it going
+MONTHS_AHEAD = 12
+
+INDEXES = (
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time_id', ['start_time', 'id']),
+)
+
+# same names and constraints as partitions.py
+def no_overlap(table):
+    op.execute('ALTER TABLE "{0}" ADD CONSTRAINT "{0}_venue_no_overlap" '
+               'EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)'.format(table))
+    op.execute('ALTER TABLE "{0}" ADD CONSTRAINT "{0}_artist_no_overlap" '
+               'EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, end_time) WITH &&)'.format(table))
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def create_show_table(partitioned):
+    op.execute('''
+        CREATE TABLE "Show" (
+            id integer NOT NULL DEFAULT nextval('"Show_id_seq"'::regclass),
+            venue_id integer NOT NULL REFERENCES "Venue" (id),
+            artist_id integer NOT NULL REFERENCES "Artist" (id),
+            start_time timestamp without time zone NOT NULL,
+            end_time timestamp without time zone NOT NULL,
+            updated_at timestamp without time zone NOT NULL DEFAULT now(),
+            PRIMARY KEY ({})
+        ) {}'''.format('id, start_time' if partitioned else 'id',
+                       'PARTITION BY RANGE (start_time)' if partitioned else ''))
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    for name, columns in INDEXES:
+        op.create_index(name, 'Show', columns, unique=False)
+
+
+def retire_show_table(name):
+    # rename the current table out of the way, freeing the index names
+    for index, _ in INDEXES:
+        op.drop_index(index, table_name='Show')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY NONE')
+    op.execute('ALTER TABLE "Show" RENAME TO "{}"'.format(name))
+    op.execute('ALTER INDEX "Show_pkey" RENAME TO "{}_pkey"'.format(name))
+
+
+def upgrade():
+    # Rebuilds "Show" as a range-partitioned table and copies the rows over
+    # in one transaction; the table is locked for writes meanwhile, so run it
+    # in a maintenance window on large catalogues.
+    op.drop_constraint('Show_artist_no_overlap', 'Show')
+    op.drop_constraint('Show_venue_no_overlap', 'Show')
+    retire_show_table('Show_unpartitioned')
+    create_show_table(partitioned=True)
+
+    if context.is_offline_mode():
+        # no database to ask while writing `flask db upgrade --sql`: months
+        # start at the current one, and older rows go to "Show_default"
+        first = last = None
+    else:
+        first, last = op.get_bind().execute(
+            sa.text('SELECT min(start_time), max(start_time) FROM "Show_unpartitioned"')).first()
+    now = datetime.utcnow()
+    month = datetime((first or now).year, (first or now).month, 1)
+    last = max(last or now, add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD))
+    while month <= last:
+        name = 'Show_y{:04d}m{:02d}'.format(month.year, month.month)
+        op.execute('''CREATE TABLE "{}" PARTITION OF "Show" FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')'''.format(
+            name, month, add_months(month, 1)))
+        no_overlap(name)
+        month = add_months(month, 1)
+    op.execute('CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT')
+    no_overlap('Show_default')
+
+    op.execute('''INSERT INTO "Show" (id, venue_id, artist_id, start_time, end_time, updated_at)
+                  SELECT id, venue_id, artist_id, start_time, end_time, updated_at FROM "Show_unpartitioned"''')
+    op.execute('DROP TABLE "Show_unpartitioned"')
+    op.execute('ANALYZE "Show"')
+
+
+def downgrade():
+    # archived partitions (in the "archive" schema) are not brought back
+    retire_show_table('Show_partitioned')
+    create_show_table(partitioned=False)
+    op.execute('''INSERT INTO "Show" (id, venue_id, artist_id, start_time, end_time, updated_at)
+                  SELECT id, venue_id, artist_id, start_time, end_time, updated_at FROM "Show_partitioned"''')
+    op.execute('DROP TABLE "Show_partitioned"')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "Show_venue_no_overlap"
+        EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "Show_artist_no_overlap"
+        EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
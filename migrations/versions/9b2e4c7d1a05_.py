@@ -0,0 +1,33 @@
+"""soft delete: Venue.deleted_at, Artist.deleted_at
+
+Revision ID: 9b2e4c7d1a05
+Revises: 3da03fe80db6
+Create Date: 2026-10-18 16:32:08.417093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2e4c7d1a05'
+down_revision = '3da03fe80db6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.add_column('Artist', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    # partial: only the rows waiting for `flask purge-deleted` are indexed
+    op.create_index('ix_Venue_deleted_at', 'Venue', ['deleted_at'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NOT NULL'))
+    op.create_index('ix_Artist_deleted_at', 'Artist', ['deleted_at'], unique=False,
+                    postgresql_where=sa.text('deleted_at IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_Artist_deleted_at', table_name='Artist')
+    op.drop_index('ix_Venue_deleted_at', table_name='Venue')
+    op.drop_column('Artist', 'deleted_at')
+    op.drop_column('Venue', 'deleted_at')
@@ -0,0 +1,80 @@
+"""reject overlapping shows across Show partitions
+
+Revision ID: c83f5a1e9d47
+Revises: 7a41c9e0d2b6
+Create Date: 2026-10-18 19:12:40.518273
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c83f5a1e9d47'
+down_revision = '7a41c9e0d2b6'
+branch_labels = None
+depends_on = None
+
+# Each partition's exclusion constraints only see that partition, so a show
+# running past midnight at the end of a month could overlap one in the next.
+# The trigger checks the whole table instead; the advisory locks serialize
+# writers per venue and per artist, so two transactions cannot each miss the
+# other's uncommitted show. The per-partition constraints stay: their GiST
+# indexes answer the check.
+NO_OVERLAP_CHECK = """
+    IF EXISTS (SELECT 1 FROM "Show"
+               WHERE {key} = NEW.{key} AND id <> NEW.id AND start_time < NEW.end_time
+                 AND tsrange(start_time, end_time) && tsrange(NEW.start_time, NEW.end_time)) THEN
+        RAISE EXCEPTION 'conflicting key value violates exclusion constraint "Show_{key_name}_no_overlap"'
+            USING ERRCODE = 'exclusion_violation', CONSTRAINT = 'Show_{key_name}_no_overlap',
+                  DETAIL = 'Key ({key})=(' || NEW.{key} || ') overlaps an existing show.';
+    END IF;
+"""
+
+# rows already in place that the per-partition constraints could not catch:
+# an overlap across partitions needs a show that ends past its own month
+CROSS_PARTITION_OVERLAPS = """
+    SELECT 1 FROM "Show" a JOIN "Show" b
+      ON b.{key} = a.{key} AND b.id <> a.id
+     AND b.start_time >= date_trunc('month', a.start_time) + interval '1 month'
+     AND b.start_time < a.end_time
+    WHERE a.end_time > date_trunc('month', a.start_time) + interval '1 month'
+"""
+
+
+def upgrade():
+    # a DO block rather than a query, so `flask db upgrade --sql` works too
+    op.execute("""
+        DO $$
+        BEGIN
+            IF EXISTS ({}) OR EXISTS ({}) THEN
+                RAISE EXCEPTION 'overlapping shows across "Show" partitions; fix them before upgrading';
+            END IF;
+        END
+        $$
+    """.format(CROSS_PARTITION_OVERLAPS.format(key='venue_id'),
+               CROSS_PARTITION_OVERLAPS.format(key='artist_id')))
+    op.execute("""
+        CREATE OR REPLACE FUNCTION fyyur_show_no_overlap() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('Show.venue_id'), NEW.venue_id);
+            PERFORM pg_advisory_xact_lock(hashtext('Show.artist_id'), NEW.artist_id);
+            {}
+            {}
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """.format(NO_OVERLAP_CHECK.format(key='venue_id', key_name='venue'),
+               NO_OVERLAP_CHECK.format(key='artist_id', key_name='artist')))
+    # AFTER, so the locks are taken once the row is written; a row trigger on
+    # the partitioned table applies to every partition, current and future
+    op.execute("""
+        CREATE CONSTRAINT TRIGGER "Show_no_overlap"
+        AFTER INSERT OR UPDATE OF venue_id, artist_id, start_time, end_time ON "Show"
+        FOR EACH ROW EXECUTE PROCEDURE fyyur_show_no_overlap()
+    """)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER "Show_no_overlap" ON "Show"')
+    op.execute('DROP FUNCTION fyyur_show_no_overlap()')
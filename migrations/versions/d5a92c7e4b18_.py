@@ -0,0 +1,28 @@
+"""limit shows to booking.MAX_DURATION
+
+Revision ID: d5a92c7e4b18
+Revises: c83f5a1e9d47
+Create Date: 2026-10-18 21:04:37.190862
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a92c7e4b18'
+down_revision = 'c83f5a1e9d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keep in step with booking.MAX_DURATION: the availability search and
+    # the booking check bound start_time from below with it, so a longer
+    # show would be missed. Existing rows are checked; shorten any longer
+    # show before upgrading.
+    op.create_check_constraint('Show_max_duration', 'Show', "end_time <= start_time + interval '24 hours'")
+
+
+def downgrade():
+    op.drop_constraint('Show_max_duration', 'Show', type_='check')
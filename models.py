@@ -0,0 +1,560 @@
+#----------------------------------------------------------------------------#
+# Models.
+#
+# Venue/Artist/Show, the summary tables, and the session hooks that keep the
+# page cache and the summaries in step with every flush.
+#----------------------------------------------------------------------------#
+
+import time
+from collections import namedtuple, Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, event, inspect, and_, or_, text, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql.expression import FunctionElement
+import booking
+from extensions import db
+
+ShowCounts = namedtuple('ShowCounts', ['past', 'upcoming'])
+
+# genre lists: GIN-indexed arrays on PostgreSQL, JSON lists on SQLite (tests,
+# the in-process search fallback), so the schema creates on both
+Genres = postgresql.ARRAY(db.String(120)).with_variant(db.JSON, 'sqlite')
+
+class has_genre(FunctionElement):
+  # has_genre(Venue.genres, 'Jazz'): the genre list contains the genre
+  type = db.Boolean()
+  name = 'has_genre'
+
+@compiles(has_genre)
+def compile_has_genre(element, compiler, **kw):
+  genres, genre = element.clauses
+  return 'EXISTS (SELECT 1 FROM json_each({}) WHERE value = {})'.format(
+    compiler.process(genres, **kw), compiler.process(genre, **kw))
+
+@compiles(has_genre, 'postgresql')
+def compile_has_genre_postgresql(element, compiler, **kw):
+  # `genres @> ARRAY[genre]`, which the GIN index answers
+  genres, genre = element.clauses
+  return compiler.process(genres.op('@>')(postgresql.array([genre])), **kw)
+
+@compiles(db.PrimaryKeyConstraint, 'postgresql')
+def compile_primary_key_postgresql(constraint, compiler, **kw):
+  # PRIMARY KEY (id, start_time) for a key declared with
+  # info={'postgresql_partition_key': 'start_time'}; other databases get
+  # the declared columns alone
+  partition_key = constraint.info.get('postgresql_partition_key')
+  if partition_key is None:
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+  names = [column.name for column in constraint.columns] + [partition_key]
+  return 'PRIMARY KEY ({})'.format(', '.join(compiler.preparer.quote(name) for name in names))
+
+class overlaps(FunctionElement):
+  # overlaps(Show.start_time, Show.end_time, start, end): the half-open
+  # ranges [start_time, end_time) and [start, end) intersect
+  type = db.Boolean()
+  name = 'overlaps'
+
+@compiles(overlaps)
+def compile_overlaps(element, compiler, **kw):
+  start_time, end_time, start, end = element.clauses
+  return compiler.process(db.and_(start_time < end, end_time > start), **kw)
+
+@compiles(overlaps, 'postgresql')
+def compile_overlaps_postgresql(element, compiler, **kw):
+  # `tsrange(...) && tsrange(...)`, which the exclusion constraint's GiST
+  # index answers
+  start_time, end_time, start, end = element.clauses
+  return compiler.process(
+    db.func.tsrange(start_time, end_time).op('&&')(db.func.tsrange(start, end)), **kw)
+
+# implement Genre Model and Relations
+class Venue(db.Model):
+    __tablename__ = 'Venue'
+    __table_args__ = (
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        db.Index('ix_Venue_capacity', 'capacity'),
+        db.Index('ix_Venue_deleted_at', 'deleted_at', postgresql_where=text('deleted_at IS NOT NULL')),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Venue_search_document', 'search_document',
+                 postgresql_using='gin', postgresql_ops={'search_document': 'gin_trgm_ops'}),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    genres = db.Column(Genres)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    address = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    description = db.Column(db.String(500), default='')
+    seeking_talent = db.Column(db.Boolean, default=False)
+    website = db.Column(db.String(120))
+    capacity = db.Column(db.Integer)
+    # maintained by the fyyur_search_document() trigger
+    search_document = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # set by soft_delete(); the row and its shows go with `flask purge-deleted`
+    deleted_at = db.Column(db.DateTime)
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+    # add show relation
+    artists = db.relationship('Show', back_populates='venue')
+    def past_shows(self):
+      return Show.query.filter(self.id == Show.venue_id,Show.start_time <= datetime.utcnow()).all()
+    def upcoming_shows(self):
+      return Show.query.options(joinedload(Show.artist)).filter(self.id == Show.venue_id,Show.start_time > datetime.utcnow()).order_by(Show.start_time).all()
+    def num_upcoming_shows(self):
+      return db.session.query(func.count(Show.id)).filter(self.id == Show.venue_id,Show.start_time > datetime.utcnow()).scalar()
+    def num_past_shows(self):
+      return db.session.query(func.count(Show.id)).filter(self.id == Show.venue_id,Show.start_time <= datetime.utcnow()).scalar()
+    @classmethod
+    def show_counts(cls, ids):
+      return Show.counts_by(Show.venue_id, ids)
+    @classmethod
+    def live_criteria(cls):
+      return [cls.deleted_at.is_(None)]
+
+class Artist(db.Model):
+    __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+        db.Index('ix_Artist_deleted_at', 'deleted_at', postgresql_where=text('deleted_at IS NOT NULL')),
+        db.Index('ix_Artist_search_document', 'search_document',
+                 postgresql_using='gin', postgresql_ops={'search_document': 'gin_trgm_ops'}),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+    genres = db.Column(Genres)
+    city = db.Column(db.String(120))
+    state = db.Column(db.String(120))
+    phone = db.Column(db.String(120))
+    image_link = db.Column(db.String(500))
+    facebook_link = db.Column(db.String(120))
+    website = db.Column(db.String(500)) 
+    seeking_venue = db.Column(db.Boolean, default=False)
+    seeking_description = db.Column(db.String(500), default='')
+    # maintained by the fyyur_search_document() trigger
+    search_document = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    # set by soft_delete(); the row and its shows go with `flask purge-deleted`
+    deleted_at = db.Column(db.DateTime)
+    # TODO: implement any missing fields, as a database migration using Flask-Migrate
+    # add show relation
+    venues = db.relationship('Show', back_populates='artist')
+    def past_shows(self):
+      return Show.query.filter(self.id == Show.artist_id,Show.start_time <= datetime.utcnow()).all()
+    def upcoming_shows(self):
+      return Show.query.options(joinedload(Show.venue)).filter(self.id == Show.artist_id,Show.start_time > datetime.utcnow()).order_by(Show.start_time).all()
+    def num_upcoming_shows(self):
+      return db.session.query(func.count(Show.id)).filter(self.id == Show.artist_id,Show.start_time > datetime.utcnow()).scalar()
+    def num_past_shows(self):
+      return db.session.query(func.count(Show.id)).filter(self.id == Show.artist_id,Show.start_time <= datetime.utcnow()).scalar()
+    @classmethod
+    def show_counts(cls, ids):
+      return Show.counts_by(Show.artist_id, ids)
+    @classmethod
+    def live_criteria(cls):
+      return [cls.deleted_at.is_(None)]
+
+# TODO Implement Show and Artist models, and complete all model relationships and properties, as a database migration.
+class Show(db.Model):
+    __tablename__ = 'Show'
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        # rows are identified by id; on PostgreSQL the primary key also takes
+        # the partition key, as it has to on a partitioned table
+        db.PrimaryKeyConstraint('id', info={'postgresql_partition_key': 'start_time'}),
+        # monthly partitions, maintained by `flask partitions` (partitions.py)
+        {'postgresql_partition_by': 'RANGE (start_time)'},
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'),nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'),nullable=False)
+    start_time = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # overlapping [start_time, end_time) ranges for the same venue or artist
+    # are rejected by the per-partition exclusion constraints (GiST) and, across
+    # partitions, by the "Show_no_overlap" trigger
+    end_time = db.Column(db.DateTime, default=lambda context: default_end_time(
+        context.get_current_parameters()['start_time']), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    artist = db.relationship('Artist',back_populates='venues')
+    venue = db.relationship('Venue',back_populates='artists')
+    @classmethod
+    def live_criteria(cls):
+      # a show goes with its soft-deleted venue or artist. Purging keeps the
+      # deleted sets small (and they are partially indexed), so each NOT IN
+      # is one cheap hashed subquery. Uncorrelated, so that it still reads the
+      # whole table when the query itself joins Venue or Artist.
+      return [cls.venue_id.notin_(select([Venue.id]).where(Venue.deleted_at.isnot(None)).correlate(None)),
+              cls.artist_id.notin_(select([Artist.id]).where(Artist.deleted_at.isnot(None)).correlate(None))]
+    @classmethod
+    def counts_by(cls, key, ids):
+      # past/upcoming counts for many venues or artists (key is Show.venue_id
+      # or Show.artist_id) in a single COUNT query, without loading any rows.
+      counts = dict.fromkeys(ids, ShowCounts(0, 0))
+      if not counts:
+        return counts
+      now = datetime.utcnow()
+      rows = db.session.query(
+          key,
+          func.count(cls.id).filter(cls.start_time <= now),
+          func.count(cls.id).filter(cls.start_time > now)
+        ).filter(key.in_(list(counts))).group_by(key)
+      for id, past, upcoming in rows:
+        counts[id] = ShowCounts(past, upcoming)
+      return counts
+
+def default_end_time(start_time):
+  return start_time + timedelta(minutes=current_app.config['SHOW_DEFAULT_DURATION_MINUTES'])
+
+def booking_book(bookings, exclude=()):
+  # every existing show that could collide with any of the bookings, in one
+  # query, loaded into per-venue/per-artist interval indexes; shows in
+  # `exclude` (being rescheduled) are left out. Shows awaiting purge still
+  # hold their slot in the exclusion constraints, so they count too.
+  if not bookings:
+    return booking.BookingBook(())
+  rows = db.session.query(Show.venue_id, Show.artist_id, Show.start_time, Show.end_time, Show.id).with_deleted().filter(
+    or_(Show.venue_id.in_({b.venue_id for b in bookings}), Show.artist_id.in_({b.artist_id for b in bookings})),
+    Show.start_time < max(b.end_time for b in bookings),
+    Show.start_time > min(b.start_time for b in bookings) - booking.MAX_DURATION,
+    Show.end_time > min(b.start_time for b in bookings))
+  if exclude:
+    rows = rows.filter(Show.id.notin_(list(exclude)))
+  return booking.BookingBook((venue_id, artist_id, start_time, end_time, 'show {}'.format(id))
+                             for venue_id, artist_id, start_time, end_time, id in rows)
+
+def soft_delete(obj):
+  # O(1) for the request: the row is hidden (and its shows with it) by
+  # SoftDeleteQuery right away, and removed later by purge_deleted()
+  obj.deleted_at = datetime.utcnow()
+
+def purge_deleted(session, batch_size, older_than=None, pause=0, log=None):
+  # Hard-deletes soft-deleted venues and artists, their shows first, batch_size
+  # shows per transaction (through the session, so the flush and commit hooks
+  # keep the summaries and the shared page cache right), sleeping `pause`
+  # seconds between batches to bound the load. Returns how many rows of each
+  # kind went.
+  purged = Counter()
+  for model, key in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    targets = session.query(model.id).with_deleted().filter(model.deleted_at.isnot(None))
+    if older_than is not None:
+      targets = targets.filter(model.deleted_at <= datetime.utcnow() - older_than)
+    for id, in targets.order_by(model.id).all():
+      while True:
+        shows = session.query(Show).with_deleted().filter(key == id).limit(batch_size).all()
+        if not shows:
+          break
+        for show in shows:
+          session.delete(show)
+        session.commit()
+        purged['Show'] += len(shows)
+        if log:
+          log('{} {}: {} shows purged'.format(model.__tablename__, id, len(shows)))
+        if pause:
+          time.sleep(pause)
+      session.delete(session.query(model).with_deleted().get(id))
+      session.commit()
+      purged[model.__tablename__] += 1
+  return purged
+
+# Summary tables, maintained incrementally by the flush hooks below and
+# rebuilt by `flask refresh-summaries` (which also ages out shows that have
+# moved from upcoming to past, and rebuilds HistorySummary).
+class AreaSummary(db.Model):
+    __tablename__ = 'AreaSummary'
+    state = db.Column(db.String(120), primary_key=True)
+    city = db.Column(db.String(120), primary_key=True)
+    venue_count = db.Column(db.Integer, nullable=False, default=0)
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0)
+
+class GenreSummary(db.Model):
+    __tablename__ = 'GenreSummary'
+    genre = db.Column(db.String(120), primary_key=True)
+    venue_count = db.Column(db.Integer, nullable=False, default=0)
+    artist_count = db.Column(db.Integer, nullable=False, default=0)
+    # upcoming shows at venues listing this genre
+    upcoming_show_count = db.Column(db.Integer, nullable=False, default=0)
+
+# Past shows of one venue (kind 'venue') or artist ('artist'), for the
+# detail pages: only rebuilt, since shows keep turning into past ones (the
+# pages add those themselves); writes that change past shows delete the
+# rows they make wrong.
+class HistorySummary(db.Model):
+    __tablename__ = 'HistorySummary'
+    kind = db.Column(db.String(10), primary_key=True)
+    id = db.Column(db.Integer, primary_key=True)
+    past_show_count = db.Column(db.Integer, nullable=False, default=0)
+    first_show = db.Column(db.DateTime)
+    last_show = db.Column(db.DateTime)
+    # [[artist or venue id, past shows together], ...], most shows first
+    top_counterparts = db.Column(db.JSON, nullable=False, default=list)
+
+HISTORY_TOP_COUNTERPARTS = 5
+#----------------------------------------------------------------------------#
+# Page cache.
+#----------------------------------------------------------------------------#
+
+def page_cache_keys(session, obj):
+  # detail pages that render obj: its own page, plus the pages of everything
+  # it is linked to through a show (tiles show the counterpart's name/image),
+  # including shows hidden by its own soft delete.
+  if isinstance(obj, Show):
+    keys = set()
+    state = inspect(obj)
+    for attr, prefix in (('venue_id', 'venue'), ('artist_id', 'artist')):
+      history = state.attrs[attr].history
+      for id in history.sum():
+        keys.add('{}:{}'.format(prefix, id))
+    return keys
+  if isinstance(obj, Venue):
+    linked = session.query(Show.artist_id).with_deleted().filter(Show.venue_id == obj.id).distinct()
+    return {'venue:{}'.format(obj.id)} | {'artist:{}'.format(id) for id, in linked}
+  if isinstance(obj, Artist):
+    linked = session.query(Show.venue_id).with_deleted().filter(Show.artist_id == obj.id).distinct()
+    return {'artist:{}'.format(obj.id)} | {'venue:{}'.format(id) for id, in linked}
+  return set()
+
+def invalidate_row_pages(rows):
+  # rows written without the session (COPY in `flask import`), which the
+  # flush hooks never see: a new show changes its venue's and artist's pages
+  current_app.extensions['page_cache'].delete_many(
+    {'venue:{}'.format(row['venue_id']) for row in rows if 'venue_id' in row} |
+    {'artist:{}'.format(row['artist_id']) for row in rows if 'artist_id' in row})
+
+@event.listens_for(Session, 'after_flush')
+def collect_page_cache_keys(session, flush_context):
+  keys = session.info.setdefault('page_cache_keys', set())
+  for obj in session.new | session.dirty | session.deleted:
+    keys |= page_cache_keys(session, obj)
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_page_cache(session):
+  current_app.extensions['page_cache'].delete_many(session.info.pop('page_cache_keys', ()))
+
+@event.listens_for(Session, 'after_soft_rollback')
+def discard_page_cache_keys(session, previous_transaction):
+  session.info.pop('page_cache_keys', None)
+
+#----------------------------------------------------------------------------#
+# Summaries.
+#----------------------------------------------------------------------------#
+
+def old_value(state, attr):
+  # value before this flush (history.deleted), else the current one
+  history = state.attrs[attr].history
+  return history.deleted[0] if history.deleted else state.attrs[attr].value
+
+def venue_summary_deltas(deltas, state, city, genres, venues, upcoming):
+  area = (AreaSummary, (state or '', city or ''))
+  deltas[area + ('venue_count',)] += venues
+  deltas[area + ('upcoming_show_count',)] += upcoming
+  for genre in genres or ():
+    deltas[(GenreSummary, (genre,), 'venue_count')] += venues
+    deltas[(GenreSummary, (genre,), 'upcoming_show_count')] += upcoming
+
+def show_summary_deltas(session, deltas, venue_id, start_time, sign, now, venues):
+  if start_time is None or start_time <= now:
+    return
+  # a soft-deleted venue took its upcoming shows out of the counts with it
+  venue = venues.get(venue_id)
+  if venue is not None and venue.deleted_at is None:
+    venue_summary_deltas(deltas, venue.state, venue.city, venue.genres, 0, sign)
+
+def flushed_show_venues(session, objs, now):
+  # id -> Venue for every venue an upcoming show in this flush was or is
+  # booked at, in one query rather than one per show. A venue deleted in
+  # this same flush is gone from the database already, so it comes from
+  # the session.
+  venues = {obj.id: obj for obj in objs if isinstance(obj, Venue) and obj in session.deleted}
+  ids = set()
+  for obj in objs:
+    if isinstance(obj, Show):
+      state = inspect(obj)
+      for venue_id, start_time in ((old_value(state, 'venue_id'), old_value(state, 'start_time')),
+                                   (obj.venue_id, obj.start_time)):
+        if venue_id is not None and start_time is not None and start_time > now:
+          ids.add(venue_id)
+  ids -= set(venues)
+  if ids:
+    venues.update((venue.id, venue) for venue in
+                  session.query(Venue).with_deleted().filter(Venue.id.in_(sorted(ids))))
+  return venues
+
+def was_live(session, state):
+  return state.obj() not in session.new and old_value(state, 'deleted_at') is None
+
+def is_live(session, state):
+  return state.obj() not in session.deleted and state.obj().deleted_at is None
+
+def summary_deltas(session, deltas, obj, now, venues):
+  # shows are counted through their own inserts/deletes, so venue rows only
+  # move their upcoming count when the venue changes area or genres, or is
+  # soft-deleted (or restored) while its shows stay
+  state = inspect(obj)
+  if isinstance(obj, Venue):
+    before, after = was_live(session, state), is_live(session, state)
+    if obj in session.new or obj in session.deleted:
+      if before or after:
+        venue_summary_deltas(deltas, obj.state, obj.city, obj.genres, 1 if after else -1, 0)
+    elif before != after or (after and any(state.attrs[attr].history.has_changes()
+                                           for attr in ('state', 'city', 'genres'))):
+      upcoming = session.query(func.count(Show.id)).with_deleted().filter(
+        Show.venue_id == obj.id, Show.start_time > now).scalar()
+      if before:
+        venue_summary_deltas(deltas, old_value(state, 'state'), old_value(state, 'city'),
+                             old_value(state, 'genres'), -1, -upcoming)
+      if after:
+        venue_summary_deltas(deltas, obj.state, obj.city, obj.genres, 1, upcoming)
+  elif isinstance(obj, Artist):
+    old_genres = set(old_value(state, 'genres') or ()) if was_live(session, state) else set()
+    new_genres = set(obj.genres or ()) if is_live(session, state) else set()
+    for genre in old_genres - new_genres:
+      deltas[(GenreSummary, (genre,), 'artist_count')] -= 1
+    for genre in new_genres - old_genres:
+      deltas[(GenreSummary, (genre,), 'artist_count')] += 1
+  elif isinstance(obj, Show):
+    if obj not in session.new:
+      show_summary_deltas(session, deltas, old_value(state, 'venue_id'), old_value(state, 'start_time'),
+                          -1, now, venues)
+    if obj not in session.deleted:
+      show_summary_deltas(session, deltas, obj.venue_id, obj.start_time, 1, now, venues)
+
+def bump_summary(connection, model, key, column, delta):
+  table = model.__table__
+  key = dict(zip([column.name for column in table.primary_key], key))
+  if connection.dialect.name == 'postgresql':
+    insert = postgresql.insert(table).values(dict(key, **{column: delta}))
+    connection.execute(insert.on_conflict_do_update(
+      index_elements=list(key), set_={column: table.c[column] + insert.excluded[column]}))
+    return
+  match = and_(*[table.c[name] == value for name, value in key.items()])
+  updated = connection.execute(table.update().where(match).values({column: table.c[column] + delta}))
+  if not updated.rowcount:
+    connection.execute(table.insert().values(dict(key, **{column: delta})))
+
+def stale_histories(session, obj, now):
+  # (kind, id) of the HistorySummary rows a change makes wrong: a past show
+  # added, removed or moved, or a venue/artist hidden or shown again along
+  # with its past shows (which also appear on its counterparts' pages)
+  state = inspect(obj)
+  keys = set()
+  if isinstance(obj, Show):
+    if obj in session.dirty and not any(state.attrs[attr].history.has_changes()
+                                        for attr in ('venue_id', 'artist_id', 'start_time')):
+      return keys
+    if obj not in session.new and old_value(state, 'start_time') <= now:
+      keys |= {('venue', old_value(state, 'venue_id')), ('artist', old_value(state, 'artist_id'))}
+    if obj not in session.deleted and obj.start_time <= now:
+      keys |= {('venue', obj.venue_id), ('artist', obj.artist_id)}
+  elif isinstance(obj, (Venue, Artist)) and was_live(session, state) != is_live(session, state):
+    kind, other_kind = ('venue', 'artist') if isinstance(obj, Venue) else ('artist', 'venue')
+    key, other = (Show.venue_id, Show.artist_id) if isinstance(obj, Venue) else (Show.artist_id, Show.venue_id)
+    keys.add((kind, obj.id))
+    keys |= {(other_kind, id) for id, in session.query(other).with_deleted()
+             .filter(key == obj.id, Show.start_time <= now).distinct()}
+  return keys
+
+@event.listens_for(Session, 'after_flush')
+def update_summaries(session, flush_context):
+  deltas = Counter()
+  stale = set()
+  now = datetime.utcnow()
+  objs = session.new | session.dirty | session.deleted
+  venues = flushed_show_venues(session, objs, now)
+  for obj in objs:
+    summary_deltas(session, deltas, obj, now, venues)
+    stale |= stale_histories(session, obj, now)
+  connection = session.connection()
+  for (model, key, column), delta in sorted(deltas.items(), key=lambda item: repr(item[0])):
+    if delta:
+      bump_summary(connection, model, key, column, delta)
+  # a stale history goes until the next rebuild; the pages count live meanwhile
+  table = HistorySummary.__table__
+  for kind in ('venue', 'artist'):
+    ids = sorted(id for stale_kind, id in stale if stale_kind == kind)
+    if ids:
+      connection.execute(table.delete().where(and_(table.c.kind == kind, table.c.id.in_(ids))))
+
+REBUILD_SUMMARIES_SQL = [
+  'DELETE FROM "AreaSummary"',
+  'DELETE FROM "GenreSummary"',
+  '''INSERT INTO "AreaSummary" (state, city, venue_count, upcoming_show_count)
+     SELECT coalesce(v.state, ''), coalesce(v.city, ''), count(DISTINCT v.id),
+            count(s.id) FILTER (WHERE s.start_time > :now)
+     FROM "Venue" v LEFT JOIN "Show" s ON s.venue_id = v.id
+     WHERE v.deleted_at IS NULL
+     GROUP BY 1, 2''',
+  '''INSERT INTO "GenreSummary" (genre, venue_count, artist_count, upcoming_show_count)
+     SELECT genre, sum(venues), sum(artists), sum(upcoming) FROM (
+       SELECT unnest(v.genres) AS genre, 1 AS venues, 0 AS artists,
+              (SELECT count(*) FROM "Show" s WHERE s.venue_id = v.id AND s.start_time > :now) AS upcoming
+       FROM "Venue" v WHERE v.deleted_at IS NULL
+       UNION ALL
+       SELECT unnest(a.genres), 0, 1, 0 FROM "Artist" a WHERE a.deleted_at IS NULL
+     ) genres
+     GROUP BY genre''',
+  'DELETE FROM "HistorySummary"',
+] + ['''INSERT INTO "HistorySummary" (kind, id, past_show_count, first_show, last_show, top_counterparts)
+     SELECT '{kind}', {owner}, sum(shows), min(first_show), max(last_show),
+            json_agg(json_build_array({other}, shows) ORDER BY rank) FILTER (WHERE rank <= :top)
+     FROM (
+       SELECT {owner}, {other}, count(*) AS shows, min(start_time) AS first_show, max(start_time) AS last_show,
+              row_number() OVER (PARTITION BY {owner} ORDER BY count(*) DESC, {other}) AS rank
+       FROM "Show"
+       WHERE start_time <= :now
+         AND venue_id NOT IN (SELECT id FROM "Venue" WHERE deleted_at IS NOT NULL)
+         AND artist_id NOT IN (SELECT id FROM "Artist" WHERE deleted_at IS NOT NULL)
+       GROUP BY {owner}, {other}
+     ) pairs
+     GROUP BY {owner}'''.format(kind=kind, owner=owner, other=other)
+  for kind, owner, other in (('venue', 'venue_id', 'artist_id'), ('artist', 'artist_id', 'venue_id'))]
+
+def rebuild_history_summaries(now):
+  # Python version of the HistorySummary statements above
+  HistorySummary.query.delete()
+  for kind, owner, other in (('venue', Show.venue_id, Show.artist_id), ('artist', Show.artist_id, Show.venue_id)):
+    pairs = db.session.query(owner, other, func.count(Show.id), func.min(Show.start_time), func.max(Show.start_time)) \
+      .filter(Show.start_time <= now).group_by(owner, other)
+    summaries = {}
+    for id, counterpart, shows, first_show, last_show in pairs:
+      summary = summaries.setdefault(id, HistorySummary(kind=kind, id=id, past_show_count=0, top_counterparts=[]))
+      summary.past_show_count += shows
+      summary.first_show = min(filter(None, (summary.first_show, first_show)))
+      summary.last_show = max(filter(None, (summary.last_show, last_show)))
+      summary.top_counterparts.append([counterpart, shows])
+    for summary in summaries.values():
+      summary.top_counterparts = sorted(summary.top_counterparts, key=lambda pair: (-pair[1], pair[0]))[:HISTORY_TOP_COUNTERPARTS]
+    db.session.add_all(summaries.values())
+
+def rebuild_summaries():
+  now = datetime.utcnow()
+  if db.engine.dialect.name == 'postgresql':
+    for statement in REBUILD_SUMMARIES_SQL:
+      db.session.execute(text(statement), {'now': now, 'top': HISTORY_TOP_COUNTERPARTS})
+  else:
+    # no unnest(): aggregate in Python (tests / small datasets only)
+    AreaSummary.query.delete()
+    GenreSummary.query.delete()
+    deltas = Counter()
+    # like the SQL above: every upcoming show at a live venue, whether or
+    # not its artist is soft-deleted
+    upcoming = dict(db.session.query(Show.venue_id, func.count(Show.id)).with_deleted()
+                    .filter(Show.start_time > now).group_by(Show.venue_id))
+    for venue in Venue.query:
+      venue_summary_deltas(deltas, venue.state, venue.city, venue.genres, 1, upcoming.get(venue.id, 0))
+    for artist in Artist.query:
+      for genre in artist.genres or ():
+        deltas[(GenreSummary, (genre,), 'artist_count')] += 1
+    connection = db.session.connection()
+    for (model, key, column), delta in deltas.items():
+      bump_summary(connection, model, key, column, delta)
+    rebuild_history_summaries(now)
+  db.session.commit()
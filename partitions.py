@@ -0,0 +1,139 @@
+#----------------------------------------------------------------------------#
+# Show partitions.
+#
+# On PostgreSQL "Show" is range-partitioned by start_time, one partition a
+# month ("Show_y2026m10") plus "Show_default" for rows outside every month
+# created so far. A query bounded on start_time (every upcoming/past split)
+# only reads the matching partitions. `flask partitions` keeps months
+# created ahead of time and detaches old ones into the "archive" schema.
+#
+# Exclusion constraints cannot span partitions, so each partition carries
+# its own no-overlap constraints, and the "Show_no_overlap" trigger (from
+# the migrations) checks the whole table for shows that cross a month
+# boundary.
+#----------------------------------------------------------------------------#
+
+import re
+from datetime import datetime
+
+DEFAULT = 'Show_default'
+ARCHIVE_SCHEMA = 'archive'
+
+_NAME = re.compile(r'^Show_y(\d{4})m(\d{2})$')
+
+NO_OVERLAP_SQL = [
+  'ALTER TABLE "{name}" ADD CONSTRAINT "{name}_venue_no_overlap" '
+  'EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)',
+  'ALTER TABLE "{name}" ADD CONSTRAINT "{name}_artist_no_overlap" '
+  'EXCLUDE USING gist (artist_id WITH =, tsrange(start_time, end_time) WITH &&)',
+]
+
+
+def month_start(value):
+  return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+  index = month.year * 12 + month.month - 1 + count
+  return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+  return 'Show_y{:04d}m{:02d}'.format(month.year, month.month)
+
+
+def partition_month(name):
+  match = _NAME.match(name)
+  return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def is_partitioned(connection):
+  if connection.dialect.name != 'postgresql':
+    return False
+  return bool(connection.execute(
+    "SELECT 1 FROM pg_partitioned_table WHERE partrelid = '\"Show\"'::regclass").scalar())
+
+
+def partitions(connection):
+  # attached monthly partitions, oldest first, as (month, name)
+  names = [name for name, in connection.execute(
+    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+    "WHERE i.inhparent = '\"Show\"'::regclass")]
+  return sorted((partition_month(name), name) for name in names if partition_month(name))
+
+
+def create_partition(connection, month):
+  # Rows already sitting in the default partition for this month are moved
+  # into the new table before it is attached (attaching checks the default).
+  # The lock keeps writers out of the default partition until the attach, so
+  # no row for this month can land there after the move.
+  name = partition_name(month)
+  bounds = {'name': name, 'start': month, 'end': add_months(month, 1)}
+  connection.execute('CREATE TABLE "{name}" (LIKE "Show" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'.format(**bounds))
+  connection.execute('LOCK TABLE "{}" IN SHARE ROW EXCLUSIVE MODE'.format(DEFAULT))
+  connection.execute(
+    'WITH moved AS (DELETE FROM "{}" WHERE start_time >= %(start)s AND start_time < %(end)s RETURNING *) '
+    'INSERT INTO "{}" SELECT * FROM moved'.format(DEFAULT, name), bounds)
+  connection.execute(
+    'ALTER TABLE "Show" ATTACH PARTITION "{name}" '
+    "FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')".format(**bounds))
+  for statement in NO_OVERLAP_SQL:
+    connection.execute(statement.format(**bounds))
+  return name
+
+
+def ensure_default(connection):
+  # the migration creates it; a table made by metadata.create_all() has none
+  if connection.execute("SELECT to_regclass('\"{}\"')".format(DEFAULT)).scalar() is not None:
+    return []
+  connection.execute('CREATE TABLE "{}" PARTITION OF "Show" DEFAULT'.format(DEFAULT))
+  for statement in NO_OVERLAP_SQL:
+    connection.execute(statement.format(name=DEFAULT))
+  return [DEFAULT]
+
+
+def ensure_partitions(connection, first, last):
+  # every month from first to last (inclusive) gets a partition; returns the
+  # names of the ones created
+  created = ensure_default(connection)
+  existing = {month for month, _ in partitions(connection)}
+  month = month_start(first)
+  while month <= last:
+    if month not in existing:
+      created.append(create_partition(connection, month))
+    month = add_months(month, 1)
+  return created
+
+
+def stranded_months(connection, before):
+  # months before `before` with rows in the default partition: the shows an
+  # offline upgrade (`flask db upgrade --sql`) left there, and shows written
+  # into a month after it was archived
+  return [month_start(month) for month, in connection.execute(
+    'SELECT DISTINCT date_trunc(\'month\', start_time) FROM "{}" WHERE start_time < %(before)s'.format(DEFAULT),
+    {'before': before})]
+
+
+def archive_partitions(connection, before, drop=False):
+  # detaches every monthly partition that ends on or before `before`, then
+  # moves it to the archive schema (or drops it); returns their names. Old
+  # rows in the default partition first get their month's partition, so
+  # they are archived with it rather than left behind.
+  for month in sorted(stranded_months(connection, before)):
+    create_partition(connection, month)
+  archived = []
+  for month, name in partitions(connection):
+    if add_months(month, 1) > before:
+      break
+    connection.execute('ALTER TABLE "Show" DETACH PARTITION "{}"'.format(name))
+    if drop:
+      connection.execute('DROP TABLE "{}"'.format(name))
+    elif connection.execute("SELECT to_regclass('{}.\"{}\"')".format(ARCHIVE_SCHEMA, name)).scalar() is not None:
+      # the month was archived before: add the late rows to it
+      connection.execute('INSERT INTO {0}."{1}" SELECT * FROM "{1}"'.format(ARCHIVE_SCHEMA, name))
+      connection.execute('DROP TABLE "{}"'.format(name))
+    else:
+      connection.execute('CREATE SCHEMA IF NOT EXISTS {}'.format(ARCHIVE_SCHEMA))
+      connection.execute('ALTER TABLE "{}" SET SCHEMA {}'.format(name, ARCHIVE_SCHEMA))
+    archived.append(name)
+  return archived
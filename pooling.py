@@ -0,0 +1,95 @@
+#----------------------------------------------------------------------------#
+# Connection pooling.
+#
+# Builds SQLAlchemy engine options from the DB_* settings in config.py and
+# provides a QueuePool that records checkout waits, overflow connections
+# and timeouts for /metrics.
+#----------------------------------------------------------------------------#
+
+import threading
+import time
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class PoolStats(object):
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.checkouts = 0
+    self.wait_total = 0.0
+    self.wait_max = 0.0
+    self.overflow_events = 0
+    self.timeouts = 0
+
+  def record(self, wait, overflowed=False, timed_out=False):
+    with self._lock:
+      if timed_out:
+        self.timeouts += 1
+        return
+      self.checkouts += 1
+      self.wait_total += wait
+      self.wait_max = max(self.wait_max, wait)
+      if overflowed:
+        self.overflow_events += 1
+
+  def as_dict(self):
+    return {
+      'checkouts': self.checkouts,
+      'wait_total_ms': round(self.wait_total * 1000, 3),
+      'wait_max_ms': round(self.wait_max * 1000, 3),
+      'wait_avg_ms': round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+      'overflow_events': self.overflow_events,
+      'timeouts': self.timeouts,
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+
+  def __init__(self, *args, **kwargs):
+    super(InstrumentedQueuePool, self).__init__(*args, **kwargs)
+    self.stats = PoolStats()
+
+  def _do_get(self):
+    overflow = self._overflow
+    started = time.time()
+    try:
+      connection = super(InstrumentedQueuePool, self)._do_get()
+    except TimeoutError:
+      self.stats.record(time.time() - started, timed_out=True)
+      raise
+    self.stats.record(time.time() - started, overflowed=self._overflow > overflow and self._overflow > 0)
+    return connection
+
+
+def engine_options(config):
+  if config.get('DB_PGBOUNCER_TRANSACTION_MODE'):
+    # PgBouncer (transaction pooling) owns the server connections: keep none
+    # open between requests and so carry no session-level state across them
+    options = {'poolclass': NullPool}
+  else:
+    options = {
+      'poolclass': InstrumentedQueuePool,
+      'pool_size': config['DB_POOL_SIZE'],
+      'max_overflow': config['DB_MAX_OVERFLOW'],
+      'pool_timeout': config['DB_POOL_TIMEOUT'],
+      'pool_recycle': config['DB_POOL_RECYCLE'],
+      'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+  if config['SQLALCHEMY_DATABASE_URI'].startswith(('postgres:', 'postgresql')):
+    # psycopg2 sends an executemany (batch inserts) as multi-row VALUES
+    # pages instead of one round trip per row
+    options['executemany_mode'] = 'values'
+  return options
+
+
+def pool_status(pool):
+  status = {'class': type(pool).__name__}
+  if isinstance(pool, QueuePool):
+    # QueuePool.overflow() starts at -size and only reaches 0 once the pool
+    # has opened `size` connections; report the overflow connections in use
+    status.update(size=pool.size(), checked_in=pool.checkedin(),
+                  checked_out=pool.checkedout(), overflow=max(0, pool.overflow()))
+  if isinstance(pool, InstrumentedQueuePool):
+    status.update(pool.stats.as_dict())
+  return status
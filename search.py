@@ -0,0 +1,134 @@
+#----------------------------------------------------------------------------#
+# Search.
+#
+# Ranked search over venue/artist name, city, state and genres. On
+# PostgreSQL it queries the trigger-maintained `search_document` column
+# through its pg_trgm GIN index; on any other backend (SQLite in tests) it
+# falls back to an in-process trigram index built from the same fields.
+#----------------------------------------------------------------------------#
+
+import re
+from sqlalchemy import event, func, or_
+from sqlalchemy.orm import Session
+
+# minimum share of the term's trigrams a document must contain, mirroring
+# pg_trgm's default word_similarity_threshold
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+
+def normalize(text):
+  return re.sub(r'\W+', ' ', text.lower()).strip()
+
+
+def search_document(name, city, state, genres):
+  # keep in sync with fyyur_search_document() in the search migration
+  return normalize(' '.join(filter(None, [name, city, state] + list(genres or []))))
+
+
+def trigrams(text):
+  # pg_trgm style: each word padded with two leading blanks and one trailing
+  grams = set()
+  for word in text.split():
+    padded = '  ' + word + ' '
+    grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+  return grams
+
+
+class InProcessIndex(object):
+
+  def __init__(self, model):
+    self.model = model
+    self.documents = None
+
+  def invalidate(self):
+    self.documents = None
+
+  def build(self, session):
+    model = self.model
+    rows = session.query(model.id, model.name, model.city, model.state, model.genres)
+    self.documents = {}
+    for row in rows:
+      document = search_document(row.name, row.city, row.state, row.genres)
+      self.documents[row.id] = (document, trigrams(document), row.name or '')
+
+  def search(self, session, term, limit):
+    term_grams = trigrams(term)
+    scored = []
+    for id, (document, document_grams, name) in self.documents.items():
+      if term in document:
+        score = 1.0
+      else:
+        score = len(term_grams & document_grams) / float(len(term_grams))
+      if score >= WORD_SIMILARITY_THRESHOLD:
+        scored.append((-score, name, id))
+    scored.sort()
+    ids = [id for _, _, id in scored[:limit]]
+    by_id = {obj.id: obj for obj in session.query(self.model).filter(self.model.id.in_(ids))}
+    return [by_id[id] for id in ids if id in by_id]
+
+  def suggest(self, term, limit):
+    matches = sorted((not document.startswith(term), name, id)
+                     for id, (document, _, name) in self.documents.items() if term in document)
+    return [(id, name) for _, name, id in matches[:limit]]
+
+
+_indexes = {}
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_indexes(session):
+  for index in _indexes.values():
+    index.invalidate()
+
+
+def _trigram_search(session, model, term, limit):
+  document = model.search_document
+  return session.query(model).filter(or_(
+      document.contains(term, autoescape=True),
+      document.op('%>')(term)
+    )).order_by(func.word_similarity(term, document).desc(), model.name) \
+    .limit(limit).all()
+
+
+def _trigram_suggest(session, model, term, limit):
+  document = model.search_document
+  rows = session.query(model.id, model.name) \
+    .filter(document.contains(term, autoescape=True)) \
+    .order_by(document.startswith(term, autoescape=True).desc(), model.name, model.id) \
+    .limit(limit)
+  return [(id, name) for id, name in rows]
+
+
+def _in_process_index(session, model):
+  index = _indexes.get(model)
+  if index is None:
+    index = _indexes[model] = InProcessIndex(model)
+  if index.documents is None:
+    index.build(session)
+  return index
+
+
+def _is_postgresql(session, model):
+  return session.get_bind(model.__mapper__).dialect.name == 'postgresql'
+
+
+def search(session, model, term, limit):
+  # returns at most `limit` instances of model, best match first
+  term = normalize(term or '')
+  if not term:
+    return session.query(model).order_by(model.name).limit(limit).all()
+  if _is_postgresql(session, model):
+    return _trigram_search(session, model, term, limit)
+  return _in_process_index(session, model).search(session, term, limit)
+
+
+def suggest(session, model, term, limit):
+  # typeahead: (id, name) pairs whose document contains the term, names
+  # starting with it first. Only those two columns are read; on PostgreSQL
+  # the infix LIKE is answered by the search_document trigram index.
+  term = normalize(term or '')
+  if not term:
+    return []
+  if _is_postgresql(session, model):
+    return _trigram_suggest(session, model, term, limit)
+  return _in_process_index(session, model).suggest(term, limit)
@@ -0,0 +1,58 @@
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+import sys
+from flask import Blueprint, current_app, render_template, request, flash
+import batch
+from extensions import db
+from models import Show
+from views import show_page
+
+bp = Blueprint('shows', __name__)
+
+@bp.route('/shows')
+def shows():
+  # displays list of shows at /shows, one keyset page at a time
+  shows, prev_cursor, next_cursor = show_page(
+    request.args.get('after'), request.args.get('before'), current_app.config['SHOWS_PER_PAGE'])
+  return render_template('pages/shows.html', shows=shows, prev_cursor=prev_cursor, next_cursor=next_cursor)
+
+@bp.route('/shows/create')
+def create_shows():
+  # renders form. do not touch.
+  from forms import ShowForm
+  form = ShowForm()
+  return render_template('forms/new_show.html', form=form)
+
+@bp.route('/shows/create', methods=['POST'])
+def create_show_submission():
+  # called to create new shows in the db, upon submitting new show listing form
+  # TODO: insert form data as a new Show record in the db, instead
+
+  from forms import ShowForm
+  form = ShowForm(request.form)
+  if not form.validate():
+    flash('Show could not be listed: ' + '; '.join(
+      '{}: {}'.format(field, ' '.join(messages)) for field, messages in sorted(form.errors.items())))
+    return render_template('forms/new_show.html', form=form)
+  try:
+    # the same checks as a batch of one: the venue and artist must exist
+    # (and not be soft-deleted), and neither may be booked at that time
+    row = batch.show_values(form.data)
+    errors = batch.check_show_rows(db.session, [row]).get(0)
+    if errors:
+      flash('Show could not be listed: ' + '; '.join(errors))
+      return render_template('forms/new_show.html', form=form)
+    db.session.add(Show(**row))
+    db.session.commit()
+    # on successful db insert, flash success
+    flash('Show was successfully listed!')
+  except:
+    # TODO: on unsuccessful db insert, flash an error instead.
+    flash('An error occurred. Show could not be listed.')
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+  return render_template('pages/home.html')
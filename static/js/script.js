@@ -2,3 +2,55 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// typeahead: an <input data-typeahead="/api/v1/typeahead/artists" list="...">
+// fills its <datalist> with id options labelled by name as the user types
+document.addEventListener('DOMContentLoaded', function () {
+  [].forEach.call(document.querySelectorAll('input[data-typeahead]'), function (input) {
+    var list = document.getElementById(input.getAttribute('list'));
+    var timer, last;
+    input.addEventListener('input', function () {
+      var term = input.value.trim();
+      clearTimeout(timer);
+      if (!term || /^\d+$/.test(term) || term === last) return;
+      timer = setTimeout(function () {
+        last = term;
+        var request = new XMLHttpRequest();
+        request.open('GET', input.getAttribute('data-typeahead') + '?q=' + encodeURIComponent(term));
+        request.onload = function () {
+          if (request.status !== 200) return;
+          list.innerHTML = '';
+          JSON.parse(request.responseText).data.forEach(function (item) {
+            var option = document.createElement('option');
+            option.value = item.id;
+            option.label = item.name;
+            option.textContent = item.name;
+            list.appendChild(option);
+          });
+        };
+        request.send();
+      }, 150);
+    });
+  });
+});
+
+// "More past shows" on the venue/artist pages: fetch the next page of tiles
+// (an HTML fragment ending with the next button, if any) in place of the link
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('.load-more a');
+  if (!link) return;
+  event.preventDefault();
+  var more = link.parentNode;
+  link.classList.add('disabled');
+  var request = new XMLHttpRequest();
+  request.open('GET', link.getAttribute('href'));
+  request.onload = function () {
+    if (request.status !== 200) {
+      link.classList.remove('disabled');
+      return;
+    }
+    more.insertAdjacentHTML('beforebegin', request.responseText);
+    more.parentNode.removeChild(more);
+  };
+  request.send();
+});
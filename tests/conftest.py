@@ -0,0 +1,99 @@
+#----------------------------------------------------------------------------#
+# Test fixtures.
+#
+# Every test gets its own app on an in-memory SQLite database (one shared
+# connection, so the schema survives between sessions), with a few venues,
+# artists and shows. PostgreSQL-only behaviour (partitions, exclusion
+# constraints, query plans) is covered by the benchmarks instead.
+#----------------------------------------------------------------------------#
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app():
+  from app import create_app
+  from extensions import db
+  app = create_app(
+    TESTING=True, SQL_INSTRUMENTATION=False, WTF_CSRF_ENABLED=False,
+    SQLALCHEMY_DATABASE_URI='sqlite://',
+    SQLALCHEMY_ENGINE_OPTIONS={'poolclass': StaticPool, 'connect_args': {'check_same_thread': False}})
+  with app.app_context():
+    db.create_all()
+    seed(db.session)
+    db.session.remove()
+  yield app
+  with app.app_context():
+    db.session.remove()
+    db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+  return app.test_client()
+
+
+@pytest.fixture
+def session(app):
+  from extensions import db
+  with app.app_context():
+    yield db.session
+    db.session.remove()
+
+
+def seed(session):
+  # venues 1-3 (two in San Francisco), artists 1-2; show 1 is past, shows
+  # 2 and 3 upcoming
+  from models import Venue, Artist, Show
+  now = datetime.utcnow()
+  session.add_all([
+    Venue(name='The Musical Hop', city='San Francisco', state='CA', genres=['Jazz', 'Folk']),
+    Venue(name='Park Square Live Music & Coffee', city='San Francisco', state='CA', genres=['Rock n Roll']),
+    Venue(name='The Dueling Pianos Bar', city='New York', state='NY', genres=['Classical']),
+    Artist(name='Guns N Petals', city='San Francisco', state='CA', genres=['Rock n Roll']),
+    Artist(name='Matt Quevado', city='New York', state='NY', genres=['Jazz']),
+  ])
+  session.flush()
+  session.add_all([
+    Show(venue_id=1, artist_id=1, start_time=now - timedelta(days=10)),
+    Show(venue_id=1, artist_id=2, start_time=now + timedelta(days=10)),
+    Show(venue_id=3, artist_id=2, start_time=now + timedelta(days=5)),
+  ])
+  session.commit()
+
+
+class StatementCounter(object):
+  # statements sent to the database inside the `with` block
+
+  def __enter__(self):
+    self.statements = []
+    event.listen(Engine, 'after_cursor_execute', self.record)
+    return self
+
+  def __exit__(self, *exc):
+    event.remove(Engine, 'after_cursor_execute', self.record)
+
+  def record(self, conn, cursor, statement, *args):
+    self.statements.append(statement)
+
+  @property
+  def count(self):
+    return len(self.statements)
+
+  @property
+  def selects(self):
+    return sum(statement.lstrip().startswith('SELECT') for statement in self.statements)
+
+
+@pytest.fixture
+def statements():
+  return StatementCounter
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Venue, Artist, Show, soft_delete
+
+
+def add_shows(session, count):
+  # upcoming shows for artist 1, one a day at venues 1-3
+  start = datetime.utcnow().replace(microsecond=0) + timedelta(days=100)
+  session.add_all([Show(venue_id=1 + i % 3, artist_id=1, start_time=start + timedelta(days=i))
+                   for i in range(count)])
+  session.commit()
+
+
+def walk(client, path, cursor_name):
+  # every page of `path`, following the cursor; returns the pages' ids
+  pages, cursor = [], None
+  while True:
+    body = client.get(path + ('&{}={}'.format(cursor_name, cursor) if cursor else '')).get_json()
+    pages.append([row['id'] for row in body['data']])
+    cursor = body['next']
+    if cursor is None:
+      return pages
+
+
+def test_entity_pages_round_trip(client, session):
+  session.add_all([Venue(name='Venue {}'.format(i), city='Austin', state='TX', genres=['Jazz'])
+                   for i in range(5)])
+  session.commit()
+  pages = walk(client, '/api/v1/venues?fields=id&limit=3', 'after')
+  assert pages == [[1, 2, 3], [4, 5, 6], [7, 8]]
+
+
+def test_show_pages_round_trip(app, client, session):
+  add_shows(session, 7)
+  app.config['API_PAGE_SIZE'] = 3
+  forwards, body = [], client.get('/api/v1/shows?fields=id').get_json()
+  while True:
+    forwards.append([show['id'] for show in body['data']])
+    if body['next'] is None:
+      break
+    body = client.get('/api/v1/shows?fields=id&after=' + body['next']).get_json()
+  ids = [id for page in forwards for id in page]
+  assert len(ids) == 10 and len(set(ids)) == 10
+  # and back again from the last page
+  backwards = [forwards[-1]]
+  while body['prev'] is not None:
+    body = client.get('/api/v1/shows?fields=id&before=' + body['prev']).get_json()
+    backwards.append([show['id'] for show in body['data']])
+  assert backwards[::-1] == forwards
+
+
+def test_bad_cursors_are_rejected(client):
+  assert client.get('/api/v1/shows?after=nonsense').status_code == 400
+  assert client.get('/api/v1/venues?after=x').status_code == 400
+
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'x', '100000'])
+def test_page_limit_is_validated(client, limit):
+  assert client.get('/api/v1/venues?limit=' + limit).status_code == 400
+
+
+def test_page_limit_bounds(app, client):
+  assert client.get('/api/v1/venues?limit=1').status_code == 200
+  assert client.get('/api/v1/venues?limit={}'.format(app.config['API_MAX_PAGE_SIZE'])).status_code == 200
+
+
+def test_etag_changes_when_a_next_page_appears(client, session):
+  # the page's rows stay the same, but it now has a next page
+  response = client.get('/api/v1/venues?limit=3')
+  assert response.get_json()['next'] is None
+  session.add(Venue(name='Zed Hall', city='Austin', state='TX', genres=['Jazz']))
+  session.commit()
+  response = client.get('/api/v1/venues?limit=3', headers={'If-None-Match': response.headers['ETag']})
+  assert response.status_code == 200
+  assert response.get_json()['next'] == 3
+
+
+def test_detail_etag_follows_the_show_lists(client, session):
+  path = '/api/v1/venues/1?fields=id,past_shows,upcoming_shows'
+  etag = client.get(path).headers['ETag']
+  assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+  artist = Artist.query.get(2)
+  artist.name = 'Renamed'
+  artist.updated_at = datetime.utcnow() + timedelta(seconds=1)
+  session.commit()
+  response = client.get(path, headers={'If-None-Match': etag})
+  assert response.status_code == 200
+  assert response.get_json()['upcoming_shows'][0]['artist_name'] == 'Renamed'
+  etag = response.headers['ETag']
+  soft_delete(Artist.query.get(2))
+  session.commit()
+  response = client.get(path, headers={'If-None-Match': etag})
+  assert response.status_code == 200
+  assert response.get_json()['upcoming_shows'] == []
+
+
+def test_batch_is_one_round_trip_per_step(client, statements):
+  # the statement count of a batch does not grow with its rows
+  start = datetime.utcnow().replace(microsecond=0) + timedelta(days=200)
+  counts = []
+  for rows in (5, 50):
+    body = [{'venue_id': 2, 'artist_id': 1, 'start_time': str(start + timedelta(days=i))}
+            for i in range(rows)]
+    start += timedelta(days=rows)
+    with statements() as counter:
+      response = client.post('/api/v1/batch/shows', json=body)
+    assert response.status_code == 200, response.get_json()
+    counts.append(counter.count)
+  assert counts[0] == counts[1]
+
+
+def test_show_form_rejects_unknown_and_deleted_references(client, session):
+  soft_delete(Venue.query.get(2))
+  session.commit()
+  start = (datetime.utcnow() + timedelta(days=40)).strftime('%Y-%m-%d %H:%M:%S')
+  for venue_id, message in (('99', b'unknown venue_id 99'), ('2', b'unknown venue_id 2'),
+                            ('', b'venue_id: This field is required')):
+    response = client.post('/shows/create', data={'venue_id': venue_id, 'artist_id': '1', 'start_time': start})
+    assert message in response.data
+  assert session.query(Show).with_deleted().count() == 3
+  response = client.post('/shows/create', data={'venue_id': '3', 'artist_id': '1', 'start_time': start})
+  assert b'Show was successfully listed!' in response.data
+  assert client.get('/artists/1').status_code == 200
@@ -0,0 +1,18 @@
+import shutil
+
+import assets
+
+
+def test_only_hashed_assets_are_immutable(app, client, tmp_path):
+  static = str(tmp_path / 'static')
+  shutil.copytree(app.static_folder, static, ignore=shutil.ignore_patterns(assets.OUTPUT))
+  manifest = assets.build(static)
+  app.static_folder = static
+  hashed = client.get('/assets/' + manifest['bundles']['main.css'])
+  assert hashed.status_code == 200
+  assert hashed.headers['Cache-Control'] == assets.CACHE_CONTROL
+  response = client.get('/assets/' + assets.MANIFEST)
+  assert response.status_code == 200
+  assert response.headers['Cache-Control'] == assets.UNHASHED_CACHE_CONTROL
+  assert client.get('/assets/' + assets.MANIFEST,
+                    headers={'If-None-Match': response.headers['ETag']}).status_code == 304
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import booking
+from booking import Booking, BookingBook, IntervalIndex
+
+T = datetime(2030, 1, 1, 20)
+
+
+def hours(n):
+  return T + timedelta(hours=n)
+
+
+def test_interval_index_is_half_open():
+  index = IntervalIndex([(hours(0), hours(2), 'a')])
+  assert index.overlapping(hours(1), hours(3)) == 'a'
+  assert index.overlapping(hours(2), hours(3)) is None
+  assert index.overlapping(hours(-1), hours(0)) is None
+  assert index.overlapping(hours(-1), hours(5)) == 'a'
+
+
+def test_interval_index_finds_a_long_interval_behind_short_ones():
+  # legacy rows may overlap each other: the long one starts first
+  index = IntervalIndex([(hours(0), hours(10), 'long'), (hours(1), hours(2), 'short'),
+                         (hours(3), hours(4), 'other')])
+  assert index.overlapping(hours(5), hours(6)) == 'long'
+  assert index.overlapping(hours(10), hours(11)) is None
+
+
+def test_interval_index_added_intervals():
+  index = IntervalIndex()
+  index.add(hours(0), hours(2), 'a')
+  index.add(hours(4), hours(6), 'b')
+  assert index.overlapping(hours(1), hours(2)) == 'a'
+  assert index.overlapping(hours(2), hours(4)) is None
+  assert index.overlapping(hours(5), hours(7)) == 'b'
+
+
+def test_booking_book_checks_venue_and_artist():
+  book = BookingBook([(1, 1, hours(0), hours(2), 'show 1')])
+  assert book.conflicts(Booking(1, 2, hours(1), hours(3))) == ['venue 1 is already booked (show 1)']
+  assert book.conflicts(Booking(2, 1, hours(1), hours(3))) == ['artist 1 is already booked (show 1)']
+  assert book.conflicts(Booking(2, 2, hours(1), hours(3))) == []
+
+
+def test_booking_book_books_within_a_batch():
+  book = BookingBook(())
+  assert book.book(Booking(1, 1, hours(0), hours(2)), 'row 1') == []
+  assert book.book(Booking(1, 2, hours(1), hours(3)), 'row 2') == ['venue 1 is already booked (row 1)']
+
+
+def test_booking_book_rejects_bad_lengths():
+  book = BookingBook(())
+  assert book.conflicts(Booking(1, 1, hours(2), hours(2))) == ['end_time must be after start_time']
+  assert book.conflicts(Booking(1, 1, T, T + booking.MAX_DURATION)) == []
+  assert book.conflicts(Booking(1, 1, T, T + booking.MAX_DURATION + timedelta(minutes=1))) == \
+    ['a show can last at most 24 hours']
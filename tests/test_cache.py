@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import cache
+from commands import import_command, purge_deleted_command
+from models import Venue, soft_delete
+
+
+class DictRedis(object):
+  # the get/set/delete subset of redis.StrictRedis RedisCache uses
+
+  def __init__(self):
+    self.values = {}
+
+  def get(self, key):
+    return self.values.get(key)
+
+  def set(self, key, value, ex=None):
+    self.values[key] = value
+
+  def delete(self, *keys):
+    for key in keys:
+      self.values.pop(key, None)
+
+
+@pytest.fixture
+def shared_cache(app):
+  # the cache a second process would see too
+  app.extensions['page_cache'] = cache.RedisCache(DictRedis())
+  return app.extensions['page_cache']
+
+
+def test_lru_timeout_is_bounded():
+  lru = cache.from_config({'CACHE_BACKEND': 'lru', 'CACHE_TIMEOUT': 3600, 'CACHE_LRU_TIMEOUT': 30})
+  assert lru.timeout == 30
+  lru = cache.from_config({'CACHE_BACKEND': 'lru', 'CACHE_TIMEOUT': 10, 'CACHE_LRU_TIMEOUT': 30})
+  assert lru.timeout == 10
+  assert cache.from_config({'CACHE_BACKEND': 'lru', 'CACHE_TIMEOUT': None, 'CACHE_LRU_TIMEOUT': None}).timeout is None
+
+
+def test_import_clears_the_pages_of_imported_shows(app, client, shared_cache, tmp_path):
+  client.get('/venues/2')
+  client.get('/artists/1')
+  assert shared_cache.get('venue:2') and shared_cache.get('artist:1')
+  path = tmp_path / 'shows.csv'
+  start = datetime.utcnow().replace(microsecond=0) + timedelta(days=60)
+  path.write_text('venue_id,artist_id,start_time\n2,1,{}\n'.format(start))
+  result = app.test_cli_runner().invoke(import_command, ['shows', str(path)])
+  assert result.exit_code == 0, result.output
+  assert shared_cache.get('venue:2') is None
+  assert shared_cache.get('artist:1') is None
+  assert '1 Upcoming Show' in client.get('/venues/2').get_data(as_text=True)
+
+
+def test_purge_clears_the_pages_of_purged_rows(app, client, session, shared_cache):
+  soft_delete(Venue.query.get(1))
+  session.commit()
+  session.remove()
+  client.get('/artists/2')
+  assert shared_cache.get('artist:2')
+  result = app.test_cli_runner().invoke(purge_deleted_command, ['--pause', '0', '--batch-size', '10'])
+  assert result.exit_code == 0, result.output
+  assert shared_cache.get('artist:2') is None
@@ -0,0 +1,56 @@
+import http.server
+import io
+import threading
+import time
+
+import pytest
+
+import images
+
+CONFIG = {'IMAGE_MAX_SOURCE_BYTES': 1024 * 1024, 'IMAGE_FETCH_TIMEOUT': 1, 'IMAGE_FETCH_DEADLINE': 0.5,
+          'IMAGE_PROXY_ALLOW_PRIVATE': True}
+
+
+class DripHandler(http.server.BaseHTTPRequestHandler):
+  # /slow sends a byte every 50 ms, each well inside the socket timeout
+
+  def log_message(self, *args):
+    pass
+
+  def do_GET(self):
+    body = b'x' * 100
+    self.send_response(200)
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    for byte in body:
+      if self.path == '/slow':
+        time.sleep(0.05)
+      self.wfile.write(bytes([byte]))
+      self.wfile.flush()
+
+
+@pytest.fixture
+def server():
+  server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), DripHandler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+  server.shutdown()
+  server.server_close()
+
+
+def test_fetch_reads_the_body(server):
+  assert images.fetch(server + '/fast', CONFIG) == b'x' * 100
+
+
+def test_fetch_gives_up_at_the_deadline(server):
+  started = time.monotonic()
+  assert images.fetch(server + '/slow', CONFIG) is None
+  assert time.monotonic() - started < CONFIG['IMAGE_FETCH_DEADLINE'] + CONFIG['IMAGE_FETCH_TIMEOUT']
+
+
+def test_render_refuses_oversized_images():
+  Image = pytest.importorskip('PIL.Image')
+  output = io.BytesIO()
+  Image.new('RGB', (400, 300), 'white').save(output, 'PNG')
+  assert images.render(output.getvalue(), 100, 'jpg', max_pixels=400 * 300)
+  assert images.render(output.getvalue(), 100, 'jpg', max_pixels=400 * 300 - 1) is None
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from models import (Venue, Artist, Show, AreaSummary, GenreSummary, HistorySummary,
+                    soft_delete, purge_deleted, rebuild_summaries)
+
+
+def summaries(session):
+  return (sorted((row.state, row.city, row.venue_count, row.upcoming_show_count)
+                 for row in AreaSummary.query if row.venue_count),
+          sorted((row.genre, row.venue_count, row.artist_count, row.upcoming_show_count)
+                 for row in GenreSummary.query if row.venue_count or row.artist_count),
+          {(row.kind, row.id): (row.past_show_count, row.first_show, row.last_show, row.top_counterparts)
+           for row in HistorySummary.query})
+
+
+def assert_summaries_match_rebuild(session):
+  # the flush hooks keep AreaSummary/GenreSummary exact; HistorySummary rows
+  # are only dropped when a write makes them wrong, so the ones left must
+  # match the rebuilt ones
+  areas, genres, histories = summaries(session)
+  rebuild_summaries()
+  rebuilt_areas, rebuilt_genres, rebuilt_histories = summaries(session)
+  assert areas == rebuilt_areas
+  assert genres == rebuilt_genres
+  for key, history in histories.items():
+    assert rebuilt_histories[key] == history
+
+
+def test_soft_deleted_rows_are_hidden(session):
+  soft_delete(Venue.query.get(1))
+  session.commit()
+  assert [venue.id for venue in Venue.query.order_by(Venue.id)] == [2, 3]
+  assert Venue.query.get(1) is None
+  # the venue's shows go with it
+  assert [show.id for show in Show.query.order_by(Show.id)] == [3]
+  assert session.query(Show.id).filter(Show.venue_id == 1).all() == []
+
+
+def test_with_deleted_opts_out(session):
+  soft_delete(Artist.query.get(2))
+  session.commit()
+  assert Artist.query.with_deleted().count() == 2
+  assert Artist.query.with_deleted().get(2).deleted_at is not None
+  assert session.query(Show).with_deleted().count() == 3
+  assert Show.query.count() == 1
+
+
+def test_purge_deleted_removes_rows_and_shows(session):
+  soft_delete(Venue.query.get(1))
+  session.commit()
+  purged = purge_deleted(session, batch_size=1)
+  assert purged == {'Show': 2, 'Venue': 1}
+  assert Venue.query.with_deleted().count() == 2
+  assert session.query(Show).with_deleted().count() == 1
+
+
+def test_summaries_follow_writes(session):
+  rebuild_summaries()
+  now = datetime.utcnow()
+  venue = Venue(name='Zed Hall', city='New York', state='NY', genres=['Jazz', 'Rock n Roll'])
+  session.add(venue)
+  session.flush()
+  session.add(Show(venue_id=venue.id, artist_id=1, start_time=now + timedelta(days=3)))
+  session.commit()
+  assert_summaries_match_rebuild(session)
+
+  venue = Venue.query.get(1)
+  venue.city, venue.genres = 'New York', ['Classical']
+  show = Show.query.get(3)
+  show.venue_id, show.start_time = 2, now + timedelta(days=20)
+  session.commit()
+  assert_summaries_match_rebuild(session)
+
+  soft_delete(Venue.query.get(3))
+  session.delete(Show.query.get(1))
+  session.commit()
+  assert_summaries_match_rebuild(session)
+
+  purge_deleted(session, batch_size=10)
+  assert_summaries_match_rebuild(session)
+
+
+def test_summary_upkeep_loads_venues_in_one_query(session, statements):
+  # the flush hook used to load each show's venue on its own
+  now = datetime.utcnow()
+  counts = []
+  for rows in (5, 50):
+    shows = [Show(venue_id=venue_id, artist_id=1, start_time=now + timedelta(days=30 + rows + i))
+             for i, venue_id in zip(range(rows), [1, 2, 3] * rows)]
+    session.add_all(shows)
+    with statements() as counter:
+      session.flush()
+    session.rollback()
+    counts.append(counter.selects)
+  assert counts[0] == counts[1]
@@ -0,0 +1,169 @@
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+import sys
+from itertools import groupby
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for
+import batch
+import search
+from extensions import db
+from models import Venue, Artist, Show, AreaSummary, soft_delete, has_genre
+from views import render_cached, past_show_page, history
+
+bp = Blueprint('venues', __name__)
+
+@bp.route('/venues')
+def venues():
+  # area headings and counts come from the AreaSummary table; venues are read
+  # in (state, city) index order and grouped as they stream, without
+  # touching Show at all. ?genre= narrows the venues through the GIN index.
+  genre = request.args.get('genre')
+  rows = db.session.query(Venue.state, Venue.city, Venue.id, Venue.name)
+  if genre:
+    rows = rows.filter(has_genre(Venue.genres, genre))
+  rows = rows.order_by(Venue.state, Venue.city, Venue.id)
+  venues_by_area = {
+    area: [{'id': venue.id, 'name': venue.name} for venue in venues]
+    for area, venues in groupby(rows, key=lambda row: (row.state or '', row.city or ''))
+  }
+  if genre:
+    # area summaries count every genre, so only list areas with matches
+    result = [{
+      "state": state,
+      "city": city,
+      "num_venues": len(venues),
+      "venues": venues
+    } for (state, city), venues in venues_by_area.items()]
+    return render_template('pages/venues.html', areas=result, genre=genre)
+  areas = AreaSummary.query.filter(AreaSummary.venue_count > 0) \
+    .order_by(AreaSummary.state, AreaSummary.city).all()
+  result = []
+  for area in areas:
+    result.append({
+      "state": area.state,
+      "city": area.city,
+      "num_venues": area.venue_count,
+      "num_upcoming_shows": area.upcoming_show_count,
+      "venues": venues_by_area.get((area.state, area.city), [])
+    })
+  return render_template('pages/venues.html', areas=result)
+
+@bp.route('/venues/search', methods=['POST'])
+def search_venues():
+  # ranked, case-insensitive partial match on name, city, state and genres.
+  # seach for Hop should return "The Musical Hop".
+  # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+  search_term=request.form.get('search_term', '')
+  venues = search.search(db.session, Venue, search_term, current_app.config['SEARCH_RESULTS_LIMIT'])
+  response={
+    "count": len(venues),
+    "data":[]
+  }
+  for venue in venues:
+    response['data'].append(venue)
+  show_counts = Venue.show_counts([venue.id for venue in venues])
+  return render_template('pages/search_venues.html', results=response, show_counts=show_counts, search_term=request.form.get('search_term'))
+
+@bp.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  return render_cached('venue:{}'.format(venue_id), lambda: render_venue(venue_id))
+
+def render_venue(venue_id):
+  # past shows: the first page and the precomputed summary only, the rest
+  # loads from /venues/<id>/past-shows
+  target_venue = Venue.query.filter_by(id=venue_id).first_or_404()
+  upcoming_shows = target_venue.upcoming_shows()
+  upcoming_shows_count = len(upcoming_shows)
+  past_shows, next_cursor = past_show_page(Show.venue_id, venue_id, Show.artist, None, current_app.config['PAST_SHOWS_PER_PAGE'])
+  summary = history('venue', venue_id, Artist)
+  past_shows_count = summary['count'] if summary else target_venue.num_past_shows()
+  html = render_template('pages/show_venue.html', venue=target_venue, past_shows=past_shows, upcoming_shows=upcoming_shows, past_shows_count=past_shows_count, upcoming_shows_count=upcoming_shows_count,
+                         history=summary, next_url=next_cursor and url_for('.venue_past_shows', venue_id=venue_id, before=next_cursor))
+  # stale once the next upcoming show starts
+  return html, upcoming_shows[0].start_time if upcoming_shows else None
+
+@bp.route('/venues/<int:venue_id>/past-shows')
+def venue_past_shows(venue_id):
+  # fragment appended by the "More past shows" button
+  past_shows, next_cursor = past_show_page(Show.venue_id, venue_id, Show.artist, request.args.get('before'), current_app.config['PAST_SHOWS_PER_PAGE'])
+  return render_template('fragments/past_shows.html', past_shows=past_shows, counterpart='artist',
+                         next_url=next_cursor and url_for('.venue_past_shows', venue_id=venue_id, before=next_cursor))
+
+@bp.route('/venues/create', methods=['GET'])
+def create_venue_form():
+  from forms import VenueForm
+  form = VenueForm()
+  return render_template('forms/new_venue.html', form=form)
+
+@bp.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+  # TODO: insert form data as a new Venue record in the db, instead
+  # TODO: modify data to be the data object returned from db insertion
+  from forms import VenueForm
+  form = VenueForm(request.form)
+  try: 
+    the_new_venue = Venue(**batch.venue_values(form.data))
+    db.session.add(the_new_venue)
+    db.session.commit()
+    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+  except:
+    flash('An error occurred. Venue ' + request.form['name'] + ' could not be created.')
+    db.session.rollback()
+    print(sys.exc_info())
+  finally:
+    db.session.close()
+  return render_template('pages/home.html')
+
+@bp.route('/venues/<venue_id>', methods=['POST'])
+def delete_venue(venue_id):
+  # TODO: Complete this endpoint for taking a venue_id, and using
+  # SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+  try:
+    # soft delete: one UPDATE through the session (so the flush events see
+    # it), whatever the number of shows; `flask purge-deleted` removes the
+    # rows later
+    soft_delete(Venue.query.get(venue_id))
+    db.session.commit()
+    flash('Venue with id' + venue_id + ' was successfully deleted!')
+  except:
+    db.session.rollback()
+    print(sys.exc_info())
+    flash('An error occurred. Venue with id' + venue_id + ' could not be deleted.')
+  finally: 
+    db.session.close()
+  # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+  # clicking that button delete it from the db then redirect the user to the homepage
+  # return None
+  return redirect(url_for('.venues'))
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+  from forms import VenueForm
+  form = VenueForm()
+  target_venue = Venue.query.filter_by(id=venue_id).first()  
+  # TODO: populate form with values from venue with ID <venue_id>
+  return render_template('forms/edit_venue.html', form=form, venue=target_venue)
+
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+  # TODO: take values from the form submitted, and update existing
+  # venue record with ID <venue_id> using the new attributes
+  venue= Venue.query.get(venue_id)
+  from forms import VenueForm
+  form = VenueForm(request.form)
+  if form.validate():
+    try:   
+      for key, value in batch.venue_values(form.data).items():
+        setattr(venue, key, value)
+      db.session.commit()
+      flash('Venue ' + request.form['name'] + ' was successfully edited!')
+    except:
+      # TODO: on unsuccessful db insert, flash an error instead.
+      flash('An error occurred. Venue ' + request.form['name'] + ' could not be edited.')
+      db.session.rollback()
+      print(sys.exc_info())
+    finally:
+      db.session.close()  
+  return redirect(url_for('.show_venue', venue_id=venue_id))
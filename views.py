@@ -0,0 +1,97 @@
+#----------------------------------------------------------------------------#
+# View helpers.
+#
+# Shared by the venue, artist, show and API blueprints.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+import dateutil.parser
+from flask import abort, current_app, session
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import contains_eager
+from extensions import db
+from models import Venue, Artist, Show, HistorySummary
+
+def render_cached(key, render):
+  # render() returns (html, expires_at): the UTC time the page goes stale on
+  # its own (its next upcoming show starts, so it turns into a past one), or
+  # None. Writes invalidate entries before then. Pages carrying flashed
+  # messages are one-off, so they bypass the cache.
+  if '_flashes' in session:
+    return render()[0]
+  page_cache = current_app.extensions['page_cache']
+  html = page_cache.get(key)
+  if html is None:
+    html, expires_at = render()
+    timeout = None if expires_at is None else (expires_at - datetime.utcnow()).total_seconds()
+    if timeout is None or timeout > 0:
+      page_cache.set(key, html, timeout)
+  return html
+
+def encode_cursor(show):
+  return '{}_{}'.format(show.start_time.isoformat(), show.id)
+
+def decode_cursor(cursor):
+  # keyset cursors are "<start_time iso>_<id>"; anything else is a bad request.
+  try:
+    start_time, id = cursor.rsplit('_', 1)
+    return dateutil.parser.parse(start_time), int(id)
+  except (ValueError, OverflowError):
+    abort(400)
+
+def show_page(after, before, page_size):
+  # one keyset page of shows ordered by (start_time, id), with artist and
+  # venue loaded by the same join. Returns (shows, prev_cursor, next_cursor).
+  query = Show.query.join(Venue).join(Artist) \
+    .options(contains_eager(Show.venue), contains_eager(Show.artist))
+  key = tuple_(Show.start_time, Show.id)
+  if before:
+    shows = query.filter(key < decode_cursor(before)) \
+      .order_by(Show.start_time.desc(), Show.id.desc()) \
+      .limit(page_size + 1).all()
+    has_prev = len(shows) > page_size
+    shows = shows[:page_size][::-1]
+    has_next = True
+  else:
+    if after:
+      query = query.filter(key > decode_cursor(after))
+    shows = query.order_by(Show.start_time, Show.id).limit(page_size + 1).all()
+    has_next = len(shows) > page_size
+    shows = shows[:page_size]
+    has_prev = bool(after)
+  prev_cursor = encode_cursor(shows[0]) if shows and has_prev else None
+  next_cursor = encode_cursor(shows[-1]) if shows and has_next else None
+  return shows, prev_cursor, next_cursor
+
+def past_show_page(key, id, counterpart, before, page_size):
+  # one keyset page of a venue's or artist's past shows (key is Show.venue_id
+  # or Show.artist_id), newest first, with the counterpart (Show.artist or
+  # Show.venue) loaded by the same join. Returns (shows, next_cursor).
+  query = Show.query.join(counterpart).options(contains_eager(counterpart)) \
+    .filter(key == id, Show.start_time <= datetime.utcnow())
+  if before:
+    query = query.filter(tuple_(Show.start_time, Show.id) < decode_cursor(before))
+  shows = query.order_by(Show.start_time.desc(), Show.id.desc()).limit(page_size + 1).all()
+  next_cursor = encode_cursor(shows[page_size - 1]) if len(shows) > page_size else None
+  return shows[:page_size], next_cursor
+
+def history(kind, id, counterpart_model):
+  # the precomputed HistorySummary of a venue or artist, its top counterparts
+  # loaded in one query; None until `flask refresh-summaries` has seen it
+  # (or since a write made it stale). Shows that have turned past since the
+  # rebuild, all of them after its last_show, are counted on top.
+  summary = HistorySummary.query.get((kind, id))
+  if summary is None:
+    return None
+  key = Show.venue_id if kind == 'venue' else Show.artist_id
+  late, last_show = db.session.query(func.count(Show.id), func.max(Show.start_time)) \
+    .filter(key == id, Show.start_time > summary.last_show, Show.start_time <= datetime.utcnow()).one()
+  ids = [counterpart_id for counterpart_id, _ in summary.top_counterparts]
+  counterparts = {obj.id: obj for obj in counterpart_model.query.filter(counterpart_model.id.in_(ids))} if ids else {}
+  return {
+    'count': summary.past_show_count + late,
+    'first_show': summary.first_show,
+    'last_show': last_show or summary.last_show,
+    'top': [(counterparts[counterpart_id], shows) for counterpart_id, shows in summary.top_counterparts
+            if counterpart_id in counterparts],
+  }